@@ -0,0 +1,228 @@
+"""
+Stress test of the stock reservation engine with many concurrent simulated shoppers.
+
+Each shopper runs the real cart manager and checkout tools against one shared
+SQLite stock database, with a fake tool context holding its session state. A
+shopper adds hot products to its cart (one by one and in bulk), changes
+quantities, removes lines, then checks out, clears its cart or abandons it.
+Abandoned carts keep their reservations until the TTL expires. Shoppers run as
+threads, spread over several processes with --processes, like several app
+workers sharing the database.
+
+The catalog is small with little stock per product, so shoppers compete for the
+last units. After the run every reservation is expired, and the test checks that:
+- no product was oversold: stock on hand = initial stock - units sold in orders
+- no stock is left reserved and no reservation rows remain
+
+The report has the tool call throughput and latency and the checkout outcomes.
+Exits with status 1 when an invariant doesn't hold.
+
+Usage:
+    python benchmarks/stock_stress_test.py --shoppers 200 --processes 4
+    python benchmarks/stock_stress_test.py --products 5 --stock 10 --ttl 0.5
+"""
+
+import argparse
+import csv
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from types import SimpleNamespace
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PROJECT_DIR)
+
+
+def write_catalog(path, products, stock):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "price", "category", "description", "stock"])
+        for i in range(products):
+            writer.writerow([f"hot_{i:03d}", f"Hot Item {i}", 10 + i, "Deals", "Limited stock", stock])
+
+
+def configure_environment(catalog_path, db_path, ttl):
+    # Read by utils when the agents are imported
+    os.environ["PRODUCT_CATALOG_PATH"] = catalog_path
+    os.environ["STOCK_DB_PATH"] = db_path
+    os.environ["STOCK_RESERVATION_TTL_SECONDS"] = str(ttl)
+
+
+def shopper(shopper_id, args, product_ids):
+    """Run one shopper's session, returning its timings, outcome and purchased units."""
+    from ecommerce_cart_agent.sub_agents.cart_manager import agent as cart_manager
+    from ecommerce_cart_agent.sub_agents.checkout_agent import agent as checkout
+
+    rng = random.Random(args.seed * 100003 + shopper_id)
+    context = SimpleNamespace(state={})
+    timings = defaultdict(list)
+    statuses = Counter()
+
+    def call(tool, *tool_args):
+        started = time.perf_counter()
+        result = tool(context, *tool_args)
+        timings[tool.__name__].append(time.perf_counter() - started)
+        statuses[result["status"]] += 1
+        return result
+
+    for _ in range(rng.randint(1, 4)):
+        call(cart_manager.add_item_to_cart, rng.choice(product_ids), rng.randint(1, 3))
+    bulk = rng.sample(product_ids, min(len(product_ids), rng.randint(2, 5)))
+    call(cart_manager.add_items_to_cart, bulk, [rng.randint(1, 2) for _ in bulk])
+
+    cart_lines = list(context.state.get("cart_items", {}))
+    if cart_lines and rng.random() < 0.5:
+        changed = rng.sample(cart_lines, min(len(cart_lines), 2))
+        call(cart_manager.update_cart_item_quantities, changed, [rng.randint(0, 4) for _ in changed])
+    if cart_lines and rng.random() < 0.3:
+        call(cart_manager.remove_item_from_cart, rng.choice(cart_lines), 1)
+
+    if args.think_time:
+        time.sleep(rng.uniform(0, args.think_time))
+
+    sold = Counter()
+    outcome = rng.random()
+    if outcome < args.checkout_rate:
+        result = call(checkout.process_checkout, "credit_card")
+        if result["status"] == "success":
+            for item in result["order"]["items"]:
+                sold[item["id"]] += item["quantity"]
+            outcome = "checked_out"
+        elif context.state.get("cart_items"):
+            outcome = "checkout_failed"
+            call(cart_manager.clear_cart)
+        else:
+            outcome = "empty_cart"
+    elif outcome < args.checkout_rate + args.clear_rate:
+        call(cart_manager.clear_cart)
+        outcome = "cleared"
+    else:
+        outcome = "abandoned"
+
+    return dict(timings), statuses, outcome, sold
+
+
+def run_shoppers(first_shopper, count, args, product_ids):
+    """Run shoppers as threads, in the calling process or a worker process."""
+    configure_environment(args.catalog_path, args.db_path, args.ttl)
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        futures = [
+            executor.submit(shopper, first_shopper + i, args, product_ids) for i in range(count)
+        ]
+        return [future.result() for future in futures]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def check_invariants(db_path, initial_stock, sold):
+    """Return the invariant violations of the stock database after the run."""
+    violations = []
+    connection = sqlite3.connect(db_path)
+    try:
+        for product_id, on_hand, reserved in connection.execute(
+            "SELECT product_id, on_hand, reserved FROM stock ORDER BY product_id"
+        ):
+            expected = initial_stock - sold[product_id]
+            if expected < 0:
+                violations.append(f"{product_id}: oversold, {sold[product_id]} sold of {initial_stock}")
+            if on_hand != expected:
+                violations.append(f"{product_id}: {on_hand} on hand, expected {expected}")
+            if reserved:
+                violations.append(f"{product_id}: {reserved} still reserved after expiry")
+        remaining = connection.execute("SELECT COUNT(*) FROM reservations").fetchone()[0]
+        if remaining:
+            violations.append(f"{remaining} reservations left after expiry")
+    finally:
+        connection.close()
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shoppers", type=int, default=100, help="Number of simulated shoppers")
+    parser.add_argument("--processes", type=int, default=1, help="Processes the shoppers are spread over")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent shoppers per process")
+    parser.add_argument("--products", type=int, default=10, help="Number of hot products")
+    parser.add_argument("--stock", type=int, default=50, help="Initial stock of each product")
+    parser.add_argument("--ttl", type=float, default=1.0, help="Reservation TTL in seconds")
+    parser.add_argument("--think-time", type=float, default=0.05, help="Maximum pause before checking out, in seconds")
+    parser.add_argument("--checkout-rate", type=float, default=0.6, help="Share of shoppers who check out")
+    parser.add_argument("--clear-rate", type=float, default=0.2, help="Share of shoppers who clear their cart, the rest abandon it")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="stock_stress_")
+    args.catalog_path = os.path.join(workdir, "catalog.csv")
+    args.db_path = os.path.join(workdir, "stock.sqlite3")
+    write_catalog(args.catalog_path, args.products, args.stock)
+    configure_environment(args.catalog_path, args.db_path, args.ttl)
+    product_ids = [f"hot_{i:03d}" for i in range(args.products)]
+
+    # Create and seed the database before the shoppers start
+    from utils import STOCK_RESERVATIONS
+
+    started = time.perf_counter()
+    if args.processes > 1:
+        share = -(-args.shoppers // args.processes)
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            futures = [
+                executor.submit(run_shoppers, first, min(share, args.shoppers - first), args, product_ids)
+                for first in range(0, args.shoppers, share)
+            ]
+            results = [result for future in futures for result in future.result()]
+    else:
+        results = run_shoppers(0, args.shoppers, args, product_ids)
+    elapsed = time.perf_counter() - started
+
+    timings = defaultdict(list)
+    statuses = Counter()
+    outcomes = Counter()
+    sold = Counter()
+    for shopper_timings, shopper_statuses, outcome, shopper_sold in results:
+        for tool, values in shopper_timings.items():
+            timings[tool].extend(values)
+        statuses.update(shopper_statuses)
+        outcomes[outcome] += 1
+        sold.update(shopper_sold)
+
+    # Let the abandoned carts expire, then reclaim their reservations
+    time.sleep(args.ttl)
+    expired = STOCK_RESERVATIONS.expire_reservations()
+
+    calls = sum(len(values) for values in timings.values())
+    print(f"Shoppers: {args.shoppers} in {args.processes} process(es) x {args.threads} threads")
+    print(f"Products: {args.products} x {args.stock} units, TTL {args.ttl}s")
+    print(f"Elapsed: {elapsed:.2f}s, {calls} tool calls, {calls / elapsed:.1f} calls/s")
+    print("\nTool latency (ms):")
+    print(f"  {'tool':<30} {'calls':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for tool, values in sorted(timings.items()):
+        print(
+            f"  {tool:<30} {len(values):>6} {percentile(values, 0.5) * 1000:>8.2f} "
+            f"{percentile(values, 0.95) * 1000:>8.2f} {percentile(values, 0.99) * 1000:>8.2f}"
+        )
+    print(f"\nTool statuses: {dict(statuses)}")
+    print(f"Outcomes: {dict(outcomes)}")
+    print(f"Units sold: {sum(sold.values())} of {args.products * args.stock}")
+    print(f"Abandoned reservations expired: {expired}")
+
+    violations = check_invariants(args.db_path, args.stock, sold)
+    if violations:
+        print("\nINVARIANT VIOLATIONS:")
+        for violation in violations:
+            print(f"  {violation}")
+        sys.exit(1)
+    print("\nAll stock invariants hold.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import uuid
+from itertools import islice
+
+
+class Cart:
+    """Shopping cart keyed by product ID, with an incrementally maintained total.
+
+    Lines are stored in a dict keyed by product ID, so adding, updating or removing a
+    line doesn't scan the cart, and the total amount and item count are adjusted by
+    each change instead of being re-summed over the whole cart.
+
+    The cart lives in session state as plain JSON values:
+    - cart_id: ID holding the cart's stock reservations
+    - cart_items: product ID -> {id, name, price, quantity}
+    - total_amount: sum of price x quantity over the lines
+    - item_count: sum of the line quantities
+    - cart_line_count: number of lines
+
+    Agent instructions only inject the counts and total, never the lines, so the
+    prompt stays the same size however large the cart grows.
+    """
+
+    def __init__(self, items=None, total_amount=None, item_count=None, cart_id=None):
+        self.cart_id = cart_id or uuid.uuid4().hex
+        self.items = items if items is not None else {}
+        if total_amount is None or item_count is None:
+            total_amount, item_count = self._sum(self.items.values())
+        self.total_amount = total_amount
+        self.item_count = item_count
+
+    @classmethod
+    def from_state(cls, state):
+        """Load the cart from session state.
+
+        Carts saved as a list of lines, before the cart was keyed by product ID,
+        are converted and their totals computed once.
+        """
+        items = state.get("cart_items") or {}
+        if isinstance(items, list):
+            return cls({item["id"]: dict(item) for item in items}, cart_id=state.get("cart_id"))
+        return cls(items, state.get("total_amount"), state.get("item_count"), state.get("cart_id"))
+
+    def save(self, state):
+        """Write the cart to session state."""
+        state["cart_id"] = self.cart_id
+        state["cart_items"] = self.items
+        state["total_amount"] = self.total_amount
+        state["item_count"] = self.item_count
+        state["cart_line_count"] = len(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, product_id):
+        return product_id in self.items
+
+    def get(self, product_id):
+        return self.items.get(product_id)
+
+    def quantity(self, product_id):
+        """Return the quantity of a product in the cart, 0 if it isn't in it."""
+        line = self.items.get(product_id)
+        return line["quantity"] if line else 0
+
+    def lines(self, offset=0, limit=None):
+        """Return the cart lines in the order they were added, optionally a slice of them."""
+        end = offset + limit if limit is not None else None
+        return list(islice(self.items.values(), offset, end))
+
+    def add(self, product, quantity):
+        """Add a quantity of a product, merging it into its existing line.
+
+        Returns:
+            The updated cart line
+        """
+        return self.set_quantity(product, self.quantity(product["id"]) + quantity)
+
+    def set_quantity(self, product, quantity):
+        """Set the quantity of a product, removing its line when the quantity is 0.
+
+        Returns:
+            The updated cart line, or None if it was removed
+        """
+        if quantity <= 0:
+            self.remove(product["id"])
+            return None
+
+        line = self.items.get(product["id"])
+        if line:
+            self._adjust(line["price"], quantity - line["quantity"])
+            line["quantity"] = quantity
+        else:
+            line = {
+                "id": product["id"],
+                "name": product["name"],
+                "price": product["price"],
+                "quantity": quantity,
+            }
+            self.items[product["id"]] = line
+            self._adjust(line["price"], quantity)
+        return line
+
+    def remove(self, product_id, quantity=None):
+        """Remove a quantity of a product, or its whole line without a quantity.
+
+        Returns:
+            The removed line with the removed quantity, or None if the product isn't in the cart
+        """
+        line = self.items.get(product_id)
+        if not line:
+            return None
+
+        if quantity is None or quantity >= line["quantity"]:
+            del self.items[product_id]
+            removed = line["quantity"]
+        else:
+            line["quantity"] -= quantity
+            removed = quantity
+
+        self._adjust(line["price"], -removed)
+        return dict(line, quantity=removed)
+
+    def clear(self):
+        self.items = {}
+        self.total_amount = 0.0
+        self.item_count = 0
+
+    def _adjust(self, price, quantity):
+        # Prices have cents precision, rounding keeps float error from building up
+        self.total_amount = round(self.total_amount + price * quantity, 2)
+        self.item_count += quantity
+
+    @staticmethod
+    def _sum(lines):
+        total_amount = 0.0
+        item_count = 0
+        for line in lines:
+            total_amount += line.get("price", 0) * line.get("quantity", 0)
+            item_count += line.get("quantity", 0)
+        return round(total_amount, 2), item_count
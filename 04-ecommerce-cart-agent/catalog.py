@@ -0,0 +1,386 @@
+import bisect
+import csv
+import difflib
+import heapq
+import json
+import os
+import re
+import sqlite3
+from collections import Counter
+from collections.abc import Mapping
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Most vocabulary tokens a single query token may expand to by prefix
+MAX_PREFIX_EXPANSION = 500
+# Most product names compared character by character in a fuzzy name lookup
+MAX_FUZZY_CANDIDATES = 200
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_product(record):
+    """Convert a raw catalog record into a product dictionary with typed fields.
+
+    Args:
+        record: Mapping read from a CSV row, JSON line or SQLite row
+
+    Returns:
+        Product dictionary with {id, name, price, category, description, stock}
+    """
+    product_id = str(record.get("id") or "").strip()
+    if not product_id:
+        raise ValueError(f"Product record without an id: {dict(record)}")
+
+    product = dict(record)
+    product["id"] = product_id
+    product["name"] = str(record.get("name") or "").strip()
+    product["price"] = float(record.get("price") or 0.0)
+    product["category"] = str(record.get("category") or "Uncategorized").strip()
+    product["description"] = str(record.get("description") or "").strip()
+    product["stock"] = int(float(record.get("stock") or 0))
+    return product
+
+
+def read_catalog_file(path):
+    """Read product records from a CSV, JSON Lines or SQLite file.
+
+    The SQLite database must have a `products` table with the product fields as columns.
+
+    Args:
+        path: Path of a .csv, .jsonl/.ndjson or .sqlite/.sqlite3/.db file
+
+    Returns:
+        Iterator of raw product records
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    elif extension in (".jsonl", ".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif extension in (".sqlite", ".sqlite3", ".db"):
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        connection.row_factory = sqlite3.Row
+        try:
+            for row in connection.execute("SELECT * FROM products"):
+                yield dict(row)
+        finally:
+            connection.close()
+    else:
+        raise ValueError(f"Unsupported catalog file format: {path}")
+
+
+def encode_cursor(offset):
+    return str(offset)
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return 0
+    try:
+        return max(0, int(cursor))
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class ProductCatalog(Mapping):
+    """Read-only product catalog with category, token and name indexes.
+
+    Indexes are built once at load time so lookups don't scan the catalog:
+    - category index: lowercase category -> product positions, and its in-stock positions
+    - inverted token index: name and description token -> product positions
+    - name token index: name token -> product positions, to rank name matches first
+    - sorted vocabulary and sorted names, for prefix lookups with bisect
+
+    In stock means the `stock` field of the catalog file is positive; the catalog
+    doesn't know about stock reserved or sold since it was loaded.
+
+    The catalog is a mapping of product ID to product dictionary, so code written
+    against a plain dict catalog keeps working.
+    """
+
+    def __init__(self, products):
+        self._products = {}
+        for product in products:
+            product = normalize_product(product)
+            self._products[product["id"]] = product
+
+        self._ids = list(self._products)
+        self._positions = {product_id: position for position, product_id in enumerate(self._ids)}
+        self._categories = {}  # lowercase category -> (display name, positions, in-stock positions)
+        self._position_categories = []  # position -> lowercase category
+        self._in_stock_positions = []
+        self._postings = {}  # token -> positions of products with it in name or description
+        self._name_postings = {}  # token -> positions of products with it in name
+        self._fuzzy_buckets = {}  # first character -> tokens
+
+        for position, product in enumerate(self._products.values()):
+            key = product["category"].lower()
+            if key not in self._categories:
+                self._categories[key] = (product["category"], [], [])
+            self._categories[key][1].append(position)
+            self._position_categories.append(key)
+            if product["stock"] > 0:
+                self._categories[key][2].append(position)
+                self._in_stock_positions.append(position)
+
+            name_tokens = set(tokenize(product["name"]))
+            for token in name_tokens:
+                self._name_postings.setdefault(token, []).append(position)
+            for token in name_tokens | set(tokenize(product["description"])):
+                self._postings.setdefault(token, []).append(position)
+
+        self._vocabulary = sorted(self._postings)
+        for token in self._vocabulary:
+            self._fuzzy_buckets.setdefault(token[0], []).append(token)
+        self._sort_names = [product["name"].lower() for product in self._products.values()]
+        self._names = sorted((name, position) for position, name in enumerate(self._sort_names))
+        self._in_stock = bytearray(len(self._ids))
+        for position in self._in_stock_positions:
+            self._in_stock[position] = 1
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a catalog from a CSV, JSON Lines or SQLite file."""
+        return cls(read_catalog_file(path))
+
+    def __getitem__(self, product_id):
+        return self._products[product_id]
+
+    def __iter__(self):
+        return iter(self._products)
+
+    def __len__(self):
+        return len(self._products)
+
+    def categories(self):
+        """Return the catalog categories with their product counts, sorted by name."""
+        return sorted(
+            (
+                {"category": name, "product_count": len(positions)}
+                for name, positions, _ in self._categories.values()
+            ),
+            key=lambda entry: entry["category"],
+        )
+
+    def products_in_category(self, category=None):
+        """Return every product of a category, or the whole catalog without one."""
+        return [self._product(position) for position in self._category_positions(category)]
+
+    def list_products(self, category=None, limit=DEFAULT_PAGE_SIZE, cursor=None, in_stock_only=False,
+                      exclude=None):
+        """List products in catalog order, optionally of one category, one page at a time.
+
+        Args:
+            category: Category to filter by (optional)
+            limit: Maximum number of products in the page
+            cursor: Cursor returned with the previous page (optional)
+            in_stock_only: Skip products without catalog stock
+            exclude: IDs of products to skip, e.g. the ones sold out since the catalog was loaded
+
+        Returns:
+            Page dictionary with {products, total_count, next_cursor}
+        """
+        positions = self._category_positions(category, in_stock_only)
+        if not exclude:
+            return self._page(positions, limit, cursor)
+
+        # Costs the size of the page and of the exclusions, not of the listed products
+        key = category.lower() if category else None
+        excluded = {
+            position for position in map(self._positions.get, exclude)
+            if position is not None
+            and (key is None or self._position_categories[position] == key)
+            and (not in_stock_only or self._in_stock[position])
+        }
+        limit = self._limit(limit)
+        offset = decode_cursor(cursor)
+        page = []
+        index = offset
+        while index < len(positions) and len(page) < limit:
+            if positions[index] not in excluded:
+                page.append(positions[index])
+            index += 1
+        while index < len(positions) and positions[index] in excluded:
+            index += 1
+
+        return {
+            "products": [self._product(position) for position in page],
+            "total_count": len(positions) - len(excluded),
+            "next_cursor": encode_cursor(index) if index < len(positions) else None,
+        }
+
+    def search(self, query, category=None, limit=DEFAULT_PAGE_SIZE, cursor=None,
+               in_stock_only=False, fuzzy=True):
+        """Search products by name and description tokens, one page at a time.
+
+        Every query token must match a token of the product, exactly or as a
+        prefix ("head" matches "headphones"), or as a part of it when no catalog
+        token starts with it ("phone" matches "smartphone"). Products matching in their name
+        and matching whole tokens rank first. When nothing matches and `fuzzy`
+        is set, misspelled query tokens are replaced with their closest catalog
+        tokens ("hedphones" finds "headphones").
+
+        Args:
+            query: Search text
+            category: Category to filter by (optional)
+            limit: Maximum number of products in the page
+            cursor: Cursor returned with the previous page (optional)
+            in_stock_only: Skip products without catalog stock
+            fuzzy: Fall back to fuzzy token matching when nothing matches
+
+        Returns:
+            Page dictionary with {products, total_count, next_cursor}
+        """
+        scores = self._match_scores(tokenize(query), category, in_stock_only)
+        if not scores and fuzzy:
+            corrected = [self._closest_token(token) for token in tokenize(query)]
+            if corrected and all(corrected):
+                scores = self._match_scores(corrected, category, in_stock_only)
+
+        # Only rank as many matches as the requested page needs
+        limit = self._limit(limit)
+        offset = decode_cursor(cursor)
+        ranked = heapq.nsmallest(
+            offset + limit, scores, key=lambda p: (-scores[p], self._sort_names[p])
+        )
+        return self._page_of(ranked[offset:], len(scores), offset)
+
+    def find_by_name_prefix(self, prefix, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """Find products whose name starts with a prefix, in name order.
+
+        Args:
+            prefix: Case-insensitive name prefix
+            limit: Maximum number of products in the page
+            cursor: Cursor returned with the previous page (optional)
+
+        Returns:
+            Page dictionary with {products, total_count, next_cursor}
+        """
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._names, (prefix,))
+        end = bisect.bisect_left(self._names, (prefix + "\uffff",))
+        return self._page([position for _, position in self._names[start:end]], limit, cursor)
+
+    def find_by_fuzzy_name(self, name, limit=5, cutoff=0.6):
+        """Find the products whose names are closest to a possibly misspelled name.
+
+        Args:
+            name: Product name as typed by the user
+            limit: Maximum number of products returned
+            cutoff: Minimum similarity between 0 and 1
+
+        Returns:
+            List of (product, similarity) tuples, most similar first
+        """
+        name = name.lower()
+        # Only compare the names sharing the most (corrected) tokens with the query
+        shared_tokens = Counter()
+        for token in tokenize(name):
+            closest = token if token in self._name_postings else self._closest_token(token)
+            shared_tokens.update(self._name_postings.get(closest, ()))
+
+        scored = []
+        for position, _ in shared_tokens.most_common(MAX_FUZZY_CANDIDATES):
+            matcher = difflib.SequenceMatcher(None, name, self._sort_names[position])
+            if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                ratio = matcher.ratio()
+                if ratio >= cutoff:
+                    scored.append((ratio, position))
+
+        scored.sort(key=lambda entry: (-entry[0], self._ids[entry[1]]))
+        return [(self._product(position), round(ratio, 3)) for ratio, position in scored[:limit]]
+
+    def _product(self, position):
+        return self._products[self._ids[position]]
+
+    def _category_positions(self, category, in_stock_only=False):
+        if not category:
+            return self._in_stock_positions if in_stock_only else range(len(self._ids))
+        entry = self._categories.get(category.lower())
+        if not entry:
+            return []
+        return entry[2] if in_stock_only else entry[1]
+
+    def _expand_token(self, token):
+        """Return the vocabulary tokens starting with a query token, or else containing it."""
+        start = bisect.bisect_left(self._vocabulary, token)
+        end = bisect.bisect_left(self._vocabulary, token + "\uffff", start)
+        if end > start:
+            return self._vocabulary[start:min(end, start + MAX_PREFIX_EXPANSION)]
+
+        # Scans the vocabulary, which is much smaller than the catalog
+        return [
+            vocabulary_token for vocabulary_token in self._vocabulary if token in vocabulary_token
+        ][:MAX_PREFIX_EXPANSION]
+
+    def _closest_token(self, token):
+        # Typos rarely hit the first character, so only compare tokens sharing it
+        bucket = [
+            candidate for candidate in self._fuzzy_buckets.get(token[0], [])
+            if abs(len(candidate) - len(token)) <= 2
+        ]
+        matches = difflib.get_close_matches(token, bucket, n=1, cutoff=0.75)
+        return matches[0] if matches else None
+
+    def _match_scores(self, tokens, category, in_stock_only):
+        """Score the products matching every token, name and whole-token matches weigh most."""
+        if not tokens:
+            return {}
+
+        scores = None
+        for token in tokens:
+            token_scores = {}
+            for vocabulary_token in self._expand_token(token):
+                exact = vocabulary_token == token
+                for postings, weight in (
+                    (self._name_postings.get(vocabulary_token, ()), 4 if exact else 3),
+                    (self._postings[vocabulary_token], 2 if exact else 1),
+                ):
+                    for position in postings:
+                        if weight > token_scores.get(position, 0):
+                            token_scores[position] = weight
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    position: score + token_scores[position]
+                    for position, score in scores.items()
+                    if position in token_scores
+                }
+            if not scores:
+                return {}
+
+        # Filters only look at the matches, with the per-position category and stock indexes
+        if category:
+            key = category.lower()
+            scores = {p: s for p, s in scores.items() if self._position_categories[p] == key}
+        if in_stock_only:
+            scores = {p: s for p, s in scores.items() if self._in_stock[p]}
+        return scores
+
+    def _limit(self, limit):
+        return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    def _page(self, positions, limit, cursor):
+        limit = self._limit(limit)
+        offset = decode_cursor(cursor)
+        return self._page_of(positions[offset:offset + limit], len(positions), offset)
+
+    def _page_of(self, page, total_count, offset):
+        next_offset = offset + len(page)
+        return {
+            "products": [self._product(position) for position in page],
+            "total_count": total_count,
+            "next_cursor": encode_cursor(next_offset) if next_offset < total_count else None,
+        }
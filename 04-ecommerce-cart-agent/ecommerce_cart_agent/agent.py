@@ -20,9 +20,11 @@ root_agent = Agent(
 
     **Cart Information:**
     <cart_info>
-    Cart Items: {cart_items}
+    Cart Lines: {cart_line_count}
+    Item Count: {item_count}
     Total Amount: ${total_amount:.2f}
     </cart_info>
+    The cart contents aren't listed here, route to the Cart Manager Agent to see them.
 
     **Order History:**
     <order_history>
@@ -40,12 +42,9 @@ root_agent = Agent(
     **Use for:** Product viewing and availability checking
     - When users want to see all available products
     - When they need to check if a specific product is available
-    - Questions like: "What products do you have?", "Is laptop available?"
-    
-    **Available Products:**
-    - Gaming Laptop ($999.99) - laptop_001
-    - Wireless Headphones ($199.99) - headphones_001  
-    - Coffee Beans ($19.99) - coffee_001
+    - When they want to search the catalog or browse a category
+    - Questions like: "What products do you have?", "Is laptop available?", "Search for headphones"
+    - The catalog is large: never list products from memory, let the Inventory Agent look them up
 
     ## 2. Cart Manager Agent  
     **Use for:** All cart-related operations
@@ -106,11 +105,6 @@ root_agent = Agent(
     - if user is greeting, respond warmly and offer assistance with shopping
     - if user is asking for something not related to shopping, politely inform them that you can only assist with shopping-related queries
     
-    **Available Products:**
-    - Gaming Laptop ($999.99) - ID: laptop_001
-    - Wireless Headphones ($199.99) - ID: headphones_001
-    - Coffee Beans ($19.99) - ID: coffee_001
-
     **Shopping Policies:**
     - Free shipping on orders over $50
     - 8% tax on all orders  
@@ -6,102 +6,229 @@ from google.adk.tools.tool_context import ToolContext
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from utils import get_product_by_id, calculate_cart_total
+from utils import STOCK_RESERVATIONS, Cart, InsufficientStockError, get_product_by_id
+
+# Most lines a cart view returns, so large carts don't flood the prompt
+MAX_CART_LINES_PER_VIEW = 50
+
+
+def cart_response(cart, message, errors=None):
+    response = {
+        "status": "success" if not errors else "partial_success",
+        "message": message,
+        "item_count": cart.item_count,
+        "total_amount": cart.total_amount,
+    }
+    if errors:
+        response["errors"] = errors
+    return response
+
+
+def stock_error_message(product, error):
+    return f"Only {error.available} x {product['name']} available."
+
+
+def set_line_quantities(cart, targets, errors):
+    """Reserve the stock of new line quantities, and update the lines whose stock was reserved.
+
+    Args:
+        cart: The cart to update
+        targets: Mapping of product ID -> (product, new quantity)
+        errors: List the lines without enough stock are added to
+
+    Returns:
+        Number of updated lines
+    """
+    if not targets:
+        return 0
+
+    stock_errors = STOCK_RESERVATIONS.reserve_many(
+        cart.cart_id, {product_id: quantity for product_id, (_, quantity) in targets.items()}
+    )
+    failed = {error.product_id: error for error in stock_errors}
+
+    for product_id, (product, quantity) in targets.items():
+        if product_id in failed:
+            errors.append({"product_id": product_id, "message": stock_error_message(product, failed[product_id])})
+        else:
+            cart.set_quantity(product, quantity)
+    return len(targets) - len(failed)
 
 
 def add_item_to_cart(tool_context: ToolContext, product_id: str, quantity: int) -> dict:
-    """Add an item to the shopping cart."""
+    """Add an item to the shopping cart, reserving its stock."""
+    if quantity <= 0:
+        return {"status": "error", "message": "Quantity must be greater than 0."}
+
     product = get_product_by_id(product_id)
     if not product:
         return {"status": "error", "message": f"Product '{product_id}' not found."}
-    
-    if quantity <= 0:
-        return {"status": "error", "message": "Quantity must be greater than 0."}
-    
-    if quantity > product.get("stock", 0):
-        return {"status": "error", "message": f"Only {product.get('stock', 0)} items available."}
-    
-    current_cart = tool_context.state.get("cart_items", [])
-    new_cart = []
-    item_exists = False
-    
-    for item in current_cart:
-        if item.get("id") == product_id:
-            new_quantity = item.get("quantity", 0) + quantity
-            if new_quantity > product.get("stock", 0):
-                return {"status": "error", "message": "Not enough stock available."}
-            new_cart.append({
-                "id": product_id,
-                "name": product["name"],
-                "price": product["price"],
-                "quantity": new_quantity
-            })
-            item_exists = True
-        else:
-            new_cart.append(item)
-    
-    if not item_exists:
-        new_cart.append({
-            "id": product_id,
-            "name": product["name"],
-            "price": product["price"],
-            "quantity": quantity
-        })
-    
-    tool_context.state["cart_items"] = new_cart
-    tool_context.state["total_amount"] = calculate_cart_total(new_cart)
-    
-    return {
-        "status": "success",
-        "message": f"Added {quantity} x {product['name']} to cart."
-    }
 
+    cart = Cart.from_state(tool_context.state)
+    try:
+        STOCK_RESERVATIONS.reserve(cart.cart_id, product_id, cart.quantity(product_id) + quantity)
+    except InsufficientStockError as e:
+        return {"status": "error", "message": stock_error_message(product, e)}
+
+    cart.add(product, quantity)
+    cart.save(tool_context.state)
+
+    return cart_response(cart, f"Added {quantity} x {product['name']} to cart.")
+
+
+def add_items_to_cart(tool_context: ToolContext, product_ids: list[str], quantities: list[int]) -> dict:
+    """
+    Add many items to the shopping cart in one call, reserving their stock.
+
+    Args:
+        product_ids: The product IDs to add
+        quantities: The quantity to add of each product, in the same order as product_ids
+
+    Returns:
+        Dictionary with the cart totals, and the lines that couldn't be added
+    """
+    if len(product_ids) != len(quantities):
+        return {"status": "error", "message": "product_ids and quantities must have the same length."}
+
+    cart = Cart.from_state(tool_context.state)
+    targets = {}
+    errors = []
+    for product_id, quantity in zip(product_ids, quantities):
+        if quantity <= 0:
+            errors.append({"product_id": product_id, "message": "Quantity must be greater than 0."})
+            continue
+        product = get_product_by_id(product_id)
+        if not product:
+            errors.append({"product_id": product_id, "message": f"Product '{product_id}' not found."})
+            continue
+        current = targets[product_id][1] if product_id in targets else cart.quantity(product_id)
+        targets[product_id] = (product, current + quantity)
+
+    added = set_line_quantities(cart, targets, errors)
+    if not added:
+        return {"status": "error", "message": "No items were added to cart.", "errors": errors}
+
+    cart.save(tool_context.state)
+    return cart_response(cart, f"Added {added} of {len(product_ids)} lines to cart.", errors)
+
+
+def remove_item_from_cart(tool_context: ToolContext, product_id: str, quantity: int = 0) -> dict:
+    """
+    Remove an item from the shopping cart, releasing its stock.
+
+    Args:
+        product_id: The product ID to remove
+        quantity: The quantity to remove, 0 to remove the whole line
+    """
+    cart = Cart.from_state(tool_context.state)
+    removed_item = cart.remove(product_id, quantity or None)
 
-def remove_item_from_cart(tool_context: ToolContext, product_id: str) -> dict:
-    """Remove an item from the shopping cart."""
-    current_cart = tool_context.state.get("cart_items", [])
-    new_cart = []
-    removed_item = None
-    
-    for item in current_cart:
-        if item.get("id") == product_id:
-            removed_item = item
-        else:
-            new_cart.append(item)
-    
     if not removed_item:
         return {"status": "error", "message": f"Product '{product_id}' not found in cart."}
-    
-    tool_context.state["cart_items"] = new_cart
-    tool_context.state["total_amount"] = calculate_cart_total(new_cart)
-    
-    return {
-        "status": "success",
-        "message": f"Removed {removed_item['name']} from cart."
-    }
 
+    STOCK_RESERVATIONS.reserve(cart.cart_id, product_id, cart.quantity(product_id))
+    cart.save(tool_context.state)
+
+    return cart_response(
+        cart, f"Removed {removed_item['quantity']} x {removed_item['name']} from cart."
+    )
+
+
+def remove_items_from_cart(tool_context: ToolContext, product_ids: list[str]) -> dict:
+    """
+    Remove many lines from the shopping cart in one call, releasing their stock.
+
+    Args:
+        product_ids: The product IDs whose lines to remove
+
+    Returns:
+        Dictionary with the cart totals, and the product IDs that weren't in the cart
+    """
+    cart = Cart.from_state(tool_context.state)
+    removed = []
+    errors = []
+    for product_id in product_ids:
+        if cart.remove(product_id):
+            removed.append(product_id)
+        else:
+            errors.append({"product_id": product_id, "message": "Not found in cart."})
+
+    if not removed:
+        return {"status": "error", "message": "No items were removed from cart.", "errors": errors}
 
-def view_cart(tool_context: ToolContext) -> dict:
-    """View the current shopping cart contents."""
-    cart_items = tool_context.state.get("cart_items", [])
-    total_amount = tool_context.state.get("total_amount", 0.0)
-    
-    if not cart_items:
+    STOCK_RESERVATIONS.reserve_many(cart.cart_id, dict.fromkeys(removed, 0))
+    cart.save(tool_context.state)
+    return cart_response(cart, f"Removed {len(removed)} lines from cart.", errors)
+
+
+def update_cart_item_quantities(
+    tool_context: ToolContext, product_ids: list[str], quantities: list[int]
+) -> dict:
+    """
+    Set the quantity of many cart lines in one call, reserving or releasing their stock.
+    A quantity of 0 removes the line.
+
+    Args:
+        product_ids: The product IDs to update
+        quantities: The new quantity of each product, in the same order as product_ids
+
+    Returns:
+        Dictionary with the cart totals, and the lines that couldn't be updated
+    """
+    if len(product_ids) != len(quantities):
+        return {"status": "error", "message": "product_ids and quantities must have the same length."}
+
+    cart = Cart.from_state(tool_context.state)
+    targets = {}
+    errors = []
+    for product_id, quantity in zip(product_ids, quantities):
+        if quantity < 0:
+            errors.append({"product_id": product_id, "message": "Quantity can't be negative."})
+            continue
+        product = get_product_by_id(product_id) or cart.get(product_id)
+        if not product:
+            errors.append({"product_id": product_id, "message": f"Product '{product_id}' not found."})
+            continue
+        targets[product_id] = (product, quantity)
+
+    updated = set_line_quantities(cart, targets, errors)
+    if not updated:
+        return {"status": "error", "message": "No cart lines were updated.", "errors": errors}
+
+    cart.save(tool_context.state)
+    return cart_response(cart, f"Updated {updated} of {len(product_ids)} cart lines.", errors)
+
+
+def view_cart(tool_context: ToolContext, offset: int = 0) -> dict:
+    """
+    View the current shopping cart contents.
+
+    Args:
+        offset: Number of cart lines to skip, to view large carts page by page
+    """
+    cart = Cart.from_state(tool_context.state)
+
+    if not len(cart):
         return {"status": "empty", "message": "Your cart is empty.", "cart_items": [], "total_amount": 0.0}
-    
-    item_count = sum(item.get("quantity", 0) for item in cart_items)
+
+    lines = cart.lines(offset, MAX_CART_LINES_PER_VIEW)
     return {
         "status": "success",
-        "message": f"Your cart contains {item_count} items.",
-        "cart_items": cart_items,
-        "total_amount": total_amount
+        "message": f"Your cart contains {cart.item_count} items in {len(cart)} lines.",
+        "cart_items": lines,
+        "line_count": len(cart),
+        "item_count": cart.item_count,
+        "total_amount": cart.total_amount,
+        "next_offset": offset + len(lines) if offset + len(lines) < len(cart) else None,
     }
 
 
 def clear_cart(tool_context: ToolContext) -> dict:
-    """Clear all items from the shopping cart."""
-    tool_context.state["cart_items"] = []
-    tool_context.state["total_amount"] = 0.0
+    """Clear all items from the shopping cart, releasing their stock."""
+    cart = Cart.from_state(tool_context.state)
+    STOCK_RESERVATIONS.release(cart.cart_id)
+    cart.clear()
+    cart.save(tool_context.state)
     return {"status": "success", "message": "Cart has been cleared."}
 
 
@@ -112,22 +239,33 @@ cart_manager_agent = Agent(
     description="Cart management agent for adding, removing, and viewing cart items",
     instruction="""You are the cart management agent for an ecommerce store.
 
-Available Products:
-- laptop_001: Gaming Laptop ($999.99)
-- headphones_001: Wireless Headphones ($199.99) 
-- mobile_001: Smartphone ($599.99)
-
 Your tools:
-- add_item_to_cart(product_id, quantity): Add items to cart
-- remove_item_from_cart(product_id): Remove items from cart
-- view_cart(): Show cart contents
+- add_item_to_cart(product_id, quantity): Add an item to cart
+- add_items_to_cart(product_ids, quantities): Add many items to cart in one call
+- remove_item_from_cart(product_id, quantity): Remove a quantity of an item, or the whole line with quantity 0
+- remove_items_from_cart(product_ids): Remove many lines in one call
+- update_cart_item_quantities(product_ids, quantities): Set the quantity of many lines in one call, 0 removes a line
+- view_cart(offset): Show cart contents, 50 lines at a time
 - clear_cart(): Empty the cart
 
-Product ID Mapping:
-- laptop → laptop_001
-- headphones → headphones_001  
-- mobile/phone → mobile_001
+Adding items reserves their stock for the user until checkout, so an item
+can be out of stock even if it was available a moment ago. Removing items
+gives their stock back.
+
+When the user changes several lines at once, use the bulk tools in a single call
+instead of calling the single item tools once per line.
+
+Use exact product IDs. If you don't know the ID of a product the user names,
+ask the inventory agent to search the catalog for it.
 
 Be helpful and validate all operations.""",
-    tools=[add_item_to_cart, remove_item_from_cart, view_cart, clear_cart],
+    tools=[
+        add_item_to_cart,
+        add_items_to_cart,
+        remove_item_from_cart,
+        remove_items_from_cart,
+        update_cart_item_quantities,
+        view_cart,
+        clear_cart,
+    ],
 )
@@ -9,7 +9,9 @@ from google.adk.tools.tool_context import ToolContext
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from utils import calculate_cart_total
+from utils import STOCK_RESERVATIONS, Cart, InsufficientStockError, append_to_history
+
+PAYMENT_METHODS = ["credit_card", "paypal", "apple_pay"]
 
 
 def calculate_checkout_summary(tool_context: ToolContext) -> dict:
@@ -19,15 +21,15 @@ def calculate_checkout_summary(tool_context: ToolContext) -> dict:
     Returns:
         Dictionary with checkout breakdown
     """
-    cart_items = tool_context.state.get("cart_items", [])
+    cart = Cart.from_state(tool_context.state)
     
-    if not cart_items:
+    if not len(cart):
         return {
             "status": "error",
             "message": "Cannot checkout with an empty cart."
         }
     
-    subtotal = calculate_cart_total(cart_items)
+    subtotal = cart.total_amount
     tax_rate = 0.08  # 8% tax
     tax_amount = subtotal * tax_rate
     
@@ -47,25 +49,27 @@ def calculate_checkout_summary(tool_context: ToolContext) -> dict:
             "total_amount": total_amount,
             "free_shipping_eligible": subtotal >= 50.0
         },
-        "cart_items": cart_items,
-        "item_count": sum(item.get("quantity", 0) for item in cart_items)
+        "line_count": len(cart),
+        "item_count": cart.item_count
     }
 
 
-def process_checkout(tool_context: ToolContext) -> dict:
+def process_checkout(tool_context: ToolContext, payment_method: str) -> dict:
     """
     Process the checkout and create an order.
-    Agent will specify payment method and address in conversation context.
+    The reserved stock of the cart items is taken off hand, all items or none.
+    
+    Args:
+        payment_method: One of credit_card, paypal or apple_pay
     
     Returns:
-        Dictionary with checkout status and available options
+        Dictionary with the placed order
     """
-    cart_items = tool_context.state.get("cart_items", [])
-    
-    if not cart_items:
+    if payment_method not in PAYMENT_METHODS:
         return {
             "status": "error",
-            "message": "Cannot checkout with an empty cart."
+            "message": f"Unsupported payment method '{payment_method}'.",
+            "available_payment_methods": PAYMENT_METHODS,
         }
     
     # Calculate checkout summary
@@ -74,14 +78,34 @@ def process_checkout(tool_context: ToolContext) -> dict:
         return summary_result
     
     checkout_summary = summary_result["summary"]
+    cart = Cart.from_state(tool_context.state)
     
-    # Return checkout readiness status for agent to process
-    return {
-        "status": "ready_for_checkout",
-        "message": "Ready to process checkout. Agent should specify payment method in conversation.",
-        "checkout_summary": checkout_summary,
-        "available_payment_methods": ["credit_card", "paypal", "apple_pay"],
-        "instruction": "Agent should specify payment method and process order based on user selection"
+    # Take the purchased stock off hand, reserving again any reservation that expired
+    try:
+        STOCK_RESERVATIONS.commit(
+            cart.cart_id, {item["id"]: item["quantity"] for item in cart.lines()}
+        )
+    except InsufficientStockError as e:
+        item = cart.get(e.product_id)
+        return {
+            "status": "error",
+            "message": f"Only {e.available} x {item['name']} left in stock, please update your cart.",
+            "product_id": e.product_id,
+            "available_stock": e.available,
+        }
+    
+    order_id = f"ORD-{uuid.uuid4().hex[:8].upper()}"
+    order_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    order = {
+        "order_id": order_id,
+        "order_date": order_date,
+        "items": cart.lines(),
+        "subtotal": checkout_summary["subtotal"],
+        "tax_amount": checkout_summary["tax_amount"],
+        "shipping_cost": checkout_summary["shipping_cost"],
+        "total_amount": checkout_summary["total_amount"],
+        "payment_method": payment_method,
+        "status": "confirmed",
     }
     
     # Add to order history
@@ -90,18 +114,18 @@ def process_checkout(tool_context: ToolContext) -> dict:
     tool_context.state["order_history"] = current_orders
     
     # Clear the cart
-    tool_context.state["cart_items"] = []
-    tool_context.state["total_amount"] = 0.0
+    cart.clear()
+    cart.save(tool_context.state)
     
     # Add to interaction history
-    current_history = tool_context.state.get("interaction_history", [])
-    current_history.append({
+    history_changes = append_to_history(tool_context.state, {
         "action": "checkout_completed",
         "order_id": order_id,
         "total_amount": checkout_summary["total_amount"],
         "timestamp": order_date
     })
-    tool_context.state["interaction_history"] = current_history
+    for key, value in history_changes.items():
+        tool_context.state[key] = value
     
     return {
         "status": "success",
@@ -196,9 +220,11 @@ checkout_agent = Agent(
     </user_info>
 
     <cart_info>
-    Cart Items: {cart_items}
+    Cart Lines: {cart_line_count}
+    Item Count: {item_count}
     Total Amount: ${total_amount:.2f}
     </cart_info>
+    The cart contents aren't listed here, use calculate_checkout_summary() for the order breakdown.
 
     <order_history>
     Order History: {order_history}
@@ -212,7 +238,7 @@ checkout_agent = Agent(
 
     1. **Checkout Process**
        - Use calculate_checkout_summary() to show order breakdown with taxes and shipping
-       - Use process_checkout() to complete orders - specify payment method in conversation
+       - Use process_checkout(payment_method) to complete orders once the user has chosen a payment method
        - Handle payment methods: credit_card, paypal, apple_pay
 
     2. **Order Management**
@@ -224,6 +250,8 @@ checkout_agent = Agent(
     - 8% tax applied to all orders
     - Standard shipping cost: $9.99
     - Estimated delivery: 3-5 business days
+    - Cart items are reserved for the user; if checkout reports an item is no longer in stock,
+      ask the user to update their cart
 
     **Guidelines:**
     - Always show order summary before processing checkout
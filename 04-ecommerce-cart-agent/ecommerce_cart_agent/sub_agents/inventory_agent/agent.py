@@ -1,108 +1,196 @@
 from google.adk.agents import Agent
 from google.adk.tools.tool_context import ToolContext
-from typing import Optional
 
 # Import the product catalog and utility functions
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from utils import PRODUCT_CATALOG, get_product_by_id, get_products_by_category, search_products
+from utils import PRODUCT_CATALOG, STOCK_RESERVATIONS, get_product_by_id, list_products_page, search_products_page
 
+# Hard caps on tool responses, so prompt size stays flat as the catalog grows
+MAX_RESULTS_PER_CALL = 25
+MAX_CATEGORIES = 50
+MAX_DESCRIPTION_LENGTH = 300
 
-def view_available_products(tool_context: ToolContext) -> dict:
-    """
-    View all available products.
-    
-    Returns:
-        Dictionary with list of available products
-    """
-    products = list(PRODUCT_CATALOG.values())
-    
-    # Filter out products with 0 stock
-    available_products = [p for p in products if p.get("stock", 0) > 0]
-    
+
+def compact_product(product, stock):
+    """Project a product onto the fields needed to list it, with its available stock."""
+    return {
+        "id": product["id"],
+        "name": product["name"],
+        "price": product["price"],
+        "category": product["category"],
+        "stock": stock,
+    }
+
+
+def compact_products(products):
+    """Project products with their available stock, as check_product_availability reports it."""
+    available = STOCK_RESERVATIONS.available_many(product["id"] for product in products)
+    return [compact_product(product, available[product["id"]]) for product in products]
+
+
+def product_page_response(page, message):
+    """Build a tool response from a catalog page, with compact product projections."""
     return {
         "status": "success",
-        "message": f"Found {len(available_products)} available products",
-        "products": available_products,
-        "total_count": len(available_products)
+        "message": message,
+        "products": compact_products(page["products"]),
+        "total_count": page["total_count"],
+        "next_cursor": page["next_cursor"] or "",
+    }
+
+
+def not_found_response(product_id):
+    """Build a product not found response, suggesting products with similar names."""
+    suggestions = PRODUCT_CATALOG.find_by_fuzzy_name(product_id.replace("_", " "), limit=3)
+    return {
+        "status": "error",
+        "message": f"Product '{product_id}' not found.",
+        "suggestions": compact_products([product for product, _ in suggestions]),
     }
 
 
-def get_product_details(tool_context: ToolContext) -> dict:
+def view_available_products(
+    tool_context: ToolContext, category: str = "", limit: int = 10, cursor: str = ""
+) -> dict:
+    """
+    View in-stock products, optionally of one category, one page at a time.
+    Products fully reserved in other shoppers' carts aren't listed.
+
+    Args:
+        category: Category to filter by, empty for all categories
+        limit: Maximum number of products to return (at most 25)
+        cursor: next_cursor of the previous page, empty for the first page
+
+    Returns:
+        Dictionary with a page of available products and the cursor of the next page
+    """
+    try:
+        page = list_products_page(
+            category=category or None,
+            limit=min(limit, MAX_RESULTS_PER_CALL),
+            cursor=cursor or None,
+            in_stock_only=True,
+        )
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    return product_page_response(
+        page, f"Showing {len(page['products'])} of {page['total_count']} available products"
+    )
+
+
+def search_products_by_name(
+    tool_context: ToolContext,
+    search_term: str,
+    category: str = "",
+    limit: int = 10,
+    cursor: str = "",
+) -> dict:
+    """
+    Search products by name or description, best matches first, one page at a time.
+    Misspelled search terms are matched to the closest product words.
+
+    Args:
+        search_term: Words to search for, e.g. "wireless headphones"
+        category: Category to filter by, empty for all categories
+        limit: Maximum number of products to return (at most 25)
+        cursor: next_cursor of the previous page, empty for the first page
+
+    Returns:
+        Dictionary with a page of matching products and the cursor of the next page
+    """
+    try:
+        page = search_products_page(
+            search_term,
+            category=category or None,
+            limit=min(limit, MAX_RESULTS_PER_CALL),
+            cursor=cursor or None,
+        )
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    return product_page_response(
+        page, f"Found {page['total_count']} products matching '{search_term}'"
+    )
+
+
+def get_product_details(tool_context: ToolContext, product_id: str) -> dict:
     """
     Get detailed information about a specific product.
-    The agent will specify which product in the conversation context.
-    
+
+    Args:
+        product_id: The exact product ID, e.g. laptop_001
+
     Returns:
-        Dictionary with all product details for the agent to choose from
+        Dictionary with the product details, or similar products if the ID is unknown
     """
-    # Since we can't get product_id as parameter, return all products
-    # The agent will filter based on conversation context
-    products = list(PRODUCT_CATALOG.values())
-    
+    product = get_product_by_id(product_id)
+    if not product:
+        return not_found_response(product_id)
+
+    details = dict(product)
+    if len(details.get("description", "")) > MAX_DESCRIPTION_LENGTH:
+        details["description"] = details["description"][:MAX_DESCRIPTION_LENGTH - 3] + "..."
+
     return {
         "status": "success",
-        "message": f"Found {len(products)} products in catalog",
-        "products": products,
-        "instruction": "Agent should select the specific product based on user request"
+        "message": f"Details of {product['name']}",
+        "product": details,
     }
 
 
 def get_product_categories(tool_context: ToolContext) -> dict:
     """
-    Get all available product categories.
-    
+    Get the available product categories with their product counts.
+
     Returns:
         Dictionary with list of available categories
     """
-    categories = set()
-    for product in PRODUCT_CATALOG.values():
-        category = product.get("category", "Uncategorized")
-        categories.add(category)
-    
+    categories = PRODUCT_CATALOG.categories()
+
     return {
         "status": "success",
         "message": f"Found {len(categories)} product categories",
-        "categories": sorted(list(categories)),
-        "total_count": len(categories)
+        "categories": categories[:MAX_CATEGORIES],
+        "total_count": len(categories),
     }
 
 
-def check_product_availability(tool_context: ToolContext) -> dict:
+def check_product_availability(tool_context: ToolContext, product_id: str, quantity: int = 1) -> dict:
     """
-    Check availability of all products.
-    The agent will specify which product in the conversation context.
-    
+    Check whether a product is in stock in the requested quantity, not counting
+    the stock reserved in shopping carts.
+
+    Args:
+        product_id: The exact product ID, e.g. laptop_001
+        quantity: The quantity the user wants
+
     Returns:
-        Dictionary with availability status for all products
+        Dictionary with the available stock and whether the quantity can be fulfilled
     """
-    # Return availability for all products, agent will filter based on context
-    products_with_availability = []
-    
-    for product in PRODUCT_CATALOG.values():
-        stock = product.get("stock", 0)
-        available = stock > 0
-        
-        products_with_availability.append({
-            "product": product,
-            "available_stock": stock,
-            "is_available": available,
-            "status": "available" if available else "out_of_stock"
-        })
-    
+    product = get_product_by_id(product_id)
+    if not product:
+        return not_found_response(product_id)
+
+    stock = STOCK_RESERVATIONS.available(product_id)
     return {
         "status": "success",
-        "message": f"Availability check for {len(products_with_availability)} products",
-        "products_availability": products_with_availability,
-        "instruction": "Agent should select the specific product based on user request"
+        "product_id": product_id,
+        "name": product["name"],
+        "price": product["price"],
+        "available_stock": stock,
+        "is_available": stock > 0,
+        "can_fulfill": stock >= quantity,
+        "availability": "available" if stock > 0 else "out_of_stock",
     }
 
 
 
 # Create the inventory agent
 inventory_agent = Agent(
-    name="inventory_agent", 
+    name="inventory_agent",
     model="gemini-2.0-flash",
     description="Inventory agent for browsing products and checking availability",
     instruction="""
@@ -120,38 +208,32 @@ inventory_agent = Agent(
     **Your capabilities:**
 
     1. **Show Products**
-       - Use view_available_products() to show all available products
+       - Use view_available_products(category, limit, cursor) to list in-stock products
        - Display product name, price, and stock information
-       - Only show products that are in stock
 
-    2. **Get Product Details**
-       - Use get_product_details() to get detailed information about products
-       - Shows all products with their specifications and pricing
+    2. **Search Products**
+       - Use search_products_by_name(search_term, category, limit, cursor) to find products
+       - Use it to find the product ID of any product the user names
 
-    3. **Check Availability**
-       - Use check_product_availability() to check stock availability for all products
-       - Agent will filter and present information for specific products based on user requests
+    3. **Get Product Details**
+       - Use get_product_details(product_id) for the full details of one product
 
-    4. **Browse Categories**
+    4. **Check Availability**
+       - Use check_product_availability(product_id, quantity) to check stock of one product
+
+    5. **Browse Categories**
        - Use get_product_categories() to show available categories
        - Help users browse by product type
 
-    **Product Information:**
-    Our catalog includes:
-    - Electronics (laptops, smartphones, headphones)
-    - Books (programming guides, technical books)  
-    - Clothing (t-shirts, apparel)
-    - Food & Beverage (coffee, snacks)
-    - Audio equipment and accessories
-
-    **Available Products (use these exact product IDs):**
-    - laptop_001: Gaming Laptop ($999.99)
-    - headphones_001: Wireless Headphones ($199.99) 
-    - coffee_001: Coffee Beans ($19.99)
+    **Paging:**
+    - Listing and search results come in pages, with total_count and next_cursor
+    - Ask for a small page (the default of 10 is usually enough)
+    - Only fetch the next page, passing next_cursor as cursor, when the user asks for more
 
     **Guidelines:**
     - Present product information clearly with prices and availability
-    - Always use the exact product IDs: laptop_001, headphones_001, coffee_001
+    - Always use exact product IDs returned by the tools, never guess them
+    - If a product ID is not found, offer the suggested similar products
     - Provide accurate stock information before recommendations
 
     **When users want to:**
@@ -162,5 +244,11 @@ inventory_agent = Agent(
 
     Always be helpful in guiding users through the product catalog and make shopping easy and informative.
     """,
-    tools=[view_available_products, get_product_categories, get_product_details, check_product_availability],
-)
\ No newline at end of file
+    tools=[
+        view_available_products,
+        search_products_by_name,
+        get_product_categories,
+        get_product_details,
+        check_product_availability,
+    ],
+)
@@ -14,9 +14,12 @@ session_service = InMemorySessionService()
 
 initial_state = {
     "user_name": "Rushabh Runwal",
-    "cart_items": [],  
+    "cart_items": {},
     "interaction_history": [],
+    "interaction_count": 0,
     "total_amount": 0.0,
+    "item_count": 0,
+    "cart_line_count": 0,
     "order_history": [],  
 }
 
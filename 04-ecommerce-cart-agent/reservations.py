@@ -0,0 +1,377 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_RESERVATION_TTL_SECONDS = 15 * 60
+
+
+class InsufficientStockError(ValueError):
+    """Raised when a product doesn't have enough unreserved stock for a reservation."""
+
+    def __init__(self, product_id, requested, available):
+        super().__init__(
+            f"Only {available} of '{product_id}' available, {requested} requested."
+        )
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+
+class StockReservations:
+    """SQLite-backed stock levels with reservations held by carts.
+
+    Each product has its stock on hand and the quantity reserved by carts. A cart
+    (the holder) reserves stock as items are added, releases it as they are removed,
+    and commits it at checkout, which takes the stock off hand. Reservations expire
+    after a TTL, so abandoned carts give their stock back; each cart change renews
+    the TTL of all the cart's reservations.
+
+    Operations are atomic across threads and processes sharing the database file:
+    - each operation is one IMMEDIATE transaction, so its reads and writes aren't
+      interleaved with another writer's
+    - the reserved quantity of a product only grows with a compare-and-swap update,
+      `reserved = reserved + n WHERE on_hand - reserved >= n`, so stock can't be
+      oversold even by concurrent reservations of the last units
+    - expired reservations of a product are released in the same transaction,
+      before its reserved quantity is changed
+    """
+
+    def __init__(self, path, ttl_seconds=DEFAULT_RESERVATION_TTL_SECONDS, clock=time.time):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # executescript commits by itself, so the schema isn't created in a _transaction
+        self._connection().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS stock (
+                product_id TEXT PRIMARY KEY,
+                on_hand INTEGER NOT NULL CHECK (on_hand >= 0),
+                reserved INTEGER NOT NULL DEFAULT 0 CHECK (reserved >= 0),
+                catalog_stock INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS reservations (
+                holder_id TEXT NOT NULL,
+                product_id TEXT NOT NULL,
+                quantity INTEGER NOT NULL CHECK (quantity > 0),
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (holder_id, product_id)
+            );
+            CREATE INDEX IF NOT EXISTS reservations_by_product
+                ON reservations (product_id, expires_at);
+            CREATE INDEX IF NOT EXISTS reservations_by_expiry
+                ON reservations (expires_at);
+            CREATE INDEX IF NOT EXISTS stock_by_unreserved
+                ON stock (on_hand - reserved) WHERE catalog_stock > 0;
+            """
+        )
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads, so each thread has its own
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def sync_products(self, products):
+        """Add the stock of products not tracked yet, keeping the stock of known products.
+
+        Args:
+            products: Iterable of product dictionaries with {id, stock}
+        """
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO stock (product_id, on_hand, catalog_stock) VALUES (?, ?, ?)",
+                (
+                    (product["id"], max(0, product.get("stock", 0)), max(0, product.get("stock", 0)))
+                    for product in products
+                ),
+            )
+
+    def set_stock(self, product_id, on_hand):
+        """Set the stock on hand of a product, e.g. after a delivery or a stock count.
+
+        The stock can't go below the quantity held by unexpired reservations: carts
+        keep what they reserved, so stock on hand always covers every reservation
+        and checkouts can't take it below zero. Release the reservations first to
+        take reserved stock away.
+
+        Raises:
+            ValueError: The new stock is negative or below the reserved quantity,
+                the stock is left unchanged
+        """
+        if on_hand < 0:
+            raise ValueError(f"Stock of '{product_id}' can't be negative: {on_hand}")
+
+        with self._transaction() as connection:
+            self._release_expired(connection, product_id, self.clock())
+            row = connection.execute(
+                "SELECT reserved FROM stock WHERE product_id = ?", (product_id,)
+            ).fetchone()
+            if row and on_hand < row[0]:
+                raise ValueError(
+                    f"Can't set the stock of '{product_id}' to {on_hand}, {row[0]} are reserved in carts."
+                )
+            connection.execute(
+                "INSERT INTO stock (product_id, on_hand) VALUES (?, ?) "
+                "ON CONFLICT (product_id) DO UPDATE SET on_hand = excluded.on_hand",
+                (product_id, on_hand),
+            )
+
+    def available(self, product_id):
+        """Return the stock of a product that isn't held by an unexpired reservation."""
+        row = self._connection().execute(
+            """
+            SELECT on_hand - COALESCE(
+                (SELECT SUM(quantity) FROM reservations WHERE product_id = ? AND expires_at > ?), 0
+            )
+            FROM stock WHERE product_id = ?
+            """,
+            (product_id, self.clock(), product_id),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def available_many(self, product_ids):
+        """Return the available stock of many products, as product ID -> quantity, see `available`."""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+        placeholders = ", ".join("?" * len(product_ids))
+        rows = self._connection().execute(
+            f"""
+            SELECT stock.product_id, stock.on_hand - COALESCE(SUM(reservations.quantity), 0)
+            FROM stock LEFT JOIN reservations
+                ON reservations.product_id = stock.product_id AND reservations.expires_at > ?
+            WHERE stock.product_id IN ({placeholders})
+            GROUP BY stock.product_id
+            """,
+            (self.clock(), *product_ids),
+        )
+        available = dict.fromkeys(product_ids, 0)
+        available.update(rows.fetchall())
+        return available
+
+    def unavailable_products(self):
+        """Return the IDs of the products in stock in the catalog that have no available
+        stock left, see `available`.
+
+        The reserved quantities, which can still include expired reservations,
+        narrow the candidates down with the stock_by_unreserved index, so only
+        products that are sold out or nearly so are looked at.
+        """
+        rows = self._connection().execute(
+            """
+            SELECT product_id FROM stock
+            WHERE catalog_stock > 0 AND on_hand - reserved <= 0 AND on_hand - COALESCE(
+                (SELECT SUM(quantity) FROM reservations
+                 WHERE reservations.product_id = stock.product_id AND expires_at > ?), 0
+            ) <= 0
+            """,
+            (self.clock(),),
+        )
+        return {product_id for product_id, in rows}
+
+    def reserved_by(self, holder_id):
+        """Return the unexpired reservations of a holder, as product ID -> quantity."""
+        rows = self._connection().execute(
+            "SELECT product_id, quantity FROM reservations WHERE holder_id = ? AND expires_at > ?",
+            (holder_id, self.clock()),
+        )
+        return dict(rows.fetchall())
+
+    def reserve(self, holder_id, product_id, quantity):
+        """Set the quantity of a product reserved by a holder.
+
+        Growing a reservation takes unreserved stock, shrinking it gives stock back,
+        and a quantity of 0 releases it. The TTL of all the holder's reservations is
+        renewed.
+
+        Raises:
+            InsufficientStockError: The product doesn't have enough unreserved stock,
+                the reservation is left unchanged
+        """
+        with self._transaction() as connection:
+            now = self.clock()
+            self._reserve(connection, holder_id, product_id, quantity, now)
+            self._renew(connection, holder_id, now)
+
+    def reserve_many(self, holder_id, quantities):
+        """Set the reserved quantities of many products at once, see `reserve`.
+
+        Products without enough stock are skipped, the others are reserved.
+
+        Args:
+            holder_id: The cart holding the reservations
+            quantities: Mapping of product ID -> quantity to hold
+
+        Returns:
+            List of InsufficientStockError for the skipped products
+        """
+        errors = []
+        with self._transaction() as connection:
+            now = self.clock()
+            for product_id, quantity in quantities.items():
+                try:
+                    self._reserve(connection, holder_id, product_id, quantity, now)
+                except InsufficientStockError as e:
+                    errors.append(e)
+            self._renew(connection, holder_id, now)
+        return errors
+
+    def release(self, holder_id, product_id=None):
+        """Release a holder's reservation of a product, or all its reservations."""
+        with self._transaction() as connection:
+            if product_id is not None:
+                self._reserve(connection, holder_id, product_id, 0, self.clock())
+                return
+            rows = connection.execute(
+                "SELECT product_id, quantity FROM reservations WHERE holder_id = ?", (holder_id,)
+            ).fetchall()
+            connection.executemany(
+                "UPDATE stock SET reserved = reserved - ? WHERE product_id = ?",
+                ((quantity, product_id) for product_id, quantity in rows),
+            )
+            connection.execute("DELETE FROM reservations WHERE holder_id = ?", (holder_id,))
+
+    def commit(self, holder_id, quantities):
+        """Take the purchased stock off hand, all products or none.
+
+        Reserved quantities are committed from the reservations; quantities not
+        reserved, e.g. because the reservation expired, are reserved again if there
+        is still stock. The holder's other reservations are released.
+
+        Args:
+            holder_id: The cart holding the reservations
+            quantities: Mapping of product ID -> purchased quantity
+
+        Raises:
+            InsufficientStockError: A product doesn't have enough stock, nothing is committed
+        """
+        with self._transaction() as connection:
+            now = self.clock()
+            for product_id, quantity in quantities.items():
+                self._reserve(connection, holder_id, product_id, quantity, now)
+                connection.execute(
+                    "UPDATE stock SET on_hand = on_hand - ?, reserved = reserved - ? "
+                    "WHERE product_id = ?",
+                    (quantity, quantity, product_id),
+                )
+                connection.execute(
+                    "DELETE FROM reservations WHERE holder_id = ? AND product_id = ?",
+                    (holder_id, product_id),
+                )
+
+            rows = connection.execute(
+                "SELECT product_id, quantity FROM reservations WHERE holder_id = ?", (holder_id,)
+            ).fetchall()
+            connection.executemany(
+                "UPDATE stock SET reserved = reserved - ? WHERE product_id = ?",
+                ((quantity, product_id) for product_id, quantity in rows),
+            )
+            connection.execute("DELETE FROM reservations WHERE holder_id = ?", (holder_id,))
+
+    def expire_reservations(self):
+        """Release every expired reservation.
+
+        Expired reservations are also released product by product as products are
+        reserved, this reclaims the rows of carts abandoned for good.
+
+        Returns:
+            Number of reservations released
+        """
+        with self._transaction() as connection:
+            now = self.clock()
+            rows = connection.execute(
+                "SELECT product_id, SUM(quantity) FROM reservations WHERE expires_at <= ? "
+                "GROUP BY product_id",
+                (now,),
+            ).fetchall()
+            connection.executemany(
+                "UPDATE stock SET reserved = reserved - ? WHERE product_id = ?",
+                ((quantity, product_id) for product_id, quantity in rows),
+            )
+            return connection.execute(
+                "DELETE FROM reservations WHERE expires_at <= ?", (now,)
+            ).rowcount
+
+    def _release_expired(self, connection, product_id, now):
+        expired = connection.execute(
+            "SELECT COALESCE(SUM(quantity), 0) FROM reservations "
+            "WHERE product_id = ? AND expires_at <= ?",
+            (product_id, now),
+        ).fetchone()[0]
+        if expired:
+            connection.execute(
+                "UPDATE stock SET reserved = reserved - ? WHERE product_id = ?",
+                (expired, product_id),
+            )
+            connection.execute(
+                "DELETE FROM reservations WHERE product_id = ? AND expires_at <= ?",
+                (product_id, now),
+            )
+
+    def _reserve(self, connection, holder_id, product_id, quantity, now):
+        self._release_expired(connection, product_id, now)
+
+        row = connection.execute(
+            "SELECT quantity FROM reservations WHERE holder_id = ? AND product_id = ?",
+            (holder_id, product_id),
+        ).fetchone()
+        held = row[0] if row else 0
+        change = quantity - held
+
+        if change > 0:
+            # Compare-and-swap: only reserve if the unreserved stock still covers the change
+            updated = connection.execute(
+                "UPDATE stock SET reserved = reserved + ? "
+                "WHERE product_id = ? AND on_hand - reserved >= ?",
+                (change, product_id, change),
+            ).rowcount
+            if not updated:
+                row = connection.execute(
+                    "SELECT on_hand - reserved FROM stock WHERE product_id = ?", (product_id,)
+                ).fetchone()
+                raise InsufficientStockError(product_id, quantity, held + (row[0] if row else 0))
+        elif change < 0:
+            connection.execute(
+                "UPDATE stock SET reserved = reserved + ? WHERE product_id = ?",
+                (change, product_id),
+            )
+
+        if quantity > 0:
+            connection.execute(
+                "INSERT INTO reservations (holder_id, product_id, quantity, expires_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (holder_id, product_id) "
+                "DO UPDATE SET quantity = excluded.quantity, expires_at = excluded.expires_at",
+                (holder_id, product_id, quantity, now + self.ttl_seconds),
+            )
+        elif row:
+            connection.execute(
+                "DELETE FROM reservations WHERE holder_id = ? AND product_id = ?",
+                (holder_id, product_id),
+            )
+
+    def _renew(self, connection, holder_id, now):
+        connection.execute(
+            "UPDATE reservations SET expires_at = ? WHERE holder_id = ?",
+            (now + self.ttl_seconds, holder_id),
+        )
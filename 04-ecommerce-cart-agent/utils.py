@@ -1,7 +1,13 @@
+import os
 from datetime import datetime
 
+from google.adk.events import Event, EventActions
 from google.genai import types
 
+from cart import Cart
+from catalog import DEFAULT_PAGE_SIZE, ProductCatalog
+from reservations import DEFAULT_RESERVATION_TTL_SECONDS, InsufficientStockError, StockReservations
+
 
 # ANSI color codes for terminal output
 class Colors:
@@ -30,9 +36,40 @@ class Colors:
     BG_WHITE = "\033[47m"
 
 
+# Most recent interactions kept in session state, older ones are dropped as new ones come in
+INTERACTION_HISTORY_LIMIT = 20
+# Interactions shown by display_state
+DISPLAYED_INTERACTIONS = 3
+
+
+def append_to_history(state, entry, limit=INTERACTION_HISTORY_LIMIT):
+    """Build the state changes that append an entry to the capped interaction history.
+
+    The history is a ring buffer of the last `limit` entries, so an append costs the
+    same however long the session runs. interaction_count counts every entry ever
+    appended.
+
+    Args:
+        state: The session state (or tool context state) holding the history
+        entry: The interaction entry to append
+        limit: Maximum number of entries kept
+
+    Returns:
+        Dictionary of the changed state keys and their values
+    """
+    history = state.get("interaction_history", [])
+    return {
+        "interaction_history": (history + [entry])[-limit:],
+        "interaction_count": state.get("interaction_count", len(history)) + 1,
+    }
+
+
 def update_interaction_history(session_service, app_name, user_id, session_id, entry):
     """Add an entry to the interaction history in state.
 
+    The entry is appended with an event carrying only the changed history keys, so
+    the rest of the session state isn't copied or rewritten.
+
     Args:
         session_service: The session service instance
         app_name: The application name
@@ -48,26 +85,17 @@ def update_interaction_history(session_service, app_name, user_id, session_id, e
             app_name=app_name, user_id=user_id, session_id=session_id
         )
 
-        # Get current interaction history
-        current_history = session.state.get("interaction_history", [])
-
         # Add timestamp to entry if not present
         if "timestamp" not in entry:
             entry["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        # Create new history list
-        updated_history = current_history + [entry]
-
-        # Create updated state
-        updated_state = session.state.copy()
-        updated_state["interaction_history"] = updated_history
-
-        # Create a new session with updated state
-        session_service.create_session(
-            app_name=app_name,
-            user_id=user_id,
-            session_id=session_id,
-            state=updated_state,
+        # Append the entry as a state change of the session
+        session_service.append_event(
+            session,
+            Event(
+                author="system",
+                actions=EventActions(state_delta=append_to_history(session.state, entry)),
+            ),
         )
 
         return True
@@ -149,29 +177,30 @@ def display_state(
         user_name = session.state.get("user_name", "Unknown")
         print(f"👤 User: {user_name}")
 
-        # Handle cart items
-        cart_items = session.state.get("cart_items", [])
-        if cart_items:
-            print("🛒 Cart Items:")
-            for item in cart_items:
-                if isinstance(item, dict):
-                    name = item.get("name", "Unknown")
-                    quantity = item.get("quantity", 0)
-                    price = item.get("price", 0)
-                    print(f"  - {name} x{quantity} @ ${price:.2f}")
+        # Handle cart items, showing only the first lines of large carts
+        cart = Cart.from_state(session.state)
+        if len(cart):
+            print(f"🛒 Cart Items ({cart.item_count} items in {len(cart)} lines):")
+            for item in cart.lines(limit=10):
+                name = item.get("name", "Unknown")
+                quantity = item.get("quantity", 0)
+                price = item.get("price", 0)
+                print(f"  - {name} x{quantity} @ ${price:.2f}")
+            if len(cart) > 10:
+                print(f"  ... and {len(cart) - 10} more lines")
         else:
             print("🛒 Cart Items: Empty")
 
         # Handle total amount
-        total_amount = session.state.get("total_amount", 0.0)
-        print(f"💰 Total Amount: ${total_amount:.2f}")
+        print(f"💰 Total Amount: ${cart.total_amount:.2f}")
 
         # Handle interaction history in a readable way
         interaction_history = session.state.get("interaction_history", [])
         if interaction_history:
-            print("📝 Recent Interactions:")
-            # Show only last 3 interactions to keep output manageable
-            recent_interactions = interaction_history[-3:] if len(interaction_history) > 3 else interaction_history
+            interaction_count = session.state.get("interaction_count", len(interaction_history))
+            print(f"📝 Recent Interactions ({interaction_count} in total):")
+            # Show only the last interactions to keep output manageable
+            recent_interactions = interaction_history[-DISPLAYED_INTERACTIONS:]
             for idx, interaction in enumerate(recent_interactions, 1):
                 if isinstance(interaction, dict):
                     action = interaction.get("action", "interaction")
@@ -275,13 +304,15 @@ def format_cart_summary(cart_items):
     """Format cart items for display.
     
     Args:
-        cart_items: List of cart items with {id, name, price, quantity}
+        cart_items: List of cart items with {id, name, price, quantity}, or a dict of them by product ID
     
     Returns:
         Formatted string representation of the cart
     """
     if not cart_items:
         return "Cart is empty"
+    if isinstance(cart_items, dict):
+        cart_items = cart_items.values()
     
     summary = "Cart Contents:\n"
     total = 0.0
@@ -298,21 +329,25 @@ def format_cart_summary(cart_items):
 def calculate_cart_total(cart_items):
     """Calculate the total amount for items in cart.
     
+    Carts kept with Cart maintain their total as they change, this is for plain lists of items.
+
     Args:
-        cart_items: List of cart items with {id, name, price, quantity}
+        cart_items: List of cart items with {id, name, price, quantity}, or a dict of them by product ID
     
     Returns:
         Total amount as float
     """
+    if isinstance(cart_items, dict):
+        cart_items = cart_items.values()
     total = 0.0
     for item in cart_items:
         total += item.get("price", 0) * item.get("quantity", 0)
     return total
 
 
-# Sample product catalog for the ecommerce store
-PRODUCT_CATALOG = {
-    "laptop_001": {
+# Sample product catalog, used when PRODUCT_CATALOG_PATH doesn't point to a catalog file
+SAMPLE_PRODUCTS = [
+    {
         "id": "laptop_001",
         "name": "Gaming Laptop",
         "price": 999.99,
@@ -320,7 +355,7 @@ PRODUCT_CATALOG = {
         "description": "High-performance gaming laptop",
         "stock": 10
     },
-    "headphones_001": {
+    {
         "id": "headphones_001",
         "name": "Wireless Headphones",
         "price": 199.99,
@@ -328,7 +363,7 @@ PRODUCT_CATALOG = {
         "description": "Premium wireless headphones",
         "stock": 20
     },
-    "mobile_001": {
+    {
         "id": "mobile_001",
         "name": "Smartphone",
         "price": 599.99,
@@ -336,7 +371,49 @@ PRODUCT_CATALOG = {
         "description": "Latest smartphone with advanced features",
         "stock": 15
     }
-}
+]
+
+
+def load_product_catalog(path=None):
+    """Load the product catalog from a CSV, JSON Lines or SQLite file.
+
+    Args:
+        path: Catalog file path, defaults to the PRODUCT_CATALOG_PATH environment variable
+
+    Returns:
+        Indexed ProductCatalog, with the sample products if no file is configured
+    """
+    path = path or os.getenv("PRODUCT_CATALOG_PATH")
+    if not path:
+        return ProductCatalog(SAMPLE_PRODUCTS)
+    return ProductCatalog.from_file(path)
+
+
+def load_stock_reservations(catalog, path=None):
+    """Open the stock reservation database and add the stock of new catalog products.
+
+    Args:
+        catalog: Product catalog whose stock levels seed the database
+        path: SQLite database path, defaults to the STOCK_DB_PATH environment variable
+            or .cache/stock.sqlite3 next to this file
+
+    Returns:
+        StockReservations shared by the cart manager and checkout agents
+    """
+    path = path or os.getenv("STOCK_DB_PATH") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), ".cache", "stock.sqlite3"
+    )
+    ttl_seconds = float(os.getenv("STOCK_RESERVATION_TTL_SECONDS", DEFAULT_RESERVATION_TTL_SECONDS))
+    stock_reservations = StockReservations(path, ttl_seconds=ttl_seconds)
+    stock_reservations.sync_products(catalog.values())
+    return stock_reservations
+
+
+# Product catalog for the ecommerce store, indexed once at startup
+PRODUCT_CATALOG = load_product_catalog()
+
+# Live stock levels and cart reservations, shared by every session and process
+STOCK_RESERVATIONS = load_stock_reservations(PRODUCT_CATALOG)
 
 
 def get_product_by_id(product_id):
@@ -360,28 +437,60 @@ def get_products_by_category(category=None):
     Returns:
         List of products matching the category
     """
-    if not category:
-        return list(PRODUCT_CATALOG.values())
-    
-    return [product for product in PRODUCT_CATALOG.values() 
-            if product.get("category", "").lower() == category.lower()]
+    return PRODUCT_CATALOG.products_in_category(category)
 
 
-def search_products(search_term):
+def search_products(search_term, category=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
     """Search products by name or description.
     
     Args:
-        search_term: Term to search for
+        search_term: Term to search for, matched against whole words or word prefixes
+        category: Category to filter by (optional)
+        limit: Maximum number of products returned
+        cursor: Cursor of the next page, returned by search_products_page (optional)
         
     Returns:
-        List of matching products
+        List of matching products, best matches first
     """
-    search_term = search_term.lower()
-    matching_products = []
-    
-    for product in PRODUCT_CATALOG.values():
-        if (search_term in product.get("name", "").lower() or 
-            search_term in product.get("description", "").lower()):
-            matching_products.append(product)
-    
-    return matching_products
\ No newline at end of file
+    return search_products_page(search_term, category, limit, cursor)["products"]
+
+
+def search_products_page(search_term, category=None, limit=DEFAULT_PAGE_SIZE, cursor=None,
+                         in_stock_only=False):
+    """Search products by name or description, one page at a time.
+
+    Args:
+        search_term: Term to search for, matched against whole words or word prefixes
+        category: Category to filter by (optional)
+        limit: Maximum number of products in the page
+        cursor: Cursor returned with the previous page (optional)
+        in_stock_only: Skip products without catalog stock
+
+    Returns:
+        Page dictionary with {products, total_count, next_cursor}
+    """
+    return PRODUCT_CATALOG.search(
+        search_term, category=category, limit=limit, cursor=cursor, in_stock_only=in_stock_only
+    )
+
+
+def list_products_page(category=None, limit=DEFAULT_PAGE_SIZE, cursor=None, in_stock_only=False):
+    """List products, optionally of one category, one page at a time.
+
+    Args:
+        category: Category to filter by (optional)
+        limit: Maximum number of products in the page
+        cursor: Cursor returned with the previous page (optional)
+        in_stock_only: Only list products with catalog stock that still have stock available,
+            not reserved by carts or sold
+
+    Returns:
+        Page dictionary with {products, total_count, next_cursor}
+    """
+    return PRODUCT_CATALOG.list_products(
+        category=category,
+        limit=limit,
+        cursor=cursor,
+        in_stock_only=in_stock_only,
+        exclude=STOCK_RESERVATIONS.unavailable_products() if in_stock_only else None,
+    )
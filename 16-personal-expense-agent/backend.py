@@ -1,14 +1,21 @@
 from expense_manager_agent.agent import root_agent as expense_manager_agent
-from google.adk.sessions import InMemorySessionService
+from expense_manager_agent.tools import EMBEDDING_CACHE
+from google.adk.sessions import BaseSessionService
 from google.adk.runners import Runner
 from google.adk.events import Event
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.genai import types
 from fastapi import FastAPI, Body, Depends
+from fastapi.responses import StreamingResponse
 from typing import AsyncIterator
 from types import SimpleNamespace
 import uvicorn
-from contextlib import asynccontextmanager
+from contextlib import aclosing, asynccontextmanager
 import asyncio
+import json
+import re
 from utils import (
+    IMAGE_CACHE,
     extract_attachment_ids_and_sanitize_response,
     download_image_from_gcs,
     extract_thinking_process,
@@ -17,6 +24,7 @@ from utils import (
 from schema import ImageData, ChatRequest, ChatResponse
 import logger
 from google.adk.artifacts import GcsArtifactService
+from session_service import CachedSessionService, create_session_service
 from settings import get_settings
 
 SETTINGS = get_settings()
@@ -27,7 +35,7 @@ APP_NAME = "expense_manager_app"
 class AppContexts(SimpleNamespace):
     """A class to hold application contexts with attribute access"""
 
-    session_service: InMemorySessionService = None
+    session_service: BaseSessionService = None
     artifact_service: GcsArtifactService = None
     expense_manager_agent_runner: Runner = None
 
@@ -39,7 +47,15 @@ app_contexts = AppContexts()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Initialize service contexts during application startup
-    app_contexts.session_service = InMemorySessionService()
+    app_contexts.session_service = create_session_service(
+        backend=SETTINGS.SESSION_SERVICE_BACKEND,
+        db_url=SETTINGS.SESSION_DB_URL,
+        pool_size=SETTINGS.SESSION_DB_POOL_SIZE,
+        max_overflow=SETTINGS.SESSION_DB_MAX_OVERFLOW,
+        pool_recycle_seconds=SETTINGS.SESSION_DB_POOL_RECYCLE_SECONDS,
+        cache_size=SETTINGS.SESSION_CACHE_SIZE,
+        cache_ttl_seconds=SETTINGS.SESSION_CACHE_TTL_SECONDS,
+    )
     app_contexts.artifact_service = GcsArtifactService(
         bucket_name=SETTINGS.STORAGE_BUCKET_NAME
     )
@@ -53,6 +69,10 @@ async def lifespan(app: FastAPI):
     logger.info("Application started successfully")
     yield
     logger.info("Application shutting down")
+    EMBEDDING_CACHE.log_stats()
+    logger.info("Image cache stats", **IMAGE_CACHE.stats())
+    if isinstance(app_contexts.session_service, CachedSessionService):
+        logger.info("Session cache stats", **app_contexts.session_service.stats())
     # Perform cleanup during application shutdown if necessary
 
 
@@ -65,6 +85,109 @@ async def get_app_contexts() -> AppContexts:
 app = FastAPI(title="Personal Expense Assistant API", lifespan=lifespan)
 
 
+async def ensure_session(request: ChatRequest, app_context: AppContexts) -> None:
+    """Create the request's session if it doesn't exist."""
+    session_service = app_context.session_service
+    if await session_service.get_session(
+        app_name=APP_NAME, user_id=request.user_id, session_id=request.session_id
+    ):
+        return
+
+    try:
+        await session_service.create_session(
+            app_name=APP_NAME, user_id=request.user_id, session_id=request.session_id
+        )
+    except Exception:
+        # Another request may have created the session, or the app and user state
+        # rows the database backend inserts along with a user's first session
+        if not await session_service.get_session(
+            app_name=APP_NAME, user_id=request.user_id, session_id=request.session_id
+        ):
+            await session_service.create_session(
+                app_name=APP_NAME, user_id=request.user_id, session_id=request.session_id
+            )
+
+
+async def prepare_agent_turn(
+    request: ChatRequest, app_context: AppContexts
+) -> types.Content:
+    """Store the request's images, make sure its session exists and build the ADK message.
+
+    Args:
+        request: The chat request.
+        app_context: The application contexts.
+
+    Returns:
+        types.Content: The user's message in ADK format.
+    """
+    # Prepare the user's message in ADK format and store image artifacts,
+    # while making sure the session exists
+    content, _ = await asyncio.gather(
+        format_user_request_to_adk_content_and_store_artifacts(
+            request=request,
+            app_name=APP_NAME,
+            artifact_service=app_context.artifact_service,
+        ),
+        ensure_session(request, app_context),
+    )
+
+    return content
+
+
+async def download_attachment(
+    image_hash_id: str, request: ChatRequest, app_context: AppContexts
+) -> ImageData | None:
+    """Download one attachment image, returning None if it can't be found."""
+    result = await download_image_from_gcs(
+        artifact_service=app_context.artifact_service,
+        image_hash=image_hash_id,
+        app_name=APP_NAME,
+        user_id=request.user_id,
+        session_id=request.session_id,
+    )
+    if not result:
+        return None
+
+    base64_data, mime_type = result
+    return ImageData(serialized_image=base64_data, mime_type=mime_type)
+
+
+def process_final_response(final_response_text: str) -> tuple[str, str, list[str]]:
+    """Split the agent's final response into sanitized text, thinking process and attachment IDs."""
+    logger.info(
+        "Received final response from agent", raw_final_response=final_response_text
+    )
+
+    # Extract and process any attachments and thinking process in the response
+    sanitized_text, attachment_ids = extract_attachment_ids_and_sanitize_response(
+        final_response_text
+    )
+    sanitized_text, thinking_process = extract_thinking_process(sanitized_text)
+
+    logger.info(
+        "Processed response with attachments",
+        sanitized_response=sanitized_text,
+        thinking_process=thinking_process,
+        attachment_ids=attachment_ids,
+    )
+
+    return sanitized_text, thinking_process, attachment_ids
+
+
+def get_final_response_text(event: Event) -> str:
+    """Get the response text from a final response event."""
+    if event.content and event.content.parts:
+        # Join the text parts, skipping the model's thoughts
+        return "".join(
+            part.text for part in event.content.parts if part.text and not part.thought
+        )
+    elif event.actions and event.actions.escalate:
+        # Handle potential errors/escalations
+        return f"Agent escalated: {event.error_message or 'No specific message.'}"
+
+    return "Agent did not produce a final response."
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest = Body(...),
@@ -72,86 +195,45 @@ async def chat(
 ) -> ChatResponse:
     """Process chat request and get response from the agent"""
 
-    # Prepare the user's message in ADK format and store image artifacts
-    content = await asyncio.to_thread(
-        format_user_request_to_adk_content_and_store_artifacts,
-        request=request,
-        app_name=APP_NAME,
-        artifact_service=app_context.artifact_service,
-    )
-
     final_response_text = "Agent did not produce a final response."  # Default
 
-    # Use the session ID from the request or default if not provided
-    session_id = request.session_id
-    user_id = request.user_id
-
-    # Create session if it doesn't exist
-    if not app_context.session_service.get_session(
-        app_name=APP_NAME, user_id=user_id, session_id=session_id
-    ):
-        app_context.session_service.create_session(
-            app_name=APP_NAME, user_id=user_id, session_id=session_id
-        )
-
     try:
+        content = await prepare_agent_turn(request, app_context)
+
         # Process the message with the agent
         # Type annotation: runner.run_async returns an AsyncIterator[Event]
         events_iterator: AsyncIterator[Event] = (
             app_context.expense_manager_agent_runner.run_async(
-                user_id=user_id, session_id=session_id, new_message=content
+                user_id=request.user_id,
+                session_id=request.session_id,
+                new_message=content,
             )
         )
-        async for event in events_iterator:  # event has type Event
-            # Key Concept: is_final_response() marks the concluding message for the turn
-            if event.is_final_response():
-                if event.content and event.content.parts:
-                    # Extract text from the first part
-                    final_response_text = event.content.parts[0].text
-                elif event.actions and event.actions.escalate:
-                    # Handle potential errors/escalations
-                    final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
-                break  # Stop processing events once the final response is found
-
-        logger.info(
-            "Received final response from agent", raw_final_response=final_response_text
-        )
+        # Close the runner's generator here when breaking out, instead of leaving it
+        # to garbage collection, where its tracing spans fail to detach their context
+        async with aclosing(events_iterator):
+            async for event in events_iterator:  # event has type Event
+                # Key Concept: is_final_response() marks the concluding message for the turn
+                if event.is_final_response():
+                    final_response_text = get_final_response_text(event)
+                    break  # Stop processing events once the final response is found
 
-        # Extract and process any attachments and thinking process in the response
-        base64_attachments = []
-        sanitized_text, attachment_ids = extract_attachment_ids_and_sanitize_response(
+        sanitized_text, thinking_process, attachment_ids = process_final_response(
             final_response_text
         )
-        sanitized_text, thinking_process = extract_thinking_process(sanitized_text)
-
-        # Download images from GCS and replace hash IDs with base64 data
-        for image_hash_id in attachment_ids:
-            # Download image data and get MIME type
-            result = await asyncio.to_thread(
-                download_image_from_gcs,
-                artifact_service=app_context.artifact_service,
-                image_hash=image_hash_id,
-                app_name=APP_NAME,
-                user_id=user_id,
-                session_id=session_id,
-            )
-            if result:
-                base64_data, mime_type = result
-                base64_attachments.append(
-                    ImageData(serialized_image=base64_data, mime_type=mime_type)
-                )
 
-        logger.info(
-            "Processed response with attachments",
-            sanitized_response=sanitized_text,
-            thinking_process=thinking_process,
-            attachment_ids=attachment_ids,
+        # Download images from GCS concurrently and replace hash IDs with base64 data
+        attachments = await asyncio.gather(
+            *(
+                download_attachment(image_hash_id, request, app_context)
+                for image_hash_id in attachment_ids
+            )
         )
 
         return ChatResponse(
             response=sanitized_text,
             thinking_process=thinking_process,
-            attachments=base64_attachments,
+            attachments=[attachment for attachment in attachments if attachment],
         )
 
     except Exception as e:
@@ -161,6 +243,168 @@ async def chat(
         )
 
 
+class ResponseSectionSplitter:
+    """Route streamed response text to the thinking process or the final response.
+
+    The agent answers in markdown with a `# THINKING PROCESS` section followed by a
+    `# FINAL RESPONSE` section. Text before the final response heading is emitted
+    as thinking one complete line at a time, so a heading split across chunks is
+    never emitted as thinking, and text after it is emitted as it arrives, up to
+    the attachments JSON block.
+    """
+
+    FINAL_RESPONSE_HEADING = re.compile(r"^#\s*FINAL RESPONSE[^\n]*\n?", re.MULTILINE)
+    THINKING_HEADING = re.compile(r"^#\s*THINKING PROCESS[^\n]*\n?", re.MULTILINE)
+    ATTACHMENTS_BLOCK = "```json"
+
+    def __init__(self):
+        self.text = ""
+        self.thinking_sent = 0
+        self.response_sent = 0
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        """Add a chunk of response text and return the new (event, text) pairs to send."""
+        self.text += chunk
+        events = []
+
+        heading = self.FINAL_RESPONSE_HEADING.search(self.text)
+        thinking_end = heading.start() if heading else self.text.rfind("\n") + 1
+        if thinking_end > self.thinking_sent:
+            thinking = self.THINKING_HEADING.sub(
+                "", self.text[self.thinking_sent : thinking_end]
+            )
+            self.thinking_sent = thinking_end
+            if thinking:
+                events.append(("thinking", thinking))
+
+        if heading:
+            response = self._visible_response(self.text[heading.end() :])
+            if len(response) > self.response_sent:
+                events.append(("text", response[self.response_sent :]))
+                self.response_sent = len(response)
+
+        return events
+
+    def _visible_response(self, response: str) -> str:
+        # The attachments JSON block is removed from the final response, never stream it
+        block_start = response.find(self.ATTACHMENTS_BLOCK)
+        if block_start != -1:
+            return response[:block_start]
+
+        # Hold back what may be the start of the block, until the next chunk tells
+        for length in range(len(self.ATTACHMENTS_BLOCK) - 1, 0, -1):
+            if response.endswith(self.ATTACHMENTS_BLOCK[:length]):
+                return response[:-length]
+
+        return response
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Format a server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest = Body(...),
+    app_context: AppContexts = Depends(get_app_contexts),
+) -> StreamingResponse:
+    """Process chat request and stream the agent's progress as server-sent events.
+
+    Events, in order:
+        thinking: {"text"} chunks of the thinking process, as the model writes it.
+        tool_call: {"name"} when the agent calls a tool.
+        text: {"text"} chunks of the final response, as the model writes it.
+        final: {"response", "thinking_process", "attachment_ids"} the processed final
+            response, which replaces the streamed chunks.
+        attachment: {"image_id", "serialized_image", "mime_type"} each attachment
+            image, as soon as it is downloaded.
+        error: {"error"} if the turn failed.
+        done: {} at the end of the stream.
+    """
+
+    async def event_stream() -> AsyncIterator[str]:
+        final_response_text = "Agent did not produce a final response."  # Default
+
+        try:
+            content = await prepare_agent_turn(request, app_context)
+
+            splitter = ResponseSectionSplitter()
+            events_iterator: AsyncIterator[Event] = (
+                app_context.expense_manager_agent_runner.run_async(
+                    user_id=request.user_id,
+                    session_id=request.session_id,
+                    new_message=content,
+                    run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+                )
+            )
+            async with aclosing(events_iterator):
+                async for event in events_iterator:
+                    parts = event.content.parts if event.content and event.content.parts else []
+
+                    if event.partial:
+                        for part in parts:
+                            if part.thought and part.text:
+                                yield format_sse("thinking", {"text": part.text})
+                            elif part.text:
+                                for name, text in splitter.feed(part.text):
+                                    yield format_sse(name, {"text": text})
+                        continue
+
+                    # A complete model response or tool result ends the current model call
+                    splitter = ResponseSectionSplitter()
+                    for part in parts:
+                        if part.function_call:
+                            yield format_sse("tool_call", {"name": part.function_call.name})
+
+                    if event.is_final_response():
+                        final_response_text = get_final_response_text(event)
+                        break
+
+            sanitized_text, thinking_process, attachment_ids = process_final_response(
+                final_response_text
+            )
+            yield format_sse(
+                "final",
+                {
+                    "response": sanitized_text,
+                    "thinking_process": thinking_process,
+                    "attachment_ids": attachment_ids,
+                },
+            )
+
+            # Download all attachments concurrently, sending each one when ready
+            async def download(image_hash_id: str):
+                return image_hash_id, await download_attachment(
+                    image_hash_id, request, app_context
+                )
+
+            for next_download in asyncio.as_completed(
+                [download(image_hash_id) for image_hash_id in attachment_ids]
+            ):
+                image_hash_id, attachment = await next_download
+                if attachment:
+                    yield format_sse(
+                        "attachment",
+                        {"image_id": image_hash_id, **attachment.model_dump()},
+                    )
+
+        except Exception as e:
+            logger.error("Error processing chat stream request", error_message=str(e))
+            yield format_sse("error", {"error": f"Error in generating response: {str(e)}"})
+
+        yield format_sse("done", {})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 # Only run the server if this file is executed directly
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8081)
\ No newline at end of file
+    if SETTINGS.BACKEND_WORKERS > 1 and SETTINGS.SESSION_SERVICE_BACKEND == "memory":
+        logger.warning(
+            "In-memory sessions are not shared across workers, use the database backend"
+        )
+    # Multiple workers need the app as an import string
+    uvicorn.run(
+        "backend:app", host="0.0.0.0", port=8081, workers=SETTINGS.BACKEND_WORKERS
+    )
\ No newline at end of file
@@ -0,0 +1,535 @@
+"""
+Load test of the expense assistant backend with local stand-ins for every cloud service.
+
+Runs the FastAPI app in-process and drives it with N concurrent simulated users.
+Each user uploads receipt images and asks questions about their expenses, over
+`/chat`, `/chat/stream` or both. All external services are replaced with
+deterministic fakes with configurable latency:
+
+- Gemini: a fake model which calls store_receipt_data for each uploaded image and
+  search_relevant_receipts_by_natural_language_query for each question, then
+  answers in the agent's THINKING PROCESS / FINAL RESPONSE format
+- Embedding model: hash-seeded vectors
+- Firestore: an in-memory receipts collection, with the local vector store
+- GCS: an in-memory artifact service
+
+Everything else runs for real: the agent runner, callbacks, tools, session service,
+embedding and image caches and the response processing. The report has throughput,
+p50/p95/p99 latency per request kind and the process memory. Exits with status 1
+when a threshold given on the command line is exceeded, for use in CI.
+
+Usage:
+    uv run benchmarks/backend_load_test.py --users 50 --turns 6
+    uv run benchmarks/backend_load_test.py --users 20 --endpoint stream --max-p95-ms 500
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import AsyncGenerator, Dict, List, Optional
+
+import numpy as np
+
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.cloud.firestore_v1 import FieldFilter
+from google.cloud.firestore_v1.base_query import And
+from google.genai import types
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PROJECT_DIR)
+
+STORES = ["Starbucks", "Indomaret", "Alfamart", "IKEA", "Uniqlo", "Shell", "Grab"]
+QUESTIONS = [
+    "How much did I spend on coffee?",
+    "Show me my grocery receipts",
+    "What did I buy at IKEA?",
+    "Find my fuel receipts from last month",
+    "Which receipts are over 100?",
+]
+IMAGE_ID_PATTERN = re.compile(r"\[IMAGE-ID ([0-9a-f]{12})\]")
+RECEIPT_ID_PATTERN = re.compile(r"Receipt Image ID: (\S+)")
+
+
+class FakeGemini(BaseLlm):
+    """Deterministic stand-in for Gemini following the agent's tool calling flow."""
+
+    latency: float = 0.05
+    chunks: int = 8
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.latency)
+        last = llm_request.contents[-1]
+
+        function_responses = [part.function_response for part in last.parts if part.function_response]
+        if function_responses:
+            text = self._final_response(function_responses)
+            if stream:
+                size = max(1, len(text) // self.chunks)
+                for i in range(0, len(text), size):
+                    await asyncio.sleep(self.latency / self.chunks)
+                    yield LlmResponse(
+                        content=types.Content(role="model", parts=[types.Part(text=text[i : i + size])]),
+                        partial=True,
+                    )
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+            return
+
+        message = " ".join(part.text for part in last.parts if part.text)
+        image_ids = IMAGE_ID_PATTERN.findall(message)
+        if image_ids:
+            calls = [
+                types.FunctionCall(name="store_receipt_data", args=self._receipt(image_id))
+                for image_id in image_ids
+            ]
+        else:
+            calls = [
+                types.FunctionCall(
+                    name="search_relevant_receipts_by_natural_language_query",
+                    args={"query_text": message.strip()},
+                )
+            ]
+        yield LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part(function_call=call) for call in calls]
+            )
+        )
+
+    @staticmethod
+    def _receipt(image_id: str) -> Dict:
+        seed = int(image_id, 16)
+        return {
+            "image_id": image_id,
+            "store_name": STORES[seed % len(STORES)],
+            "transaction_time": f"2024-{seed % 12 + 1:02d}-{seed % 28 + 1:02d}T10:00:00.000000Z",
+            "total_amount": float(seed % 50000) / 100,
+            "purchased_items": [
+                {"name": "Item A", "price": float(seed % 5000) / 100, "quantity": 1},
+                {"name": "Item B", "price": float(seed % 3000) / 100, "quantity": 2},
+            ],
+            "currency": "IDR",
+        }
+
+    @staticmethod
+    def _final_response(function_responses: List[types.FunctionResponse]) -> str:
+        results = "\n".join(str(response.response) for response in function_responses)
+        receipt_ids = list(dict.fromkeys(RECEIPT_ID_PATTERN.findall(results)))[:2]
+        attachments = json.dumps(
+            {"attachments": [f"[IMAGE-ID {receipt_id}]" for receipt_id in receipt_ids]}
+        )
+        return (
+            "# THINKING PROCESS\n"
+            f"The user asked about their expenses, {len(function_responses)} tool calls returned.\n"
+            "I will summarize the relevant receipts.\n\n"
+            "# FINAL RESPONSE\n"
+            f"I found {len(receipt_ids)} relevant receipts for you.\n\n"
+            f"```json\n{attachments}\n```"
+        )
+
+
+class FakeEmbeddingModels:
+    """Stand-in for the async genai models API, returning hash-seeded embeddings."""
+
+    def __init__(self, latency: float, dimension: int):
+        self.latency = latency
+        self.dimension = dimension
+        self.calls = 0
+
+    async def embed_content(self, model: str, contents, config=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        texts = [contents] if isinstance(contents, str) else contents
+        embeddings = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).normal(size=self.dimension)
+            embeddings.append(SimpleNamespace(values=vector.tolist()))
+        return SimpleNamespace(embeddings=embeddings)
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id: str, data: Optional[Dict]):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict]:
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeQuery:
+    """The subset of the async Firestore query API used by the receipt tools."""
+
+    OPERATORS = {
+        "==": lambda a, b: a == b,
+        "in": lambda a, b: a in b,
+        ">=": lambda a, b: a is not None and a >= b,
+        "<=": lambda a, b: a is not None and a <= b,
+        ">": lambda a, b: a is not None and a > b,
+        "<": lambda a, b: a is not None and a < b,
+    }
+
+    def __init__(self, collection: "FakeCollection", filters=(), limit_count=None, fields=None):
+        self.collection = collection
+        self.filters = list(filters)
+        self.limit_count = limit_count
+        self.fields = fields
+
+    def where(self, filter) -> "FakeQuery":
+        filters = filter.filters if isinstance(filter, And) else [filter]
+        return FakeQuery(self.collection, self.filters + list(filters), self.limit_count, self.fields)
+
+    def limit(self, count: int) -> "FakeQuery":
+        return FakeQuery(self.collection, self.filters, count, self.fields)
+
+    def select(self, fields) -> "FakeQuery":
+        return FakeQuery(self.collection, self.filters, self.limit_count, list(fields))
+
+    def _matches(self, data: Dict) -> bool:
+        for field_filter in self.filters:
+            if not isinstance(field_filter, FieldFilter):
+                raise NotImplementedError(f"Unsupported filter {field_filter!r}")
+            operator = self.OPERATORS[field_filter.op_string]
+            if not operator(data.get(field_filter.field_path), field_filter.value):
+                return False
+        return True
+
+    async def stream(self) -> AsyncGenerator[FakeSnapshot, None]:
+        await asyncio.sleep(self.collection.latency)
+        matched = 0
+        for doc_id, data in list(self.collection.docs.items()):
+            if self.limit_count is not None and matched >= self.limit_count:
+                break
+            if self._matches(data):
+                matched += 1
+                if self.fields is not None:
+                    data = {field: data.get(field) for field in self.fields}
+                yield FakeSnapshot(doc_id, data)
+
+
+class FakeCollection(FakeQuery):
+    """In-memory stand-in for the async Firestore receipts collection."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.docs: Dict[str, Dict] = {}
+        super().__init__(self)
+
+    async def add(self, data: Dict):
+        await asyncio.sleep(self.latency)
+        doc_id = f"doc-{len(self.docs):08d}"
+        self.docs[doc_id] = dict(data)
+        return None, SimpleNamespace(id=doc_id)
+
+    def document(self, doc_id: str):
+        async def get():
+            await asyncio.sleep(self.latency)
+            return FakeSnapshot(doc_id, self.docs.get(doc_id))
+
+        return SimpleNamespace(id=doc_id, get=get)
+
+
+class FakeArtifactService(InMemoryArtifactService):
+    """In-memory artifact service with the round trip latency of GCS."""
+
+    latency: float = 0.02
+
+    async def save_artifact(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        return await super().save_artifact(**kwargs)
+
+    async def load_artifact(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        return await super().load_artifact(**kwargs)
+
+    async def list_versions(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        return await super().list_versions(**kwargs)
+
+
+def configure_environment(workdir: str, session_backend: str) -> None:
+    """Point every local store at a scratch directory, before the app reads its settings."""
+    os.chdir(PROJECT_DIR)
+    os.environ.setdefault("GCLOUD_PROJECT_ID", "load-test")
+    os.environ.setdefault("GCLOUD_LOCATION", "us-central1")
+    # Lets the Firestore client be built without credentials, it's replaced before use
+    os.environ["FIRESTORE_EMULATOR_HOST"] = "localhost:1"
+    os.environ["VECTOR_STORE_BACKEND"] = "local"
+    os.environ["LOCAL_VECTOR_STORE_PATH"] = os.path.join(workdir, "vector_store")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embedding_cache.sqlite3")
+    os.environ["IMAGE_CACHE_DIR"] = os.path.join(workdir, "images")
+    os.environ["SESSION_SERVICE_BACKEND"] = session_backend
+    os.environ["SESSION_DB_URL"] = f"sqlite:///{os.path.join(workdir, 'sessions.sqlite3')}"
+
+
+def install_fakes(args):
+    """Import the backend and swap every cloud client for its stand-in."""
+    import backend
+    from expense_manager_agent import tools
+    import logger
+
+    logger.logger.setLevel(logging.WARNING)
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+
+    backend.expense_manager_agent.model = FakeGemini(
+        model="fake-gemini", latency=args.llm_latency_ms / 1000
+    )
+    embedding_models = FakeEmbeddingModels(
+        args.embedding_latency_ms / 1000, tools.EMBEDDING_DIMENSION
+    )
+    tools.GENAI_CLIENT = SimpleNamespace(aio=SimpleNamespace(models=embedding_models))
+    tools.COLLECTION = FakeCollection(args.db_latency_ms / 1000)
+
+    artifact_service = FakeArtifactService()
+    artifact_service.latency = args.gcs_latency_ms / 1000
+    backend.GcsArtifactService = lambda bucket_name: artifact_service
+
+    return backend, tools, embedding_models
+
+
+def make_image(rng: random.Random, size_kb: int) -> bytes:
+    return b"\x89PNG\r\n\x1a\n" + rng.randbytes(size_kb * 1024)
+
+
+async def send_chat(client, payload: Dict) -> Dict:
+    started = time.perf_counter()
+    response = await client.post("/chat", json=payload)
+    ok = response.status_code == 200 and not response.json().get("error")
+    return {"latency": time.perf_counter() - started, "first_byte": None, "ok": ok}
+
+
+async def send_stream(client, payload: Dict) -> Dict:
+    started = time.perf_counter()
+    first_byte = None
+    ok = False
+    async with client.stream("POST", "/chat/stream", json=payload) as response:
+        async for line in response.aiter_lines():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            if line == "event: error":
+                break
+            if line == "event: done":
+                ok = response.status_code == 200
+    return {"latency": time.perf_counter() - started, "first_byte": first_byte, "ok": ok}
+
+
+async def run_user(client, user_index: int, args, records: List[Dict]) -> None:
+    """Simulate one user alternating receipt uploads and questions in one session."""
+    rng = random.Random(args.seed * 100_003 + user_index)
+    if args.endpoint == "mixed":
+        endpoint = "stream" if user_index % 2 else "chat"
+    else:
+        endpoint = args.endpoint
+    send = send_stream if endpoint == "stream" else send_chat
+
+    for turn in range(args.turns):
+        payload = {"user_id": f"user-{user_index}", "session_id": f"session-{user_index}"}
+        if rng.random() < args.upload_ratio:
+            kind = "upload"
+            payload["text"] = "Please store this receipt"
+            payload["files"] = [
+                {
+                    "serialized_image": base64.b64encode(
+                        make_image(rng, args.image_kb)
+                    ).decode("utf-8"),
+                    "mime_type": "image/png",
+                }
+            ]
+        else:
+            kind = "question"
+            payload["text"] = rng.choice(QUESTIONS)
+
+        try:
+            result = await send(client, payload)
+        except Exception as e:
+            result = {"latency": 0.0, "first_byte": None, "ok": False, "error": str(e)}
+        records.append({"kind": f"{kind}/{endpoint}", "turn": turn, **result})
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def current_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return None
+
+
+def summarize(records: List[Dict], elapsed: float) -> Dict:
+    summary = {
+        "requests": len(records),
+        "errors": sum(not record["ok"] for record in records),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(records) / elapsed, 2) if elapsed else 0.0,
+        "kinds": {},
+    }
+    by_kind = defaultdict(list)
+    for record in records:
+        if record["ok"]:
+            by_kind[record["kind"]].append(record)
+            by_kind["all"].append(record)
+
+    for kind, kind_records in sorted(by_kind.items()):
+        latencies = [record["latency"] * 1000 for record in kind_records]
+        stats = {
+            "count": len(latencies),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "mean_ms": round(statistics.mean(latencies), 2),
+        }
+        first_bytes = [
+            record["first_byte"] * 1000 for record in kind_records if record["first_byte"]
+        ]
+        if first_bytes:
+            stats["first_byte_p50_ms"] = round(percentile(first_bytes, 50), 2)
+            stats["first_byte_p95_ms"] = round(percentile(first_bytes, 95), 2)
+        summary["kinds"][kind] = stats
+    return summary
+
+
+def print_report(summary: Dict) -> None:
+    print(f"\nRequests:    {summary['requests']}")
+    print(f"Errors:      {summary['errors']}")
+    print(f"Elapsed:     {summary['elapsed_seconds']:.2f}s")
+    print(f"Throughput:  {summary['throughput_rps']:.2f} requests/sec")
+
+    print(f"\n{'Kind':<20}{'count':>7}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}"
+          f"{'mean (ms)':>11}{'TTFB p50':>10}")
+    for kind, stats in summary["kinds"].items():
+        first_byte = stats.get("first_byte_p50_ms")
+        print(f"{kind:<20}{stats['count']:>7}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+              f"{stats['p99_ms']:>10.2f}{stats['mean_ms']:>11.2f}"
+              f"{first_byte if first_byte is not None else '-':>10}")
+
+    memory = summary["memory"]
+    print(f"\nRSS start:   {memory['rss_start_mb']} MB")
+    print(f"RSS end:     {memory['rss_end_mb']} MB")
+    print(f"RSS peak:    {memory['rss_peak_mb']} MB")
+    if "python_heap_peak_mb" in memory:
+        print(f"Heap peak:   {memory['python_heap_peak_mb']} MB (tracemalloc)")
+
+    for name, stats in summary["caches"].items():
+        print(f"{name + ':':<20} {stats}")
+
+
+async def main(args) -> int:
+    import httpx
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(workdir, args.session_backend)
+        backend, tools, embedding_models = install_fakes(args)
+        import utils
+
+        if args.tracemalloc:
+            tracemalloc.start()
+        rss_start = current_rss_mb()
+
+        records: List[Dict] = []
+        async with backend.lifespan(backend.app):
+            transport = httpx.ASGITransport(app=backend.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://load-test", timeout=None
+            ) as client:
+                started = time.perf_counter()
+                await asyncio.gather(
+                    *(run_user(client, i, args, records) for i in range(args.users))
+                )
+                elapsed = time.perf_counter() - started
+
+            session_service = backend.app_contexts.session_service
+            caches = {
+                "embedding_cache": tools.EMBEDDING_CACHE.stats(),
+                "image_cache": utils.IMAGE_CACHE.stats(),
+                "embedding_calls": {"requests": embedding_models.calls},
+            }
+            if hasattr(session_service, "stats"):
+                caches["session_cache"] = session_service.stats()
+
+        summary = summarize(records, elapsed)
+        summary["memory"] = {
+            "rss_start_mb": round(rss_start, 1) if rss_start else None,
+            "rss_end_mb": round(current_rss_mb() or 0, 1) or None,
+            # ru_maxrss is in kilobytes on Linux
+            "rss_peak_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+        if args.tracemalloc:
+            summary["memory"]["python_heap_peak_mb"] = round(
+                tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1
+            )
+            tracemalloc.stop()
+        summary["caches"] = caches
+        summary["config"] = vars(args)
+
+    print_report(summary)
+    if args.json_output:
+        with open(args.json_output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    failures = []
+    error_rate = summary["errors"] / summary["requests"] if summary["requests"] else 0.0
+    if error_rate > args.max_error_rate:
+        failures.append(f"error rate {error_rate:.2%} > {args.max_error_rate:.2%}")
+    overall = summary["kinds"].get("all")
+    if args.max_p95_ms and overall and overall["p95_ms"] > args.max_p95_ms:
+        failures.append(f"p95 {overall['p95_ms']}ms > {args.max_p95_ms}ms")
+    if args.min_throughput and summary["throughput_rps"] < args.min_throughput:
+        failures.append(f"throughput {summary['throughput_rps']} < {args.min_throughput} req/s")
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the expense assistant backend.")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument("--turns", type=int, default=6, help="Requests per user")
+    parser.add_argument("--endpoint", choices=["chat", "stream", "mixed"], default="mixed",
+                        help="Endpoint the users call, mixed splits the users between both")
+    parser.add_argument("--upload-ratio", type=float, default=0.5,
+                        help="Share of turns uploading a receipt image instead of asking")
+    parser.add_argument("--image-kb", type=int, default=256, help="Size of each receipt image")
+    parser.add_argument("--session-backend", choices=["memory", "database"], default="database",
+                        help="Session service backend, database uses a scratch SQLite file")
+    parser.add_argument("--llm-latency-ms", type=float, default=50,
+                        help="Fake Gemini latency per model call")
+    parser.add_argument("--embedding-latency-ms", type=float, default=10,
+                        help="Fake embedding latency per request")
+    parser.add_argument("--db-latency-ms", type=float, default=5,
+                        help="Fake Firestore latency per round trip")
+    parser.add_argument("--gcs-latency-ms", type=float, default=20,
+                        help="Fake GCS latency per round trip")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the simulated users")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Also report the Python heap peak, slows the run down")
+    parser.add_argument("--json-output", help="Write the report as JSON to this file")
+    parser.add_argument("--max-p95-ms", type=float, default=0,
+                        help="Fail if the overall p95 latency exceeds this")
+    parser.add_argument("--min-throughput", type=float, default=0,
+                        help="Fail if the throughput in requests/sec is below this")
+    parser.add_argument("--max-error-rate", type=float, default=0.0,
+                        help="Fail if the share of failed requests exceeds this")
+    sys.exit(asyncio.run(main(parser.parse_args())))
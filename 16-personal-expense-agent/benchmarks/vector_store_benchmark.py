@@ -0,0 +1,184 @@
+"""
+Latency benchmark for the receipt vector store backends.
+
+Generates synthetic receipts with clustered embeddings, loads the same data into
+each backend and times the same queries against all of them:
+
+- local-exact: LocalVectorStore brute-force NumPy scan
+- local-ivf: LocalVectorStore IVF index (recall is measured against local-exact)
+- firestore: Firestore find_nearest on a scratch collection (only with --firestore,
+  needs credentials and a vector index on the scratch collection's embedding field)
+
+Usage:
+    uv run benchmarks/vector_store_benchmark.py --receipts 50000 --queries 200
+    uv run benchmarks/vector_store_benchmark.py --receipts 2000 --firestore
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from vector_store import (  # noqa: E402
+    FirestoreVectorStore,
+    LocalVectorStore,
+    VectorStore,
+)
+
+DIMENSION = 768
+STORES = ["Starbucks", "Indomaret", "Alfamart", "IKEA", "Uniqlo", "Shell", "Grab"]
+
+
+def generate_receipts(count: int, seed: int = 0):
+    """Generate receipts spread over a year, with embeddings clustered by topic."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(64, DIMENSION)).astype(np.float32)
+    embeddings = topics[rng.integers(len(topics), size=count)] + 0.3 * rng.normal(
+        size=(count, DIMENSION)
+    ).astype(np.float32)
+
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    receipts = []
+    for i in range(count):
+        transaction_time = start + datetime.timedelta(minutes=int(rng.integers(525600)))
+        receipts.append(
+            {
+                "receipt_id": f"bench-{i:08d}",
+                "store_name": STORES[i % len(STORES)],
+                "transaction_time": transaction_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+                "total_amount": float(round(rng.uniform(1, 500), 2)),
+                "currency": "IDR",
+                "purchased_items": [],
+            }
+        )
+    return receipts, embeddings, topics
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+async def time_queries(store: VectorStore, queries, limit: int, filters: dict):
+    """Run every query and return the latencies in milliseconds and the result ids."""
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        receipts = await store.search(query.tolist(), limit=limit, **filters)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append([receipt["receipt_id"] for receipt in receipts])
+    return latencies, results
+
+
+def recall(results, exact_results) -> float:
+    hits = sum(len(set(r) & set(e)) for r, e in zip(results, exact_results))
+    total = sum(len(e) for e in exact_results)
+    return hits / total if total else 1.0
+
+
+async def load_firestore(receipts, embeddings, collection_name: str):
+    from google.cloud import firestore
+    from google.cloud.firestore_v1.vector import Vector
+
+    from settings import get_settings
+
+    client = firestore.AsyncClient(project=get_settings().GCLOUD_PROJECT_ID)
+    collection = client.collection(collection_name)
+    for start in range(0, len(receipts), 500):
+        batch = client.batch()
+        for receipt, embedding in zip(
+            receipts[start : start + 500], embeddings[start : start + 500]
+        ):
+            doc = dict(receipt, embedding=Vector(embedding.tolist()))
+            batch.set(collection.document(receipt["receipt_id"]), doc)
+        await batch.commit()
+    return client, collection
+
+
+async def delete_firestore(client, collection):
+    async for doc in collection.stream():
+        await doc.reference.delete()
+    client.close()
+
+
+async def main(args) -> None:
+    receipts, embeddings, topics = generate_receipts(args.receipts)
+    rng = np.random.default_rng(1)
+    queries = topics[rng.integers(len(topics), size=args.queries)] + 0.3 * rng.normal(
+        size=(args.queries, DIMENSION)
+    ).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exact = LocalVectorStore(
+            os.path.join(tmp, "exact"), DIMENSION, ivf_threshold=args.receipts + 1
+        )
+        exact.add_many_sync(receipts, embeddings)
+        ivf = LocalVectorStore(
+            os.path.join(tmp, "ivf"), DIMENSION, ivf_threshold=0, nprobe=args.nprobe
+        )
+        ivf.add_many_sync(receipts, embeddings)
+
+        started = time.perf_counter()
+        ivf.build_index()
+        print(f"IVF index built over {args.receipts} receipts in "
+              f"{time.perf_counter() - started:.2f}s")
+
+        backends = {"local-exact": exact, "local-ivf": ivf}
+        firestore_context = None
+        if args.firestore:
+            collection_name = f"vector-benchmark-{uuid.uuid4().hex[:8]}"
+            client, collection = await load_firestore(receipts, embeddings, collection_name)
+            firestore_context = (client, collection)
+            backends["firestore"] = FirestoreVectorStore(
+                collection, "embedding", asyncio.Semaphore(8)
+            )
+
+        scenarios = {
+            "unfiltered": {},
+            "filtered": {
+                "start_time": "2024-03-01T00:00:00Z",
+                "end_time": "2024-05-31T23:59:59Z",
+                "min_total_amount": 100.0,
+            },
+        }
+
+        try:
+            print(f"\n{'Backend':<13}{'Scenario':<12}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+                  f"{'mean (ms)':>11}{'recall':>8}")
+            for scenario, filters in scenarios.items():
+                exact_results = None
+                for name, store in backends.items():
+                    if name == "firestore" and filters:
+                        continue  # Needs a composite vector index per filter combination
+                    latencies, results = await time_queries(
+                        store, queries, args.limit, filters
+                    )
+                    if exact_results is None:
+                        exact_results = results
+                    print(f"{name:<13}{scenario:<12}{percentile(latencies, 50):>10.2f}"
+                          f"{percentile(latencies, 95):>10.2f}"
+                          f"{statistics.mean(latencies):>11.2f}"
+                          f"{recall(results, exact_results):>8.3f}")
+        finally:
+            if firestore_context:
+                await delete_firestore(*firestore_context)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark receipt vector store backends.")
+    parser.add_argument("--receipts", type=int, default=50000, help="Number of receipts")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--limit", type=int, default=5, help="Results per query")
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF lists scanned per query")
+    parser.add_argument("--firestore", action="store_true",
+                        help="Also benchmark Firestore find_nearest on a scratch collection")
+    asyncio.run(main(parser.parse_args()))
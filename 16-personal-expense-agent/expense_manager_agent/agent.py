@@ -2,6 +2,7 @@ from google.adk.agents import Agent
 from expense_manager_agent.tools import (
     store_receipt_data,
     search_receipts_by_metadata_filter,
+    get_expense_summary,
     search_relevant_receipts_by_natural_language_query,
     get_receipt_data_by_image_id,
 )
@@ -33,6 +34,7 @@ root_agent = Agent(
         store_receipt_data,
         get_receipt_data_by_image_id,
         search_receipts_by_metadata_filter,
+        get_expense_summary,
         search_relevant_receipts_by_natural_language_query,
     ],
     planner=BuiltInPlanner(
@@ -0,0 +1,361 @@
+# expense_manager_agent/bulk_import.py
+
+import argparse
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import tarfile
+import time
+import zipfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.vector import Vector
+from google.genai import types
+from pydantic import BaseModel
+
+import logger
+from expense_manager_agent.tools import (
+    EMBEDDING_FIELD_NAME,
+    GENAI_CLIENT,
+    RECEIPT_DESC_FORMAT,
+    SETTINGS,
+    VECTOR_STORE,
+    build_receipt_document,
+    embed_texts,
+    find_existing_receipt_ids,
+    sanitize_image_id,
+)
+
+EXTRACTION_MODEL = "gemini-2.5-flash"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".heic", ".heif"}
+MAX_WRITE_ATTEMPTS = 5
+EXTRACTION_PROMPT = """
+Extract the data of this receipt image.
+- transaction_time must be in ISO format 'YYYY-MM-DDTHH:MM:SS.ssssssZ'
+- currency is the ISO currency code, derived from the store location if not printed. If unsure, use "IDR"
+- Set is_receipt to false if the image is not a receipt
+"""
+
+
+class ExtractedItem(BaseModel):
+    """A purchased item read from a receipt image."""
+
+    name: str
+    price: float
+    quantity: int = 1
+
+
+class ExtractedReceipt(BaseModel):
+    """Receipt data read from a receipt image."""
+
+    is_receipt: bool
+    store_name: str = ""
+    transaction_time: str = ""
+    total_amount: float = 0.0
+    currency: str = "IDR"
+    purchased_items: List[ExtractedItem] = []
+
+
+@dataclass
+class ImportReport:
+    """Counters and timings of a bulk import run."""
+
+    files: int = 0
+    receipts: int = 0
+    stored: int = 0
+    already_stored: int = 0
+    duplicates: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def receipts_per_second(self) -> float:
+        return self.stored / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def add_stage_time(self, stage: str, seconds: float) -> None:
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+
+def iter_source_files(source: str) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (name, content) of every receipt image or JSON file in a folder or archive.
+
+    Args:
+        source (str): A directory, or a .zip, .tar, .tar.gz or .tgz archive.
+
+    Yields:
+        Tuple[str, bytes]: The file name and its content.
+    """
+
+    def is_supported(name: str) -> bool:
+        extension = os.path.splitext(name)[1].lower()
+        return extension in IMAGE_EXTENSIONS or extension == ".json"
+
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if is_supported(name):
+                    path = os.path.join(root, name)
+                    with open(path, "rb") as f:
+                        yield os.path.relpath(path, source), f.read()
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and is_supported(info.filename):
+                    yield info.filename, archive.read(info)
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as archive:
+            for member in archive:
+                if member.isfile() and is_supported(member.name):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise ValueError(f"{source} is not a directory or a zip or tar archive")
+
+
+def _image_id(content: bytes) -> str:
+    # Same ID as images uploaded through the chat, so re-uploads are recognized
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+async def _extract_image(name: str, content: bytes) -> List[Dict[str, Any]]:
+    mime_type = mimetypes.guess_type(name)[0] or "image/jpeg"
+    response = await GENAI_CLIENT.aio.models.generate_content(
+        model=EXTRACTION_MODEL,
+        contents=[
+            types.Part(inline_data=types.Blob(mime_type=mime_type, data=content)),
+            EXTRACTION_PROMPT,
+        ],
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=ExtractedReceipt,
+        ),
+    )
+    receipt = response.parsed
+    if receipt is None:
+        raise ValueError("Could not parse the extracted receipt data")
+    if not receipt.is_receipt:
+        raise ValueError("Image is not a receipt")
+
+    data = receipt.model_dump(exclude={"is_receipt"})
+    data["receipt_id"] = _image_id(content)
+    return [data]
+
+
+def _parse_json(content: bytes) -> List[Dict[str, Any]]:
+    data = json.loads(content)
+    receipts = data if isinstance(data, list) else [data]
+    for receipt in receipts:
+        if not isinstance(receipt, dict):
+            raise ValueError("JSON receipts must be objects")
+        receipt_id = receipt.get("receipt_id") or receipt.get("image_id")
+        if not receipt_id:
+            # Stable ID for receipts exported without one, so re-imports are skipped
+            canonical = json.dumps(receipt, sort_keys=True, default=str).encode("utf-8")
+            receipt_id = _image_id(canonical)
+        receipt["receipt_id"] = sanitize_image_id(str(receipt_id))
+    return receipts
+
+
+async def _extract(
+    name: str, content: bytes, limiter: asyncio.Semaphore
+) -> Tuple[str, List[Dict[str, Any]], Optional[str]]:
+    try:
+        if name.lower().endswith(".json"):
+            return name, _parse_json(content), None
+        async with limiter:
+            return name, await _extract_image(name, content), None
+    except Exception as e:
+        return name, [], str(e)
+
+
+def _bulk_write(client: firestore.Client, docs: List[Dict[str, Any]]) -> List[str]:
+    """Write documents with a BulkWriter and return the receipt IDs that failed."""
+    collection = client.collection(SETTINGS.DB_COLLECTION_NAME)
+    failed = []
+
+    def on_write_error(failure, _writer) -> bool:
+        if failure.attempts < MAX_WRITE_ATTEMPTS:
+            return True  # Retry with backoff
+        failed.append(failure.operation.document_data["receipt_id"])
+        return False
+
+    writer = client.bulk_writer()
+    writer.on_write_error(on_write_error)
+    for doc in docs:
+        writer.create(collection.document(), doc)
+    writer.close()  # Flushes and waits for every write
+
+    return failed
+
+
+async def _import_chunk(
+    files: List[Tuple[str, bytes]],
+    report: ImportReport,
+    client: firestore.Client,
+    extraction_limiter: asyncio.Semaphore,
+    seen_ids: set,
+) -> None:
+    # Extract every file of the chunk concurrently
+    started = time.perf_counter()
+    extracted = await asyncio.gather(
+        *(_extract(name, content, extraction_limiter) for name, content in files)
+    )
+    report.add_stage_time("extract", time.perf_counter() - started)
+
+    docs = []
+    for name, receipts, error in extracted:
+        if error:
+            report.failed.append((name, error))
+            continue
+        for receipt in receipts:
+            report.receipts += 1
+            if receipt["receipt_id"] in seen_ids:
+                report.duplicates += 1
+                continue
+            try:
+                doc = build_receipt_document(
+                    image_id=receipt["receipt_id"],
+                    store_name=receipt.get("store_name", ""),
+                    transaction_time=receipt.get("transaction_time"),
+                    total_amount=receipt.get("total_amount"),
+                    purchased_items=receipt.get("purchased_items", []),
+                    currency=receipt.get("currency") or "IDR",
+                )
+            except (ValueError, TypeError) as e:
+                report.failed.append((name, str(e)))
+                continue
+            seen_ids.add(doc["receipt_id"])
+            docs.append(doc)
+
+    if not docs:
+        return
+
+    # One batched existence check for the whole chunk
+    started = time.perf_counter()
+    existing = await find_existing_receipt_ids([doc["receipt_id"] for doc in docs])
+    report.add_stage_time("dedupe", time.perf_counter() - started)
+    report.already_stored += sum(doc["receipt_id"] in existing for doc in docs)
+    docs = [doc for doc in docs if doc["receipt_id"] not in existing]
+    if not docs:
+        return
+
+    started = time.perf_counter()
+    embeddings = await embed_texts([RECEIPT_DESC_FORMAT.format(**doc) for doc in docs])
+    report.add_stage_time("embed", time.perf_counter() - started)
+
+    started = time.perf_counter()
+    failed_ids = set(
+        await asyncio.to_thread(
+            _bulk_write,
+            client,
+            [
+                dict(doc, **{EMBEDDING_FIELD_NAME: Vector(embedding)})
+                for doc, embedding in zip(docs, embeddings)
+            ],
+        )
+    )
+    report.add_stage_time("write", time.perf_counter() - started)
+
+    written = [
+        (doc, embedding)
+        for doc, embedding in zip(docs, embeddings)
+        if doc["receipt_id"] not in failed_ids
+    ]
+    report.failed.extend(
+        (receipt_id, "Firestore write failed") for receipt_id in failed_ids
+    )
+    report.stored += len(written)
+
+    if written:
+        started = time.perf_counter()
+        await VECTOR_STORE.add_many(
+            [doc for doc, _ in written], [embedding for _, embedding in written]
+        )
+        report.add_stage_time("index", time.perf_counter() - started)
+
+
+async def import_receipts(
+    source: str, concurrency: int = 8, chunk_size: int = 500
+) -> ImportReport:
+    """
+    Import every receipt image or JSON file from a folder or archive.
+
+    Files are processed in chunks. Each chunk extracts its files concurrently,
+    checks which receipts already exist in one batched query, embeds the new
+    receipts in batched requests and writes them with a Firestore BulkWriter.
+
+    Args:
+        source (str): A directory, or a .zip, .tar, .tar.gz or .tgz archive.
+        concurrency (int, optional): Maximum number of images extracted at once.
+        chunk_size (int, optional): Number of files processed per chunk.
+
+    Returns:
+        ImportReport: Counters, failures and timings of the import.
+    """
+    report = ImportReport()
+    client = firestore.Client(project=SETTINGS.GCLOUD_PROJECT_ID)
+    extraction_limiter = asyncio.Semaphore(concurrency)
+    seen_ids: set = set()
+
+    started = time.perf_counter()
+    try:
+        chunk: List[Tuple[str, bytes]] = []
+        for item in iter_source_files(source):
+            report.files += 1
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                await _import_chunk(chunk, report, client, extraction_limiter, seen_ids)
+                chunk = []
+        if chunk:
+            await _import_chunk(chunk, report, client, extraction_limiter, seen_ids)
+    finally:
+        report.elapsed_seconds = time.perf_counter() - started
+        client.close()
+
+    logger.info(
+        "Bulk receipt import finished",
+        source=source,
+        files=report.files,
+        stored=report.stored,
+        already_stored=report.already_stored,
+        failed=len(report.failed),
+        elapsed_seconds=round(report.elapsed_seconds, 2),
+        receipts_per_second=round(report.receipts_per_second, 2),
+    )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Bulk import receipt images or JSON from a folder or archive."
+    )
+    parser.add_argument("source", help="Directory, .zip, .tar, .tar.gz or .tgz archive")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Maximum number of images extracted at once")
+    parser.add_argument("--chunk-size", type=int, default=500,
+                        help="Number of files processed per chunk")
+    args = parser.parse_args()
+
+    report = asyncio.run(import_receipts(args.source, args.concurrency, args.chunk_size))
+
+    print(f"\nFiles:           {report.files}")
+    print(f"Receipts found:  {report.receipts}")
+    print(f"Stored:          {report.stored}")
+    print(f"Already stored:  {report.already_stored}")
+    print(f"Duplicates:      {report.duplicates}")
+    print(f"Failed:          {len(report.failed)}")
+    for stage, seconds in report.stage_seconds.items():
+        print(f"  {stage:<8} {seconds:>8.2f}s")
+    print(f"Elapsed:         {report.elapsed_seconds:.2f}s")
+    print(f"Throughput:      {report.receipts_per_second:.2f} receipts/sec")
+    for name, error in report.failed[:20]:
+        print(f"  failed {name}: {error}")
+
+
+if __name__ == "__main__":
+    main()
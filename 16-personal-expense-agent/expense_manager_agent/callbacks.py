@@ -1,10 +1,84 @@
 # expense_manager_agent/callbacks.py
 
 import hashlib
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
 from google.genai import types
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.models.llm_request import LlmRequest
 
+# Number of most recent user messages that keep their image data
+IMAGE_HISTORY_WINDOW = 3
+IMAGE_ID_PREFIX = "[IMAGE-ID "
+# Byte budget of the image bytes referenced by memoized messages
+MEMO_MAX_BYTES = 256 * 1024 * 1024
+
+
+class _ProcessedParts(NamedTuple):
+    images: Tuple[bytes, ...]  # Keeps the bytes alive so their ids are not reused
+    window_parts: List[types.Part]  # With image data and placeholders
+    pruned_parts: List[types.Part]  # With placeholders only
+
+
+# ADK rebuilds llm_request.contents from the session events on every LLM call, but
+# its deep copies share the same immutable image bytes objects. The identity of
+# those bytes therefore names a user message across calls, so each message is
+# hashed and rewritten once and later calls only look up the result.
+_processed: "OrderedDict[Tuple[int, ...], _ProcessedParts]" = OrderedDict()
+_processed_bytes = 0
+
+
+def _image_placeholder(image_data: bytes) -> types.Part:
+    image_hash_id = hashlib.sha256(image_data).hexdigest()[:12]
+    return types.Part(text=f"{IMAGE_ID_PREFIX}{image_hash_id}]")
+
+
+def _process_parts(parts: List[types.Part], images: Tuple[bytes, ...]) -> _ProcessedParts:
+    # Add an image ID placeholder after any image data which is missing one
+    window_parts = []
+    for idx, part in enumerate(parts):
+        window_parts.append(part)
+        if part.inline_data is None:
+            continue
+
+        if (
+            (idx + 1 >= len(parts))
+            or (parts[idx + 1].text is None)
+            or (not parts[idx + 1].text.startswith(IMAGE_ID_PREFIX))
+        ):
+            window_parts.append(_image_placeholder(part.inline_data.data))
+
+    pruned_parts = [part for part in window_parts if part.inline_data is None]
+    return _ProcessedParts(images, window_parts, pruned_parts)
+
+
+def _get_processed_parts(content: types.Content) -> Optional[_ProcessedParts]:
+    global _processed_bytes
+
+    images = tuple(
+        part.inline_data.data for part in content.parts if part.inline_data is not None
+    )
+    if not images:
+        return None
+
+    key = tuple(id(image) for image in images)
+    processed = _processed.get(key)
+    if processed is not None:
+        _processed.move_to_end(key)
+        return processed
+
+    processed = _process_parts(content.parts, images)
+    size = sum(len(image) for image in images)
+    if size <= MEMO_MAX_BYTES:
+        _processed[key] = processed
+        _processed_bytes += size
+        while _processed_bytes > MEMO_MAX_BYTES:
+            _, evicted = _processed.popitem(last=False)
+            _processed_bytes -= sum(len(image) for image in evicted.images)
+
+    return processed
+
 
 def modify_image_data_in_history(
     callback_context: CallbackContext, llm_request: LlmRequest
@@ -18,38 +92,23 @@ def modify_image_data_in_history(
     # Process the reversed list
     for content in reversed(llm_request.contents):
         # Only count for user manual query, not function call
-        if (content.role == "user") and (content.parts[0].function_response is None):
-            user_message_count += 1
-            modified_content_parts = []
-
-            # Check any missing image ID placeholder for any image data
-            # Then remove image data from conversation history if more than 3 user messages
-            for idx, part in enumerate(content.parts):
-                if part.inline_data is None:
-                    modified_content_parts.append(part)
-                    continue
-
-                if (
-                    (idx + 1 >= len(content.parts))
-                    or (content.parts[idx + 1].text is None)
-                    or (not content.parts[idx + 1].text.startswith("[IMAGE-ID "))
-                ):
-                    # Generate hash ID for the image and add a placeholder
-                    image_data = part.inline_data.data
-                    hasher = hashlib.sha256(image_data)
-                    image_hash_id = hasher.hexdigest()[:12]
-                    placeholder = f"[IMAGE-ID {image_hash_id}]"
-
-                    # Only keep image data in the last 3 user messages
-                    if user_message_count <= 3:
-                        modified_content_parts.append(part)
-
-                    modified_content_parts.append(types.Part(text=placeholder))
-
-                else:
-                    # Only keep image data in the last 3 user messages
-                    if user_message_count <= 3:
-                        modified_content_parts.append(part)
-
-            # This will modify the contents inside the llm_request
-            content.parts = modified_content_parts
+        if (
+            (content.role != "user")
+            or (not content.parts)
+            or (content.parts[0].function_response is not None)
+        ):
+            continue
+
+        user_message_count += 1
+
+        # Messages without image data are sent as they are
+        processed = _get_processed_parts(content)
+        if processed is None:
+            continue
+
+        # Only keep image data in the last 3 user messages, always keep the placeholders
+        # This will modify the contents inside the llm_request
+        if user_message_count <= IMAGE_HISTORY_WINDOW:
+            content.parts = list(processed.window_parts)
+        else:
+            content.parts = list(processed.pruned_parts)
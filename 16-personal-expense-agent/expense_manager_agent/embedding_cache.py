@@ -0,0 +1,275 @@
+# expense_manager_agent/embedding_cache.py
+
+import array
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used_at ON embeddings (last_used_at);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share a cache entry."""
+    return " ".join(text.split()).casefold()
+
+
+def make_cache_key(model: str, text: str) -> str:
+    """Build the cache key for an embedding of the given text by the given model."""
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: an in-process LRU backed by a SQLite file.
+
+    Entries are keyed on model plus normalized text and expire after a TTL.
+    Both tiers evict their least recently used entries once full. Concurrent
+    misses for the same key share a single embedding call.
+
+    Args:
+        memory_size: Maximum number of embeddings kept in memory.
+        disk_size: Maximum number of embeddings kept in the SQLite file.
+        ttl_seconds: Age after which an entry is treated as a miss.
+        path: SQLite file path. An empty path disables the disk tier.
+    """
+
+    def __init__(
+        self,
+        memory_size: int = 1024,
+        disk_size: int = 100_000,
+        ttl_seconds: float = 30 * 24 * 3600,
+        path: str = "",
+    ):
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, tuple[float, List[float]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "shared": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+
+    async def get_or_embed(
+        self,
+        model: str,
+        text: str,
+        embed: Callable[[str], Awaitable[List[float]]],
+    ) -> List[float]:
+        """
+        Return the cached embedding of the text, computing it with `embed` on a miss.
+
+        Args:
+            model (str): The embedding model name, part of the cache key.
+            text (str): The text to embed.
+            embed (Callable[[str], Awaitable[List[float]]]): Coroutine function
+                that computes the embedding on a miss.
+
+        Returns:
+            List[float]: The embedding vector of the text.
+        """
+        key = make_cache_key(model, text)
+
+        vector = self._get_memory(key)
+        if vector is not None:
+            self._counts["memory_hits"] += 1
+            return vector
+
+        # Another request is already embedding this text, wait for its result
+        if key in self._inflight:
+            self._counts["shared"] += 1
+            return await asyncio.shield(self._inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = await asyncio.to_thread(self._get_disk, key)
+            if entry is not None:
+                self._counts["disk_hits"] += 1
+                created_at, vector = entry
+            else:
+                self._counts["misses"] += 1
+                vector = list(await embed(text))
+                created_at = None
+                await asyncio.to_thread(self._put_disk, key, model, vector)
+
+            self._put_memory(key, vector, created_at)
+            future.set_result(vector)
+            return vector
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def get_or_embed_many(
+        self,
+        model: str,
+        texts: List[str],
+        embed_many: Callable[[List[str]], Awaitable[List[List[float]]]],
+    ) -> List[List[float]]:
+        """
+        Return the embeddings of many texts, computing every miss with one `embed_many` call.
+
+        Args:
+            model (str): The embedding model name, part of the cache key.
+            texts (List[str]): The texts to embed.
+            embed_many (Callable[[List[str]], Awaitable[List[List[float]]]]): Coroutine
+                function that computes the embeddings of the missed texts, in order.
+
+        Returns:
+            List[List[float]]: The embedding vector of each text, in order.
+        """
+        keys = [make_cache_key(model, text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+
+        for key in keys:
+            vector = self._get_memory(key)
+            if vector is not None:
+                self._counts["memory_hits"] += 1
+                vectors[key] = vector
+
+        disk_keys = list(dict.fromkeys(key for key in keys if key not in vectors))
+        disk_entries = await asyncio.to_thread(self._get_disk_many, disk_keys)
+        for key, (created_at, vector) in disk_entries.items():
+            self._counts["disk_hits"] += 1
+            vectors[key] = vector
+            self._put_memory(key, vector, created_at)
+
+        # Embed each distinct missed text once
+        missed = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missed:
+            self._counts["misses"] += len(missed)
+            embedded = [list(v) for v in await embed_many(list(missed.values()))]
+            await asyncio.to_thread(
+                self._put_disk_many, list(missed), model, embedded
+            )
+            for key, vector in zip(missed, embedded):
+                vectors[key] = vector
+                self._put_memory(key, vector)
+
+        return [vectors[key] for key in keys]
+
+    def stats(self) -> Dict[str, float]:
+        """Return lookup counters and the overall hit rate."""
+        lookups = sum(self._counts.values())
+        hits = lookups - self._counts["misses"]
+        return {
+            **self._counts,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def log_stats(self) -> None:
+        """Log the cache counters."""
+        logger.info("Embedding cache stats", **self.stats())
+
+    def _is_expired(self, created_at: float) -> bool:
+        return time.time() - created_at > self.ttl_seconds
+
+    def _get_memory(self, key: str) -> Optional[List[float]]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+
+        created_at, vector = entry
+        if self._is_expired(created_at):
+            del self._memory[key]
+            return None
+
+        self._memory.move_to_end(key)
+        return vector
+
+    def _put_memory(
+        self, key: str, vector: List[float], created_at: Optional[float] = None
+    ) -> None:
+        # Entries read from disk keep their creation time, so both tiers expire together
+        self._memory[key] = (time.time() if created_at is None else created_at, vector)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _get_disk(self, key: str) -> Optional[Tuple[float, List[float]]]:
+        return self._get_disk_many([key]).get(key)
+
+    def _get_disk_many(self, keys: List[str]) -> Dict[str, Tuple[float, List[float]]]:
+        if self._db is None or not keys:
+            return {}
+
+        found, expired = {}, []
+        now = time.time()
+        with self._db_lock:
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                rows = self._db.execute(
+                    "SELECT key, vector, created_at FROM embeddings "
+                    f"WHERE key IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob, created_at in rows:
+                    if self._is_expired(created_at):
+                        expired.append((key,))
+                    else:
+                        found[key] = (created_at, array.array("d", blob).tolist())
+
+            self._db.executemany("DELETE FROM embeddings WHERE key = ?", expired)
+            self._db.executemany(
+                "UPDATE embeddings SET last_used_at = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self._db.commit()
+
+        return found
+
+    def _put_disk(self, key: str, model: str, vector: List[float]) -> None:
+        self._put_disk_many([key], model, [vector])
+
+    def _put_disk_many(
+        self, keys: List[str], model: str, vectors: List[List[float]]
+    ) -> None:
+        if self._db is None:
+            return
+
+        now = time.time()
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, model, array.array("d", vector).tobytes(), now, now)
+                    for key, vector in zip(keys, vectors)
+                ],
+            )
+            # Keep only the most recently used entries
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (self.disk_size,),
+            )
+            self._db.commit()
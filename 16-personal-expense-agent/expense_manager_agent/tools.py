@@ -1,27 +1,60 @@
 # expense_manager_agent/tools.py
 
+import asyncio
 import datetime
 from typing import Dict, List, Any
 from google.cloud import firestore
 from google.cloud.firestore_v1.vector import Vector
 from google.cloud.firestore_v1 import FieldFilter
 from google.cloud.firestore_v1.base_query import And
-from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
 from settings import get_settings
 from google import genai
+from expense_manager_agent.embedding_cache import EmbeddingCache
+from vector_store import create_vector_store
 
 SETTINGS = get_settings()
-DB_CLIENT = firestore.Client(
+# Async client so Firestore round trips don't block the event loop serving other chats
+DB_CLIENT = firestore.AsyncClient(
     project=SETTINGS.GCLOUD_PROJECT_ID
 )  # Will use "(default)" database
 COLLECTION = DB_CLIENT.collection(SETTINGS.DB_COLLECTION_NAME)
 GENAI_CLIENT = genai.Client(
     vertexai=True, location=SETTINGS.GCLOUD_LOCATION, project=SETTINGS.GCLOUD_PROJECT_ID
 )
+# Bound the in-flight backend calls across all sessions, so a burst of requests
+# queues here instead of piling up on the embedding or Firestore APIs
+EMBEDDING_LIMITER = asyncio.Semaphore(SETTINGS.MAX_CONCURRENT_EMBEDDING_CALLS)
+DB_LIMITER = asyncio.Semaphore(SETTINGS.MAX_CONCURRENT_DB_CALLS)
+EMBEDDING_MODEL = "text-embedding-004"
+EMBEDDING_CACHE = EmbeddingCache(
+    memory_size=SETTINGS.EMBEDDING_CACHE_MEMORY_SIZE,
+    disk_size=SETTINGS.EMBEDDING_CACHE_DISK_SIZE,
+    ttl_seconds=SETTINGS.EMBEDDING_CACHE_TTL_SECONDS,
+    path=SETTINGS.EMBEDDING_CACHE_PATH,
+)
 EMBEDDING_DIMENSION = 768
 EMBEDDING_FIELD_NAME = "embedding"
+VECTOR_STORE = create_vector_store(
+    backend=SETTINGS.VECTOR_STORE_BACKEND,
+    collection=COLLECTION,
+    embedding_field=EMBEDDING_FIELD_NAME,
+    limiter=DB_LIMITER,
+    dimension=EMBEDDING_DIMENSION,
+    local_path=SETTINGS.LOCAL_VECTOR_STORE_PATH,
+    ivf_threshold=SETTINGS.LOCAL_VECTOR_STORE_IVF_THRESHOLD,
+    nprobe=SETTINGS.LOCAL_VECTOR_STORE_NPROBE,
+)
 INVALID_ITEMS_FORMAT_ERR = """
 Invalid items format. Must be a list of dictionaries with 'name', 'price', and 'quantity' keys."""
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_SUMMARY_GROUPS = 120
+SUMMARY_GROUP_FIELDS = {
+    "none": None,
+    "store": "store_name",
+    "month": "transaction_time",
+    "currency": "currency",
+}
 RECEIPT_DESC_FORMAT = """
 Store Name: {store_name}
 Transaction Time: {transaction_time}
@@ -41,7 +74,172 @@ def sanitize_image_id(image_id: str) -> str:
     return image_id.strip()
 
 
-def store_receipt_data(
+async def _embed_uncached(text: str) -> List[float]:
+    async with EMBEDDING_LIMITER:
+        result = await GENAI_CLIENT.aio.models.embed_content(
+            model=EMBEDDING_MODEL, contents=text
+        )
+
+    return result.embeddings[0].values
+
+
+async def embed_text(text: str) -> List[float]:
+    """
+    Generate an embedding for the given text without blocking the event loop.
+    Repeated texts are served from the embedding cache.
+
+    Args:
+        text (str): The text to embed.
+
+    Returns:
+        List[float]: The embedding vector of the text.
+    """
+    return await EMBEDDING_CACHE.get_or_embed(EMBEDDING_MODEL, text, _embed_uncached)
+
+
+async def _embed_many_uncached(texts: List[str]) -> List[List[float]]:
+    async def embed_batch(batch: List[str]) -> List[List[float]]:
+        async with EMBEDDING_LIMITER:
+            result = await GENAI_CLIENT.aio.models.embed_content(
+                model=EMBEDDING_MODEL, contents=batch
+            )
+        return [embedding.values for embedding in result.embeddings]
+
+    batch_size = SETTINGS.EMBEDDING_BATCH_SIZE
+    batches = await asyncio.gather(
+        *(
+            embed_batch(texts[i : i + batch_size])
+            for i in range(0, len(texts), batch_size)
+        )
+    )
+
+    return [vector for batch in batches for vector in batch]
+
+
+async def embed_texts(texts: List[str]) -> List[List[float]]:
+    """
+    Generate embeddings for many texts, sending the uncached ones in batched requests.
+
+    Args:
+        texts (List[str]): The texts to embed.
+
+    Returns:
+        List[List[float]]: The embedding vector of each text, in order.
+    """
+    return await EMBEDDING_CACHE.get_or_embed_many(
+        EMBEDDING_MODEL, texts, _embed_many_uncached
+    )
+
+
+async def stream_documents(query) -> List[Dict[str, Any]]:
+    """
+    Run a Firestore query and return the matching documents without their embeddings.
+
+    Args:
+        query: An async Firestore query or vector query.
+
+    Returns:
+        List[Dict[str, Any]]: The data of each matching document.
+    """
+    async with DB_LIMITER:
+        docs = [doc.to_dict() async for doc in query.stream()]
+
+    for data in docs:
+        data.pop(
+            EMBEDDING_FIELD_NAME, None
+        )  # Remove embedding as it's not needed for display
+
+    return docs
+
+
+def build_receipt_document(
+    image_id: str,
+    store_name: str,
+    transaction_time: str,
+    total_amount: float,
+    purchased_items: List[Dict[str, Any]],
+    currency: str = "IDR",
+) -> Dict[str, Any]:
+    """
+    Validate receipt data and build its database document, without the embedding.
+
+    Args:
+        image_id (str): The sanitized unique identifier of the receipt image.
+        store_name (str): The name of the store.
+        transaction_time (str): The time of purchase, in ISO format ("YYYY-MM-DDTHH:MM:SS.ssssssZ").
+        total_amount (float): The total amount spent.
+        purchased_items (List[Dict[str, Any]]): A list of items purchased with their name, price and
+            optional quantity.
+        currency (str, optional): The currency of the transaction. Defaults to "IDR".
+
+    Returns:
+        Dict[str, Any]: The receipt document.
+
+    Raises:
+        ValueError: If the transaction time or items are invalid.
+    """
+    # Validate transaction time
+    if not isinstance(transaction_time, str):
+        raise ValueError(
+            "Invalid transaction time: must be a string in ISO format 'YYYY-MM-DDTHH:MM:SS.ssssssZ'"
+        )
+    try:
+        datetime.datetime.fromisoformat(transaction_time.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(
+            "Invalid transaction time format. Must be in ISO format 'YYYY-MM-DDTHH:MM:SS.ssssssZ'"
+        )
+
+    # Validate items format
+    if not isinstance(purchased_items, list):
+        raise ValueError(INVALID_ITEMS_FORMAT_ERR)
+
+    for _item in purchased_items:
+        if not isinstance(_item, dict) or "name" not in _item or "price" not in _item:
+            raise ValueError(INVALID_ITEMS_FORMAT_ERR)
+
+        if "quantity" not in _item:
+            _item["quantity"] = 1
+
+    return {
+        "receipt_id": image_id,
+        "store_name": store_name,
+        "transaction_time": transaction_time,
+        "total_amount": total_amount,
+        "currency": currency,
+        "purchased_items": purchased_items,
+    }
+
+
+async def find_existing_receipt_ids(image_ids: List[str]) -> set[str]:
+    """
+    Return which of the given receipt image IDs are already stored.
+
+    Firestore `in` filters take at most 30 values, so the IDs are checked in
+    chunks of 30 that run concurrently, reading only the receipt_id field.
+
+    Args:
+        image_ids (List[str]): The sanitized receipt image IDs to check.
+
+    Returns:
+        set[str]: The IDs that already exist.
+    """
+
+    async def check(chunk: List[str]) -> List[str]:
+        query = COLLECTION.where(filter=FieldFilter("receipt_id", "in", chunk)).select(
+            ["receipt_id"]
+        )
+        async with DB_LIMITER:
+            return [doc.to_dict()["receipt_id"] async for doc in query.stream()]
+
+    unique_ids = list(dict.fromkeys(image_ids))
+    chunks = [unique_ids[i : i + 30] for i in range(0, len(unique_ids), 30)]
+    found = await asyncio.gather(*(check(chunk) for chunk in chunks))
+
+    return {image_id for ids in found for image_id in ids}
+
+
+async def store_receipt_data(
     image_id: str,
     store_name: str,
     transaction_time: str,
@@ -76,140 +274,282 @@ def store_receipt_data(
         image_id = sanitize_image_id(image_id)
 
         # Check if the receipt already exists
-        doc = get_receipt_data_by_image_id(image_id)
+        doc = await get_receipt_data_by_image_id(image_id)
 
         if doc:
             return f"Receipt with ID {image_id} already exists"
 
-        # Validate transaction time
-        if not isinstance(transaction_time, str):
-            raise ValueError(
-                "Invalid transaction time: must be a string in ISO format 'YYYY-MM-DDTHH:MM:SS.ssssssZ'"
-            )
-        try:
-            datetime.datetime.fromisoformat(transaction_time.replace("Z", "+00:00"))
-        except ValueError:
-            raise ValueError(
-                "Invalid transaction time format. Must be in ISO format 'YYYY-MM-DDTHH:MM:SS.ssssssZ'"
-            )
-
-        # Validate items format
-        if not isinstance(purchased_items, list):
-            raise ValueError(INVALID_ITEMS_FORMAT_ERR)
-
-        for _item in purchased_items:
-            if (
-                not isinstance(_item, dict)
-                or "name" not in _item
-                or "price" not in _item
-            ):
-                raise ValueError(INVALID_ITEMS_FORMAT_ERR)
-
-            if "quantity" not in _item:
-                _item["quantity"] = 1
-
-        # Create a combined text from all receipt information for better embedding
-        result = GENAI_CLIENT.models.embed_content(
-            model="text-embedding-004",
-            contents=RECEIPT_DESC_FORMAT.format(
-                store_name=store_name,
-                transaction_time=transaction_time,
-                total_amount=total_amount,
-                currency=currency,
-                purchased_items=purchased_items,
-                receipt_id=image_id,
-            ),
+        doc = build_receipt_document(
+            image_id=image_id,
+            store_name=store_name,
+            transaction_time=transaction_time,
+            total_amount=total_amount,
+            purchased_items=purchased_items,
+            currency=currency,
         )
 
-        embedding = result.embeddings[0].values
+        # Create a combined text from all receipt information for better embedding
+        embedding = await embed_text(RECEIPT_DESC_FORMAT.format(**doc))
+        doc[EMBEDDING_FIELD_NAME] = Vector(embedding)
 
-        doc = {
-            "receipt_id": image_id,
-            "store_name": store_name,
-            "transaction_time": transaction_time,
-            "total_amount": total_amount,
-            "currency": currency,
-            "purchased_items": purchased_items,
-            EMBEDDING_FIELD_NAME: Vector(embedding),
-        }
+        async with DB_LIMITER:
+            await COLLECTION.add(doc)
 
-        COLLECTION.add(doc)
+        doc.pop(EMBEDDING_FIELD_NAME)
+        await VECTOR_STORE.add(doc, embedding)
 
         return f"Receipt stored successfully with ID: {image_id}"
     except Exception as e:
         raise Exception(f"Failed to store receipt: {str(e)}")
 
 
-def search_receipts_by_metadata_filter(
+def build_metadata_query(
+    start_time: str,
+    end_time: str,
+    min_total_amount: float = -1.0,
+    max_total_amount: float = -1.0,
+):
+    """
+    Build a receipts query filtered by time range and optionally by amount.
+
+    Args:
+        start_time (str): The start datetime for the filter (in ISO format, e.g. 'YYYY-MM-DDTHH:MM:SS.ssssssZ').
+        end_time (str): The end datetime for the filter (in ISO format, e.g. 'YYYY-MM-DDTHH:MM:SS.ssssssZ').
+        min_total_amount (float): The minimum total amount for the filter (inclusive). -1 to skip.
+        max_total_amount (float): The maximum total amount for the filter (inclusive). -1 to skip.
+
+    Returns:
+        AsyncQuery: The filtered query.
+
+    Raises:
+        ValueError: If the time range is invalid.
+    """
+    # Validate start and end times
+    if not isinstance(start_time, str) or not isinstance(end_time, str):
+        raise ValueError("start_time and end_time must be strings in ISO format")
+    try:
+        datetime.datetime.fromisoformat(start_time.replace("Z", "+00:00"))
+        datetime.datetime.fromisoformat(end_time.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError("start_time and end_time must be strings in ISO format")
+
+    # Build the composite query by properly chaining conditions
+    # Notes that this demo assume 1 user only,
+    # need to refactor the query for multiple user
+    filters = [
+        FieldFilter("transaction_time", ">=", start_time),
+        FieldFilter("transaction_time", "<=", end_time),
+    ]
+
+    # Add optional filters
+    if min_total_amount != -1:
+        filters.append(FieldFilter("total_amount", ">=", min_total_amount))
+
+    if max_total_amount != -1:
+        filters.append(FieldFilter("total_amount", "<=", max_total_amount))
+
+    # Apply the filters
+    return COLLECTION.where(filter=And(filters=filters))
+
+
+async def search_receipts_by_metadata_filter(
     start_time: str,
     end_time: str,
     min_total_amount: float = -1.0,
     max_total_amount: float = -1.0,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    page_token: str = "",
 ) -> str:
     """
     Filter receipts by metadata within a specific time range and optionally by amount.
+    Results are ordered by transaction time and returned one page at a time. To answer
+    questions about totals, counts or spending per store or month, use `get_expense_summary` instead.
 
     Args:
         start_time (str): The start datetime for the filter (in ISO format, e.g. 'YYYY-MM-DDTHH:MM:SS.ssssssZ').
         end_time (str): The end datetime for the filter (in ISO format, e.g. 'YYYY-MM-DDTHH:MM:SS.ssssssZ').
         min_total_amount (float): The minimum total amount for the filter (inclusive). Defaults to -1.
         max_total_amount (float): The maximum total amount for the filter (inclusive). Defaults to -1.
+        page_size (int, optional): Maximum number of receipts to return (default: 20, max: 100).
+        page_token (str, optional): The next page token from a previous call to continue the listing.
+            Leave empty for the first page.
 
     Returns:
-        str: A string containing the list of receipt data matching all applied filters.
+        str: A string containing the list of receipt data matching all applied filters, followed by
+            the next page token if more receipts match.
 
     Raises:
         Exception: If the search failed or input is invalid.
     """
     try:
-        # Validate start and end times
-        if not isinstance(start_time, str) or not isinstance(end_time, str):
-            raise ValueError("start_time and end_time must be strings in ISO format")
-        try:
-            datetime.datetime.fromisoformat(start_time.replace("Z", "+00:00"))
-            datetime.datetime.fromisoformat(end_time.replace("Z", "+00:00"))
-        except ValueError:
-            raise ValueError("start_time and end_time must be strings in ISO format")
-
-        # Start with the base collection reference
-        query = COLLECTION
-
-        # Build the composite query by properly chaining conditions
-        # Notes that this demo assume 1 user only,
-        # need to refactor the query for multiple user
-        filters = [
-            FieldFilter("transaction_time", ">=", start_time),
-            FieldFilter("transaction_time", "<=", end_time),
-        ]
-
-        # Add optional filters
-        if min_total_amount != -1:
-            filters.append(FieldFilter("total_amount", ">=", min_total_amount))
-
-        if max_total_amount != -1:
-            filters.append(FieldFilter("total_amount", "<=", max_total_amount))
-
-        # Apply the filters
-        composite_filter = And(filters=filters)
-        query = query.where(filter=composite_filter)
-
-        # Execute the query and collect results
-        search_result_description = "Search by Metadata Results:\n"
-        for doc in query.stream():
-            data = doc.to_dict()
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        query = build_metadata_query(
+            start_time, end_time, min_total_amount, max_total_amount
+        ).order_by("transaction_time")
+
+        async with DB_LIMITER:
+            if page_token:
+                cursor = await COLLECTION.document(page_token).get()
+                if not cursor.exists:
+                    raise ValueError(f"Invalid page token: {page_token}")
+                query = query.start_after(cursor)
+
+            # Fetch one extra receipt to know whether there is a next page
+            snapshots = [doc async for doc in query.limit(page_size + 1).stream()]
+
+        results = ["Search by Metadata Results:\n"]
+        for snapshot in snapshots[:page_size]:
+            data = snapshot.to_dict()
             data.pop(
                 EMBEDDING_FIELD_NAME, None
             )  # Remove embedding as it's not needed for display
+            results.append(RECEIPT_DESC_FORMAT.format(**data))
 
-            search_result_description += f"\n{RECEIPT_DESC_FORMAT.format(**data)}"
+        if len(snapshots) > page_size:
+            results.append(f"Next page token: {snapshots[page_size - 1].id}")
 
-        return search_result_description
+        return "\n".join(results)
     except Exception as e:
         raise Exception(f"Error filtering receipts: {str(e)}")
 
 
-def search_relevant_receipts_by_natural_language_query(
-    query_text: str, limit: int = 5
+def _month_ranges(start_time: str, end_time: str) -> List[tuple[str, str, str]]:
+    """Split a time range into (month label, range start, range end) calendar months."""
+    start = datetime.datetime.fromisoformat(start_time.replace("Z", "+00:00"))
+    end = datetime.datetime.fromisoformat(end_time.replace("Z", "+00:00"))
+
+    ranges = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        month_start = f"{year:04d}-{month:02d}-01T00:00:00"
+        next_month_start = f"{next_year:04d}-{next_month:02d}-01T00:00:00"
+        ranges.append(
+            (
+                f"{year:04d}-{month:02d}",
+                max(month_start, start_time),
+                next_month_start,
+            )
+        )
+        year, month = next_year, next_month
+
+    if len(ranges) > MAX_SUMMARY_GROUPS:
+        raise ValueError(
+            f"Time range spans {len(ranges)} months, at most {MAX_SUMMARY_GROUPS} can be grouped"
+        )
+
+    return ranges
+
+
+async def _distinct_values(query, field: str) -> List[str]:
+    """Return the distinct values of a field among the query results, reading only that field."""
+    async with DB_LIMITER:
+        values = {
+            doc.to_dict().get(field) async for doc in query.select([field]).stream()
+        }
+
+    values.discard(None)
+    if len(values) > MAX_SUMMARY_GROUPS:
+        raise ValueError(
+            f"Found {len(values)} distinct values of {field}, at most {MAX_SUMMARY_GROUPS} can be grouped. "
+            "Narrow the time range or amount filters"
+        )
+
+    return sorted(values)
+
+
+async def _aggregate(query) -> tuple[int, float]:
+    """Run count and sum of total_amount as one server-side aggregation query."""
+    aggregation = query.count(alias="count").sum("total_amount", alias="total")
+    async with DB_LIMITER:
+        results = await aggregation.get()
+
+    values = {result.alias: result.value for result in results[0]}
+    return int(values.get("count") or 0), float(values.get("total") or 0)
+
+
+async def get_expense_summary(
+    start_time: str,
+    end_time: str,
+    group_by: str = "none",
+    min_total_amount: float = -1.0,
+    max_total_amount: float = -1.0,
+) -> str:
+    """
+    Summarize spending within a specific time range using database aggregation, without
+    retrieving the receipts themselves. Use this tool for questions about total spending,
+    number of receipts, average spending, or spending per store, month or currency.
+
+    Args:
+        start_time (str): The start datetime for the summary (in ISO format, e.g. 'YYYY-MM-DDTHH:MM:SS.ssssssZ').
+        end_time (str): The end datetime for the summary (in ISO format, e.g. 'YYYY-MM-DDTHH:MM:SS.ssssssZ').
+        group_by (str, optional): How to group the summary, one of "none", "store", "month" or "currency".
+            Defaults to "none". Totals are only meaningful within one currency, group by "currency"
+            if the receipts may use different currencies.
+        min_total_amount (float): The minimum receipt total amount to include (inclusive). Defaults to -1.
+        max_total_amount (float): The maximum receipt total amount to include (inclusive). Defaults to -1.
+
+    Returns:
+        str: A markdown table with the receipt count, total amount and average amount of each group.
+
+    Raises:
+        Exception: If the aggregation failed or input is invalid.
+    """
+    try:
+        if group_by not in SUMMARY_GROUP_FIELDS:
+            raise ValueError(
+                f"group_by must be one of {', '.join(SUMMARY_GROUP_FIELDS)}"
+            )
+
+        query = build_metadata_query(
+            start_time, end_time, min_total_amount, max_total_amount
+        )
+
+        if group_by == "none":
+            groups = [(f"{start_time} - {end_time}", query)]
+        elif group_by == "month":
+            groups = [
+                (
+                    label,
+                    build_metadata_query(
+                        month_start, end_time, min_total_amount, max_total_amount
+                    ).where(filter=FieldFilter("transaction_time", "<", month_end)),
+                )
+                for label, month_start, month_end in _month_ranges(
+                    start_time, end_time
+                )
+            ]
+        else:
+            field = SUMMARY_GROUP_FIELDS[group_by]
+            groups = [
+                (value, query.where(filter=FieldFilter(field, "==", value)))
+                for value in await _distinct_values(query, field)
+            ]
+
+        # Each group is an independent aggregation query, run them together
+        aggregates = await asyncio.gather(*(_aggregate(q) for _, q in groups))
+
+        header = group_by if group_by != "none" else "period"
+        rows = [f"| {header} | receipts | total_amount | average_amount |"]
+        rows.append("|---|---|---|---|")
+        for (label, _), (count, total) in zip(groups, aggregates):
+            if count == 0 and group_by != "none":
+                continue
+            average = total / count if count else 0.0
+            rows.append(f"| {label} | {count} | {total:.2f} | {average:.2f} |")
+
+        return "Expense Summary Results:\n" + "\n".join(rows)
+    except Exception as e:
+        raise Exception(f"Error summarizing expenses: {str(e)}")
+
+
+async def search_relevant_receipts_by_natural_language_query(
+    query_text: str,
+    limit: int = 5,
+    start_time: str = "",
+    end_time: str = "",
+    min_total_amount: float = -1.0,
+    max_total_amount: float = -1.0,
 ) -> str:
     """
     Search for receipts with content most similar to the query using vector search.
@@ -220,6 +560,12 @@ def search_relevant_receipts_by_natural_language_query(
     Args:
         query_text (str): The search text (e.g., "coffee", "dinner", "groceries").
         limit (int, optional): Maximum number of results to return (default: 5).
+        start_time (str, optional): Only search receipts from this datetime (in ISO format,
+            e.g. 'YYYY-MM-DDTHH:MM:SS.ssssssZ'). Defaults to "" for no lower bound.
+        end_time (str, optional): Only search receipts up to this datetime (in ISO format,
+            e.g. 'YYYY-MM-DDTHH:MM:SS.ssssssZ'). Defaults to "" for no upper bound.
+        min_total_amount (float, optional): The minimum total amount (inclusive). Defaults to -1.
+        max_total_amount (float, optional): The maximum total amount (inclusive). Defaults to -1.
 
     Returns:
         str: A string containing the list of contextually relevant receipt data.
@@ -229,35 +575,28 @@ def search_relevant_receipts_by_natural_language_query(
     """
     try:
         # Generate embedding for the query text
-        result = GENAI_CLIENT.models.embed_content(
-            model="text-embedding-004", contents=query_text
-        )
-        query_embedding = result.embeddings[0].values
-
-        # Notes that this demo assume 1 user only,
-        # need to refactor the query for multiple user
-        vector_query = COLLECTION.find_nearest(
-            vector_field=EMBEDDING_FIELD_NAME,
-            query_vector=Vector(query_embedding),
-            distance_measure=DistanceMeasure.EUCLIDEAN,
+        query_embedding = await embed_text(query_text)
+
+        receipts = await VECTOR_STORE.search(
+            query_embedding,
             limit=limit,
+            start_time=start_time,
+            end_time=end_time,
+            min_total_amount=min_total_amount,
+            max_total_amount=max_total_amount,
         )
 
-        # Execute the query and collect results
-        search_result_description = "Search by Contextual Relevance Results:\n"
-        for doc in vector_query.stream():
-            data = doc.to_dict()
-            data.pop(
-                EMBEDDING_FIELD_NAME, None
-            )  # Remove embedding as it's not needed for display
-            search_result_description += f"\n{RECEIPT_DESC_FORMAT.format(**data)}"
+        # Collect the results
+        results = ["Search by Contextual Relevance Results:\n"]
+        for data in receipts:
+            results.append(RECEIPT_DESC_FORMAT.format(**data))
 
-        return search_result_description
+        return "\n".join(results)
     except Exception as e:
         raise Exception(f"Error searching receipts: {str(e)}")
 
 
-def get_receipt_data_by_image_id(image_id: str) -> Dict[str, Any]:
+async def get_receipt_data_by_image_id(image_id: str) -> Dict[str, Any]:
     """
     Retrieve receipt data from the database using the image_id.
 
@@ -282,13 +621,10 @@ def get_receipt_data_by_image_id(image_id: str) -> Dict[str, Any]:
     # Notes that this demo assume 1 user only,
     # need to refactor the query for multiple user
     query = COLLECTION.where(filter=FieldFilter("receipt_id", "==", image_id)).limit(1)
-    docs = list(query.stream())
+    docs = await stream_documents(query)
 
     if not docs:
         return {}
 
     # Get the first matching document
-    doc_data = docs[0].to_dict()
-    doc_data.pop(EMBEDDING_FIELD_NAME, None)
-
-    return doc_data
\ No newline at end of file
+    return docs[0]
\ No newline at end of file
@@ -2,12 +2,13 @@ import mimetypes
 import gradio as gr
 import requests
 import base64
-from typing import List, Dict, Any
+import json
+from typing import Iterator, List, Dict, Any
 from settings import get_settings
 from PIL import Image 
 import io
 import uuid
-from schema import ImageData, ChatRequest, ChatResponse
+from schema import ImageData, ChatRequest
 
 
 SETTINGS = get_settings()
@@ -61,18 +62,38 @@ def decode_base64_to_image(base64_data: str) -> Image.Image:
     return image
 
 
+def iter_sse_events(response: requests.Response) -> Iterator[tuple[str, Dict[str, Any]]]:
+    """Parse a server-sent events response into (event, data) pairs.
+
+    Args:
+        response: A streaming response from the backend.
+
+    Yields:
+        Tuples of the event name and its decoded JSON data.
+    """
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:") :].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:") :].strip())
+        elif not line and data:
+            yield event, json.loads("\n".join(data))
+            event, data = "message", []
+
+
 def get_response_from_llm_backend(
     message: Dict[str, Any],
     history: List[Dict[str, Any]],
-) -> List[str | gr.Image]:
-    """Send the message and history to the backend and get a response.
+) -> Iterator[List[str | gr.ChatMessage | gr.Image]]:
+    """Send the message and history to the backend and stream its response.
 
     Args:
         message: Dictionary containing the current message with 'text' and optional 'files' keys.
         history: List of previous message dictionaries in the conversation.
 
-    Returns:
-        List containing text response and any image attachments from the backend service.
+    Yields:
+        The text response, thinking process and any image attachments received so far.
     """
     # Extract files and convert to base64
     image_data = []
@@ -88,36 +109,52 @@ def get_response_from_llm_backend(
         user_id="default_user",
     )
 
-    # Send request to backend
-    try:
-        response = requests.post(SETTINGS.BACKEND_URL, json=payload.model_dump())
-        response.raise_for_status()  # Raise exception for HTTP errors
-
-        result = ChatResponse(**response.json())
-        if result.error:
-            return [f"Error: {result.error}"]
-
-        chat_responses = []
-
-        if result.thinking_process:
-            chat_responses.append(
-                gr.ChatMessage(
-                    role="assistant",
-                    content=result.thinking_process,
-                    metadata={"title": "🧠 Thinking Process"},
-                )
-            )
-
-        chat_responses.append(gr.ChatMessage(role="assistant", content=result.response))
+    thinking = gr.ChatMessage(
+        role="assistant",
+        content="",
+        metadata={"title": "🧠 Thinking Process", "status": "pending"},
+    )
+    answer = gr.ChatMessage(role="assistant", content="")
+    attachments = []
 
-        if result.attachments:
-            for attachment in result.attachments:
-                image_data = attachment.serialized_image
-                chat_responses.append(gr.Image(decode_base64_to_image(image_data)))
+    def current_responses() -> List[str | gr.ChatMessage | gr.Image]:
+        responses = [thinking] if thinking.content else []
+        if answer.content:
+            responses.append(answer)
+        return responses + attachments
 
-        return chat_responses
+    # Send request to backend and render its events as they arrive
+    try:
+        with requests.post(
+            SETTINGS.BACKEND_STREAM_URL, json=payload.model_dump(), stream=True
+        ) as response:
+            response.raise_for_status()  # Raise exception for HTTP errors
+
+            for event, data in iter_sse_events(response):
+                if event == "thinking":
+                    thinking.content += data["text"]
+                elif event == "tool_call":
+                    thinking.content += f"\n🔧 `{data['name']}`\n"
+                elif event == "text":
+                    answer.content += data["text"]
+                elif event == "final":
+                    # The processed final response replaces the streamed chunks
+                    thinking.content = data["thinking_process"]
+                    thinking.metadata["status"] = "done"
+                    answer.content = data["response"]
+                elif event == "attachment":
+                    attachments.append(
+                        gr.Image(decode_base64_to_image(data["serialized_image"]))
+                    )
+                elif event == "error":
+                    yield [f"Error: {data['error']}"]
+                    return
+                else:
+                    continue
+
+                yield current_responses()
     except requests.exceptions.RequestException as e:
-        return [f"Error connecting to backend service: {str(e)}"]
+        yield [f"Error connecting to backend service: {str(e)}"]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,216 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+IMAGE_HASH_PATTERN = re.compile(r"^[0-9a-f]{12}$")
+TEMP_PREFIX = ".tmp-"
+
+
+class ImageCache:
+    """Content-addressed cache of image artifacts in memory and on disk.
+
+    Images are keyed by the 12-char SHA-256 hash of their bytes, namespaced by user
+    so one user's cached images are never served to another. Since a hash always
+    names the same bytes, entries never need invalidation. Both tiers evict their
+    least recently used images once over their byte budget.
+
+    The cache also remembers which (app, user, session, image) artifacts are known
+    to be saved in the artifact service, so re-uploads can skip it entirely.
+
+    Args:
+        directory: Directory of the disk tier. An empty directory disables it.
+        memory_bytes: Byte budget of the in-memory tier.
+        disk_bytes: Byte budget of the disk tier.
+        max_saved_markers: Number of saved artifact markers kept.
+    """
+
+    def __init__(
+        self,
+        directory: str = "",
+        memory_bytes: int = 64 * 1024 * 1024,
+        disk_bytes: int = 1024 * 1024 * 1024,
+        max_saved_markers: int = 100_000,
+    ):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_saved_markers = max_saved_markers
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[bytes, str]]" = OrderedDict()
+        self._memory_size = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # Path -> size, LRU order
+        self._disk_size = 0
+        self._saved: "OrderedDict[Tuple[str, str, str, str], None]" = OrderedDict()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._scan_disk()
+
+    def get(self, namespace: str, image_hash: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Return the cached (image bytes, MIME type) of an image, or None on a miss.
+
+        Args:
+            namespace: The namespace of the image, e.g. the user ID.
+            image_hash: The 12-char SHA-256 hash of the image bytes.
+        """
+        key = (namespace, image_hash)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counts["memory_hits"] += 1
+                return self._memory[key]
+
+        path = self._path(namespace, image_hash)
+        if path is None or not os.path.exists(path):
+            with self._lock:
+                self._counts["misses"] += 1
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                mime_type = f.readline().decode("utf-8").strip()
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._counts["misses"] += 1
+            return None
+
+        with self._lock:
+            self._counts["disk_hits"] += 1
+            if path in self._disk:
+                self._disk.move_to_end(path)
+            self._put_memory(key, data, mime_type)
+        return data, mime_type
+
+    def put(self, namespace: str, image_hash: str, data: bytes, mime_type: str) -> None:
+        """
+        Cache an image in memory and on disk.
+
+        Args:
+            namespace: The namespace of the image, e.g. the user ID.
+            image_hash: The 12-char SHA-256 hash of the image bytes.
+            data: The image bytes.
+            mime_type: The MIME type of the image.
+        """
+        with self._lock:
+            self._put_memory((namespace, image_hash), data, mime_type)
+
+        path = self._path(namespace, image_hash)
+        if path is None or os.path.exists(path) or len(data) > self.disk_bytes:
+            return
+
+        # Write to a temporary file first so readers never see a partial image
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(mime_type.encode("utf-8") + b"\n")
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            size = os.path.getsize(path)
+            self._disk[path] = size
+            self._disk_size += size
+            self._evict_disk()
+
+    def is_saved(self, app_name: str, user_id: str, session_id: str, image_hash: str) -> bool:
+        """Whether the image is known to be saved as an artifact of the session."""
+        key = (app_name, user_id, session_id, image_hash)
+        with self._lock:
+            if key in self._saved:
+                self._saved.move_to_end(key)
+                return True
+        return False
+
+    def mark_saved(self, app_name: str, user_id: str, session_id: str, image_hash: str) -> None:
+        """Remember that the image is saved as an artifact of the session."""
+        with self._lock:
+            self._saved[(app_name, user_id, session_id, image_hash)] = None
+            while len(self._saved) > self.max_saved_markers:
+                self._saved.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Return lookup counters, hit rate and tier sizes."""
+        with self._lock:
+            lookups = sum(self._counts.values())
+            hits = lookups - self._counts["misses"]
+            return {
+                **self._counts,
+                "lookups": lookups,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_bytes": self._memory_size,
+                "disk_bytes": self._disk_size,
+            }
+
+    def _path(self, namespace: str, image_hash: str) -> Optional[str]:
+        # Only well-formed hashes become file names
+        if not self.directory or not IMAGE_HASH_PATTERN.match(image_hash):
+            return None
+        # Hash the namespace so any user ID maps to its own safe directory name
+        namespace_dir = hashlib.sha256(namespace.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, namespace_dir, image_hash)
+
+    def _put_memory(self, key: Tuple[str, str], data: bytes, mime_type: str) -> None:
+        if len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_size -= len(self._memory[key][0])
+        self._memory[key] = (data, mime_type)
+        self._memory.move_to_end(key)
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        while self._disk_size > self.disk_bytes and self._disk:
+            path, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _scan_disk(self) -> None:
+        # Rebuild the LRU order from access times left by previous processes
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                if not IMAGE_HASH_PATTERN.match(name):
+                    # Temporary file left by a crash, not one another worker is writing
+                    if name.startswith(TEMP_PREFIX) and time.time() - stat.st_mtime > 3600:
+                        os.remove(path)
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+
+        for _, path, size in sorted(entries):
+            self._disk[path] = size
+            self._disk_size += size
+        self._evict_disk()
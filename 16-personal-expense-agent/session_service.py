@@ -0,0 +1,301 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import copy
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import (
+    BaseSessionService,
+    DatabaseSessionService,
+    InMemorySessionService,
+    Session,
+)
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from sqlalchemy.engine import Engine
+
+import logger
+
+SessionKey = Tuple[str, str, str]
+
+
+class CachedSessionService(BaseSessionService):
+    """Read-through cache of hot sessions in front of another session service.
+
+    Sessions read or created through the cache are kept in an in-process LRU for
+    `ttl_seconds`, and appended events are applied to the cached copy, so the
+    session lookups made on every chat turn don't reload the whole history from
+    the database. Callers always get their own deep copy, like from
+    InMemorySessionService.
+
+    When several workers share the database, other workers may have appended to a
+    cached session. Every cache hit therefore fetches only the events newer than
+    the cached ones, along with the current state. If an append is still rejected
+    as stale, the session is reloaded in place and the append is retried.
+
+    Args:
+        inner: The session service storing the sessions.
+        max_sessions: Maximum number of sessions kept in the cache, 0 disables it.
+        ttl_seconds: Age after which a cached session is reloaded.
+        offload_to_thread: Run the inner service's calls in a worker thread, each in
+            its own event loop, for services doing blocking I/O inside their async
+            methods. Never use it for services on an async engine.
+    """
+
+    def __init__(
+        self,
+        inner: BaseSessionService,
+        max_sessions: int = 256,
+        ttl_seconds: float = 300.0,
+        offload_to_thread: bool = False,
+    ):
+        self.inner = inner
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.offload_to_thread = offload_to_thread
+
+        self._sessions: "OrderedDict[SessionKey, Tuple[float, Session]]" = OrderedDict()
+        self._counts = {"hits": 0, "misses": 0, "refreshed_events": 0, "stale_reloads": 0}
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = await self._call(
+            self.inner.create_session,
+            app_name=app_name,
+            user_id=user_id,
+            state=state,
+            session_id=session_id,
+        )
+        self._put(session)
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        # Filtered reads only return part of the history, so they aren't cached
+        if config is not None:
+            return await self._call(
+                self.inner.get_session,
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                config=config,
+            )
+
+        cached = self._get((app_name, user_id, session_id))
+        if cached is not None and await self._refresh(cached):
+            self._counts["hits"] += 1
+            return copy.deepcopy(cached)
+
+        self._counts["misses"] += 1
+        session = await self._call(
+            self.inner.get_session,
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+        )
+        if session is not None:
+            self._put(session)
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        return await self._call(self.inner.list_sessions, app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._sessions.pop((app_name, user_id, session_id), None)
+        await self._call(
+            self.inner.delete_session,
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+        )
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        key = (session.app_name, session.user_id, session.id)
+        last_update_time = session.last_update_time
+        try:
+            event = await self._call(self.inner.append_event, session=session, event=event)
+        except ValueError:
+            # Another worker updated the session since it was cached
+            self._sessions.pop(key, None)
+            if not await self._reload(session):
+                raise
+            self._counts["stale_reloads"] += 1
+            last_update_time = session.last_update_time
+            event = await self._call(self.inner.append_event, session=session, event=event)
+
+        # Apply the event to the cached copy if it's the version the caller had
+        entry = self._sessions.get(key)
+        if entry is not None and entry[1].last_update_time == last_update_time:
+            cached = entry[1]
+            cached.events.append(copy.deepcopy(event))
+            cached.state = copy.deepcopy(session.state)
+            cached.last_update_time = session.last_update_time
+        else:
+            self._sessions.pop(key, None)
+        return event
+
+    def stats(self) -> Dict[str, float]:
+        """Return lookup counters, hit rate and the number of cached sessions."""
+        lookups = self._counts["hits"] + self._counts["misses"]
+        return {
+            **self._counts,
+            "lookups": lookups,
+            "hit_rate": round(self._counts["hits"] / lookups, 4) if lookups else 0.0,
+            "sessions": len(self._sessions),
+        }
+
+    async def _refresh(self, cached: Session) -> bool:
+        """Add the events other workers appended since the session was cached."""
+        if not cached.events:
+            return False  # Nothing to resume from, reload it all
+
+        recent = await self._call(
+            self.inner.get_session,
+            app_name=cached.app_name,
+            user_id=cached.user_id,
+            session_id=cached.id,
+            config=GetSessionConfig(after_timestamp=cached.events[-1].timestamp),
+        )
+        if recent is None:
+            self._sessions.pop((cached.app_name, cached.user_id, cached.id), None)
+            return False
+
+        # The newest cached event is returned again, since the filter is inclusive
+        if recent.events:
+            known_ids = {event.id for event in cached.events[-len(recent.events) :]}
+            new_events = [event for event in recent.events if event.id not in known_ids]
+            self._counts["refreshed_events"] += len(new_events)
+            cached.events.extend(new_events)
+        cached.state = recent.state
+        cached.last_update_time = recent.last_update_time
+        return True
+
+    async def _reload(self, session: Session) -> bool:
+        fresh = await self._call(
+            self.inner.get_session,
+            app_name=session.app_name,
+            user_id=session.user_id,
+            session_id=session.id,
+        )
+        if fresh is None:
+            return False
+
+        # Update the caller's object, the runner keeps using it for the rest of the turn
+        session.events = fresh.events
+        session.state = fresh.state
+        session.last_update_time = fresh.last_update_time
+        return True
+
+    async def _call(self, method, **kwargs):
+        if not self.offload_to_thread:
+            return await method(**kwargs)
+        return await asyncio.to_thread(lambda: asyncio.run(method(**kwargs)))
+
+    def _get(self, key: SessionKey) -> Optional[Session]:
+        entry = self._sessions.get(key)
+        if entry is None:
+            return None
+        cached_at, session = entry
+        if time.monotonic() - cached_at > self.ttl_seconds:
+            del self._sessions[key]
+            return None
+        self._sessions.move_to_end(key)
+        return session
+
+    def _put(self, session: Session) -> None:
+        if self.max_sessions <= 0:
+            return
+        key = (session.app_name, session.user_id, session.id)
+        self._sessions[key] = (time.monotonic(), copy.deepcopy(session))
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+
+def _runs_blocking_io(service: BaseSessionService) -> bool:
+    """Whether a session service makes blocking database calls in its async methods.
+
+    DatabaseSessionService is built on a synchronous SQLAlchemy engine in current
+    ADK releases. Its calls must then run off the event loop, while a service on an
+    async engine must stay on it, as its pooled connections belong to that loop.
+    """
+    return isinstance(getattr(service, "db_engine", None), Engine)
+
+
+def create_session_service(
+    backend: str,
+    db_url: str,
+    pool_size: int,
+    max_overflow: int,
+    pool_recycle_seconds: int,
+    cache_size: int,
+    cache_ttl_seconds: float,
+) -> BaseSessionService:
+    """Create the configured session service backend, "memory" or "database".
+
+    The database backend takes any SQLAlchemy URL, e.g. a SQLite file shared by the
+    workers of one host or a Postgres server shared by several hosts, and is
+    fronted by a CachedSessionService.
+    """
+    if backend == "memory":
+        return InMemorySessionService()
+    if backend != "database":
+        raise ValueError(f"Unknown session service backend: {backend}")
+
+    engine_kwargs: Dict[str, Any] = {"pool_pre_ping": True}
+    if db_url.startswith("sqlite"):
+        database = db_url.split("///", 1)[-1]
+        if database and database != ":memory:" and os.path.dirname(database):
+            os.makedirs(os.path.dirname(database), exist_ok=True)
+        # SQLite allows one writer at a time, wait for it instead of failing
+        engine_kwargs["connect_args"] = {"timeout": 30, "check_same_thread": False}
+    if not db_url.startswith("sqlite") or ":memory:" not in db_url:
+        engine_kwargs.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=pool_recycle_seconds,
+        )
+
+    logger.info("Using database session service", dialect=db_url.split(":", 1)[0])
+    inner = DatabaseSessionService(db_url, **engine_kwargs)
+    return CachedSessionService(
+        inner,
+        max_sessions=cache_size,
+        ttl_seconds=cache_ttl_seconds,
+        offload_to_thread=_runs_blocking_io(inner),
+    )
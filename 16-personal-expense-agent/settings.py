@@ -20,7 +20,7 @@ from pydantic_settings import (
     YamlConfigSettingsSource,
     PydanticBaseSettingsSource,
 )
-from typing import Type, Tuple
+from typing import Literal, Type, Tuple
 
 
 class Settings(BaseSettings):
@@ -33,15 +33,62 @@ class Settings(BaseSettings):
         GCLOUD_LOCATION: Google Cloud location for API services.
         GCLOUD_PROJECT_ID: Google Cloud project identifier.
         BACKEND_URL: URL for the backend service API endpoint.
+        BACKEND_STREAM_URL: URL for the backend service streaming API endpoint.
         STORAGE_BUCKET_NAME: Name of the Google Cloud Storage bucket for storing receipts.
         DB_COLLECTION_NAME: Name of the Firestore collection for storing receipts.
+        IMAGE_CACHE_DIR: Directory of the local receipt image cache, empty to keep it in memory only.
+        IMAGE_CACHE_MEMORY_MB: Memory budget of the local receipt image cache.
+        IMAGE_CACHE_DISK_MB: Disk budget of the local receipt image cache.
+        MAX_CONCURRENT_EMBEDDING_CALLS: Maximum in-flight embedding requests across all sessions.
+        MAX_CONCURRENT_DB_CALLS: Maximum in-flight Firestore requests across all sessions.
+        EMBEDDING_BATCH_SIZE: Maximum number of texts sent in one embedding request.
+        EMBEDDING_CACHE_PATH: SQLite file of the persistent embedding cache, empty to keep it in memory only.
+        EMBEDDING_CACHE_MEMORY_SIZE: Maximum number of embeddings kept in the in-process cache.
+        EMBEDDING_CACHE_DISK_SIZE: Maximum number of embeddings kept in the SQLite cache.
+        EMBEDDING_CACHE_TTL_SECONDS: Age after which a cached embedding is recomputed.
+        VECTOR_STORE_BACKEND: Receipt semantic search backend, "firestore" or "local".
+        LOCAL_VECTOR_STORE_PATH: Directory of the local vector store files.
+        LOCAL_VECTOR_STORE_IVF_THRESHOLD: Number of receipts from which the local store uses its IVF index.
+        LOCAL_VECTOR_STORE_NPROBE: Number of IVF lists the local store scans per query.
+        SESSION_SERVICE_BACKEND: Chat session storage, "memory" (default) or "database",
+            which persists sessions across restarts and shares them between workers.
+        SESSION_DB_URL: SQLAlchemy URL of the session database, e.g. SQLite or Postgres.
+        SESSION_DB_POOL_SIZE: Number of pooled session database connections per worker.
+        SESSION_DB_MAX_OVERFLOW: Connections opened beyond the pool under load.
+        SESSION_DB_POOL_RECYCLE_SECONDS: Age after which a pooled connection is replaced.
+        SESSION_CACHE_SIZE: Maximum number of hot sessions cached in each worker, 0 to disable.
+        SESSION_CACHE_TTL_SECONDS: Age after which a cached session is fully reloaded from the database.
+        BACKEND_WORKERS: Number of backend worker processes, more than 1 needs the database backend.
     """
 
     GCLOUD_LOCATION: str
     GCLOUD_PROJECT_ID: str
     BACKEND_URL: str = "http://localhost:8081/chat"
+    BACKEND_STREAM_URL: str = "http://localhost:8081/chat/stream"
     STORAGE_BUCKET_NAME: str = "personal-expense-assistant-receipts"
     DB_COLLECTION_NAME: str = "personal-expense-assistant-receipts"
+    IMAGE_CACHE_DIR: str = ".cache/images"
+    IMAGE_CACHE_MEMORY_MB: int = 64
+    IMAGE_CACHE_DISK_MB: int = 1024
+    MAX_CONCURRENT_EMBEDDING_CALLS: int = 8
+    MAX_CONCURRENT_DB_CALLS: int = 32
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_CACHE_PATH: str = ".cache/embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MEMORY_SIZE: int = 1024
+    EMBEDDING_CACHE_DISK_SIZE: int = 100000
+    EMBEDDING_CACHE_TTL_SECONDS: int = 2592000  # 30 days
+    VECTOR_STORE_BACKEND: Literal["firestore", "local"] = "firestore"
+    LOCAL_VECTOR_STORE_PATH: str = ".cache/vector_store"
+    LOCAL_VECTOR_STORE_IVF_THRESHOLD: int = 20000
+    LOCAL_VECTOR_STORE_NPROBE: int = 8
+    SESSION_SERVICE_BACKEND: Literal["memory", "database"] = "memory"
+    SESSION_DB_URL: str = "sqlite:///.cache/sessions.sqlite3"
+    SESSION_DB_POOL_SIZE: int = 10
+    SESSION_DB_MAX_OVERFLOW: int = 20
+    SESSION_DB_POOL_RECYCLE_SECONDS: int = 1800
+    SESSION_CACHE_SIZE: int = 256
+    SESSION_CACHE_TTL_SECONDS: int = 300
+    BACKEND_WORKERS: int = 1
 
     model_config = SettingsConfigDict(
         yaml_file="settings.yaml", yaml_file_encoding="utf-8"
@@ -14,8 +14,8 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from google.cloud import storage
 from settings import get_settings
+import asyncio
 import base64
 import re
 from schema import ChatRequest, ImageData
@@ -23,17 +23,21 @@ from google.genai import types
 import hashlib
 import json
 from google.adk.artifacts import GcsArtifactService
+from image_cache import ImageCache
 import logger
 
 
 SETTINGS = get_settings()
 
-GCS_BUCKET_CLIENT = storage.Client(project=SETTINGS.GCLOUD_PROJECT_ID).get_bucket(
-    SETTINGS.STORAGE_BUCKET_NAME
+# Local tier in front of the artifact service, shared by uploads and downloads
+IMAGE_CACHE = ImageCache(
+    directory=SETTINGS.IMAGE_CACHE_DIR,
+    memory_bytes=SETTINGS.IMAGE_CACHE_MEMORY_MB * 1024 * 1024,
+    disk_bytes=SETTINGS.IMAGE_CACHE_DISK_MB * 1024 * 1024,
 )
 
 
-def store_uploaded_image_as_artifact(
+async def store_uploaded_image_as_artifact(
     artifact_service: GcsArtifactService,
     app_name: str,
     user_id: str,
@@ -59,7 +63,17 @@ def store_uploaded_image_as_artifact(
     hasher = hashlib.sha256(image_byte)
     image_hash_id = hasher.hexdigest()[:12]
 
-    artifact_versions = artifact_service.list_versions(
+    # Images are immutable, cache it for the downloads of attachments
+    await asyncio.to_thread(
+        IMAGE_CACHE.put, user_id, image_hash_id, image_byte, image_data.mime_type
+    )
+
+    if IMAGE_CACHE.is_saved(app_name, user_id, session_id, image_hash_id):
+        logger.info(f"Image {image_hash_id} already saved in GCS, skipping upload")
+
+        return image_hash_id, image_byte
+
+    artifact_versions = await artifact_service.list_versions(
         app_name=app_name,
         user_id=user_id,
         session_id=session_id,
@@ -67,10 +81,11 @@ def store_uploaded_image_as_artifact(
     )
     if artifact_versions:
         logger.info(f"Image {image_hash_id} already exists in GCS, skipping upload")
+        IMAGE_CACHE.mark_saved(app_name, user_id, session_id, image_hash_id)
 
         return image_hash_id, image_byte
 
-    artifact_service.save_artifact(
+    await artifact_service.save_artifact(
         app_name=app_name,
         user_id=user_id,
         session_id=session_id,
@@ -79,11 +94,12 @@ def store_uploaded_image_as_artifact(
             inline_data=types.Blob(mime_type=image_data.mime_type, data=image_byte)
         ),
     )
+    IMAGE_CACHE.mark_saved(app_name, user_id, session_id, image_hash_id)
 
     return image_hash_id, image_byte
 
 
-def download_image_from_gcs(
+async def download_image_from_gcs(
     artifact_service: GcsArtifactService,
     app_name: str,
     user_id: str,
@@ -93,7 +109,7 @@ def download_image_from_gcs(
     """
     Downloads an image artifact from Google Cloud Storage and
     returns it as base64 encoded string with its MIME type.
-    Uses local caching to avoid redundant downloads.
+    Uses the local image cache to avoid redundant downloads.
 
     Args:
         artifact_service: The artifact service to use for downloading artifacts
@@ -106,7 +122,14 @@ def download_image_from_gcs(
         tuple[str, str] | None: A tuple containing (base64_encoded_data, mime_type), or None if download fails
     """
     try:
-        artifact = artifact_service.load_artifact(
+        cached = await asyncio.to_thread(IMAGE_CACHE.get, user_id, image_hash)
+        if cached:
+            image_data, mime_type = cached
+            logger.info(f"Loaded image {image_hash} from local cache")
+
+            return base64.b64encode(image_data).decode("utf-8"), mime_type
+
+        artifact = await artifact_service.load_artifact(
             app_name=app_name,
             user_id=user_id,
             session_id=session_id,
@@ -121,6 +144,9 @@ def download_image_from_gcs(
         mime_type = artifact.inline_data.mime_type
 
         logger.info(f"Downloaded image {image_hash} with type {mime_type}")
+        await asyncio.to_thread(
+            IMAGE_CACHE.put, user_id, image_hash, image_data, mime_type
+        )
 
         return base64.b64encode(image_data).decode("utf-8"), mime_type
     except Exception as e:
@@ -128,7 +154,7 @@ def download_image_from_gcs(
         return None
 
 
-def format_user_request_to_adk_content_and_store_artifacts(
+async def format_user_request_to_adk_content_and_store_artifacts(
     request: ChatRequest, app_name: str, artifact_service: GcsArtifactService
 ) -> types.Content:
     """Format a user request into ADK Content format.
@@ -144,18 +170,22 @@ def format_user_request_to_adk_content_and_store_artifacts(
     # Create a list to hold parts
     parts = []
 
-    # Handle image files if present
-    for data in request.files:
-        # Process the image and add string placeholder
-
-        image_hash_id, image_byte = store_uploaded_image_as_artifact(
-            artifact_service=artifact_service,
-            app_name=app_name,
-            user_id=request.user_id,
-            session_id=request.session_id,
-            image_data=data,
+    # Store all uploaded images concurrently
+    stored_images = await asyncio.gather(
+        *(
+            store_uploaded_image_as_artifact(
+                artifact_service=artifact_service,
+                app_name=app_name,
+                user_id=request.user_id,
+                session_id=request.session_id,
+                image_data=data,
+            )
+            for data in request.files
         )
+    )
 
+    # Handle image files if present
+    for data, (image_hash_id, image_byte) in zip(request.files, stored_images):
         # Add inline data part
         parts.append(
             types.Part(
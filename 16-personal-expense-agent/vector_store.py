@@ -0,0 +1,535 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import abc
+import asyncio
+import contextlib
+import datetime
+import json
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows, the store is then only safe in a single process
+    fcntl = None
+
+import numpy as np
+from google.cloud.firestore_v1 import FieldFilter
+from google.cloud.firestore_v1.base_query import And
+from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
+from google.cloud.firestore_v1.vector import Vector
+
+VECTORS_FILE = "vectors.f32"
+RECEIPTS_FILE = "receipts.jsonl"
+CENTROIDS_FILE = "ivf_centroids.npy"
+ASSIGNMENTS_FILE = "ivf_assignments.npy"
+LOCK_FILE = "store.lock"
+
+
+def parse_time(value: str) -> float:
+    """Convert an ISO format datetime string to a UTC timestamp."""
+    parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+class VectorStore(abc.ABC):
+    """Interface of the receipt embedding stores used for semantic search.
+
+    Filters follow the metadata search tool: empty times and -1 amounts are ignored.
+    """
+
+    async def add(self, receipt: Dict[str, Any], embedding: List[float]) -> None:
+        """Index the embedding of a receipt that was just stored."""
+        await self.add_many([receipt], [embedding])
+
+    @abc.abstractmethod
+    async def add_many(
+        self, receipts: List[Dict[str, Any]], embeddings: List[List[float]]
+    ) -> None:
+        """Index the embeddings of receipts that were just stored."""
+
+    @abc.abstractmethod
+    async def search(
+        self,
+        query_embedding: List[float],
+        limit: int = 5,
+        start_time: str = "",
+        end_time: str = "",
+        min_total_amount: float = -1.0,
+        max_total_amount: float = -1.0,
+    ) -> List[Dict[str, Any]]:
+        """Return the receipts nearest to the query embedding, closest first."""
+
+
+class FirestoreVectorStore(VectorStore):
+    """Vector search with Firestore `find_nearest` on the receipts collection.
+
+    The embedding is written as part of the receipt document, so `add` has nothing to do.
+    Filtered searches need a composite vector index on the filtered fields.
+
+    Args:
+        collection: The async Firestore collection holding the receipts.
+        embedding_field: The document field holding the embedding.
+        limiter: Semaphore bounding in-flight Firestore requests.
+    """
+
+    def __init__(self, collection, embedding_field: str, limiter: asyncio.Semaphore):
+        self.collection = collection
+        self.embedding_field = embedding_field
+        self.limiter = limiter
+
+    async def add_many(
+        self, receipts: List[Dict[str, Any]], embeddings: List[List[float]]
+    ) -> None:
+        return None
+
+    async def search(
+        self,
+        query_embedding: List[float],
+        limit: int = 5,
+        start_time: str = "",
+        end_time: str = "",
+        min_total_amount: float = -1.0,
+        max_total_amount: float = -1.0,
+    ) -> List[Dict[str, Any]]:
+        filters = []
+        if start_time:
+            filters.append(FieldFilter("transaction_time", ">=", start_time))
+        if end_time:
+            filters.append(FieldFilter("transaction_time", "<=", end_time))
+        if min_total_amount != -1:
+            filters.append(FieldFilter("total_amount", ">=", min_total_amount))
+        if max_total_amount != -1:
+            filters.append(FieldFilter("total_amount", "<=", max_total_amount))
+
+        query = self.collection
+        if filters:
+            query = query.where(filter=And(filters=filters))
+
+        # Notes that this demo assume 1 user only,
+        # need to refactor the query for multiple user
+        vector_query = query.find_nearest(
+            vector_field=self.embedding_field,
+            query_vector=Vector(query_embedding),
+            distance_measure=DistanceMeasure.EUCLIDEAN,
+            limit=limit,
+        )
+
+        async with self.limiter:
+            docs = [doc.to_dict() async for doc in vector_query.stream()]
+
+        for data in docs:
+            data.pop(self.embedding_field, None)
+
+        return docs
+
+
+class LocalVectorStore(VectorStore):
+    """Embedded vector store persisted in a local directory.
+
+    Embeddings are appended as float32 rows to a flat file that is memory-mapped
+    for search, and receipts are appended to a JSON lines file, so adds are O(1).
+    Small stores are searched exactly with a NumPy brute-force scan. Once the store
+    reaches `ivf_threshold` vectors, an IVF index (k-means centroids and one
+    inverted list per centroid) is built and only the `nprobe` lists nearest to
+    the query are scanned, plus any vectors added since the index was built.
+    The index is rebuilt after the store grows by `rebuild_ratio`.
+
+    Distances are Euclidean, matching the Firestore backend.
+
+    Several processes can share the store, e.g. backend workers and a bulk import.
+    Appends hold an exclusive lock on the store's lock file, so the rows of both
+    files stay aligned, and each process reads the rows appended by others before
+    searching. Each process builds its own IVF index in memory; rows added after
+    it was built are scanned exhaustively until the next rebuild.
+
+    Args:
+        path: Directory holding the store files.
+        dimension: Embedding dimension.
+        ivf_threshold: Number of vectors from which the IVF index is used.
+        nprobe: Number of inverted lists scanned per query.
+        rebuild_ratio: Growth since the last build that triggers a rebuild.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dimension: int,
+        ivf_threshold: int = 20000,
+        nprobe: int = 8,
+        rebuild_ratio: float = 0.2,
+    ):
+        self.path = path
+        self.dimension = dimension
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.rebuild_ratio = rebuild_ratio
+
+        self._lock = threading.RLock()
+        self._receipts: List[Dict[str, Any]] = []
+        self._times: List[float] = []
+        self._amounts: List[float] = []
+        self._vectors: Optional[np.memmap] = None
+        self._norms: Optional[np.ndarray] = None
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._list_order: Optional[np.ndarray] = None
+        self._list_offsets: Optional[np.ndarray] = None
+        self._indexed = 0
+        self._receipts_offset = 0  # Bytes of the receipts file read so far
+
+        os.makedirs(path, exist_ok=True)
+        with self._lock, self._file_lock(exclusive=True):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._receipts)
+
+    async def add_many(
+        self, receipts: List[Dict[str, Any]], embeddings: List[List[float]]
+    ) -> None:
+        await asyncio.to_thread(self.add_many_sync, receipts, embeddings)
+
+    async def search(
+        self,
+        query_embedding: List[float],
+        limit: int = 5,
+        start_time: str = "",
+        end_time: str = "",
+        min_total_amount: float = -1.0,
+        max_total_amount: float = -1.0,
+    ) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(
+            self.search_sync,
+            query_embedding,
+            limit,
+            start_time,
+            end_time,
+            min_total_amount,
+            max_total_amount,
+        )
+
+    def add_many_sync(
+        self, receipts: List[Dict[str, Any]], embeddings: List[List[float]]
+    ) -> None:
+        """Blocking version of `add_many`, appends receipts and their embeddings to the store."""
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        if len(vectors) != len(receipts):
+            raise ValueError("Each receipt needs exactly one embedding")
+
+        with self._lock, self._file_lock(exclusive=True):
+            # Rows appended by other processes come first, then ours
+            self._read_appended()
+            with open(os.path.join(self.path, VECTORS_FILE), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(os.path.join(self.path, RECEIPTS_FILE), "a", encoding="utf-8") as f:
+                for receipt in receipts:
+                    f.write(json.dumps(receipt, default=str) + "\n")
+            self._read_appended()
+
+    def search_sync(
+        self,
+        query_embedding: List[float],
+        limit: int = 5,
+        start_time: str = "",
+        end_time: str = "",
+        min_total_amount: float = -1.0,
+        max_total_amount: float = -1.0,
+    ) -> List[Dict[str, Any]]:
+        """Blocking version of `search`."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+
+        with self._lock:
+            with self._file_lock(exclusive=False):
+                self._read_appended()
+            if not self._receipts:
+                return []
+
+            vectors = self._mapped_vectors()
+            self._maybe_build_index(vectors)
+            mask = self._filter_mask(
+                start_time, end_time, min_total_amount, max_total_amount
+            )
+
+            candidates = None
+            if self._centroids is not None:
+                candidates = self._probe(query, vectors)
+                if mask is not None:
+                    candidates = candidates[mask[candidates]]
+                # Selective filters can leave the probed lists short, fall back to
+                # scanning every row that passes the filters
+                if len(candidates) < limit:
+                    candidates = None
+
+            if candidates is None:
+                candidates = (
+                    np.flatnonzero(mask) if mask is not None else np.arange(len(vectors))
+                )
+
+            rows = self._nearest(query, vectors, candidates, limit)
+            return [dict(self._receipts[row]) for row in rows]
+
+    def build_index(self) -> None:
+        """Build the IVF index over every vector in the store and persist it."""
+        with self._lock:
+            vectors = self._mapped_vectors()
+            if vectors is None:
+                return
+
+            n = len(vectors)
+            n_lists = min(max(16, int(math.sqrt(n))), 4096, n)
+            rng = np.random.default_rng(0)
+            sample = vectors[
+                np.sort(rng.choice(n, size=min(n, n_lists * 64), replace=False))
+            ]
+            centroids = self._kmeans(np.asarray(sample), n_lists, rng)
+            assignments = self._assign(vectors, centroids)
+
+            with self._file_lock(exclusive=True):
+                np.save(os.path.join(self.path, CENTROIDS_FILE), centroids)
+                np.save(os.path.join(self.path, ASSIGNMENTS_FILE), assignments)
+            self._set_index(centroids, assignments)
+
+    @contextlib.contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Lock the store files against other processes, shared for reads."""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.path, LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_appended(self) -> None:
+        """Read the rows appended to the store files since they were last read.
+
+        Must hold the file lock, so no append is in progress.
+        """
+        receipts_path = os.path.join(self.path, RECEIPTS_FILE)
+        if not os.path.exists(receipts_path) or os.path.getsize(receipts_path) == self._receipts_offset:
+            return
+
+        with open(receipts_path, "rb") as f:
+            f.seek(self._receipts_offset)
+            appended = f.read()
+        # Only complete lines, in case a writer died mid-append
+        complete = appended[: appended.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if line.strip():
+                self._append_metadata(json.loads(line))
+        self._receipts_offset += len(complete)
+        self._vectors = None  # Remapped with the new rows on the next search
+
+    def _load(self) -> None:
+        """Read the store files, must hold the exclusive file lock."""
+        receipts_path = os.path.join(self.path, RECEIPTS_FILE)
+        self._read_appended()
+
+        # Drop rows that only made it to one of the files, e.g. after a crash mid-append.
+        # Appends hold the exclusive file lock too, so none is in flight here.
+        vectors_path = os.path.join(self.path, VECTORS_FILE)
+        row_bytes = self.dimension * 4
+        rows = os.path.getsize(vectors_path) // row_bytes if os.path.exists(vectors_path) else 0
+        if rows < len(self._receipts):
+            del self._receipts[rows:], self._times[rows:], self._amounts[rows:]
+            with open(receipts_path, "w", encoding="utf-8") as f:
+                for receipt in self._receipts:
+                    f.write(json.dumps(receipt, default=str) + "\n")
+            self._receipts_offset = os.path.getsize(receipts_path)
+        if os.path.exists(receipts_path) and os.path.getsize(receipts_path) > self._receipts_offset:
+            # Drop a partial last line
+            os.truncate(receipts_path, self._receipts_offset)
+        if os.path.exists(vectors_path):
+            os.truncate(vectors_path, len(self._receipts) * row_bytes)
+
+        centroids_path = os.path.join(self.path, CENTROIDS_FILE)
+        assignments_path = os.path.join(self.path, ASSIGNMENTS_FILE)
+        if os.path.exists(centroids_path) and os.path.exists(assignments_path):
+            assignments = np.load(assignments_path, mmap_mode="r")
+            if len(assignments) <= len(self._receipts):
+                self._set_index(np.load(centroids_path), assignments)
+
+    def _append_metadata(self, receipt: Dict[str, Any]) -> None:
+        self._receipts.append(receipt)
+        try:
+            self._times.append(parse_time(str(receipt.get("transaction_time", ""))))
+        except ValueError:
+            self._times.append(math.nan)
+        try:
+            self._amounts.append(float(receipt.get("total_amount")))
+        except (TypeError, ValueError):
+            self._amounts.append(math.nan)
+
+    def _metadata_array(self, name: str) -> np.ndarray:
+        """Return the times or amounts as an array, cached until the next add."""
+        values = getattr(self, f"_{name}")
+        cached = self._arrays.get(name)
+        if cached is None or len(cached) != len(values):
+            cached = self._arrays[name] = np.asarray(values, dtype=np.float64)
+        return cached
+
+    def _mapped_vectors(self) -> Optional[np.memmap]:
+        if self._vectors is None and self._receipts:
+            self._vectors = np.memmap(
+                os.path.join(self.path, VECTORS_FILE),
+                dtype=np.float32,
+                mode="r",
+                shape=(len(self._receipts), self.dimension),
+            )
+        return self._vectors
+
+    def _vector_norms(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the squared norm of every vector, computing only the new rows."""
+        known = 0 if self._norms is None else len(self._norms)
+        if known < len(vectors):
+            new_norms = np.einsum("ij,ij->i", vectors[known:], vectors[known:])
+            self._norms = (
+                new_norms if self._norms is None else np.concatenate([self._norms, new_norms])
+            )
+        return self._norms
+
+    def _maybe_build_index(self, vectors: np.ndarray) -> None:
+        n = len(vectors)
+        if n < self.ivf_threshold:
+            return
+        if self._centroids is None or n > self._indexed * (1 + self.rebuild_ratio):
+            self.build_index()
+
+    def _set_index(self, centroids: np.ndarray, assignments: np.ndarray) -> None:
+        # Inverted lists as one array of row ids sorted by list, plus list offsets
+        self._list_order = np.argsort(assignments, kind="stable").astype(np.int64)
+        self._list_offsets = np.searchsorted(
+            assignments[self._list_order], np.arange(len(centroids) + 1)
+        )
+        self._centroids = centroids
+        self._indexed = len(assignments)
+
+    def _probe(self, query: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        distances = ((self._centroids - query) ** 2).sum(axis=1)
+        nearest_lists = np.argsort(distances)[: self.nprobe]
+        rows = [
+            self._list_order[self._list_offsets[i] : self._list_offsets[i + 1]]
+            for i in nearest_lists
+        ]
+        # Vectors added after the index was built are always scanned
+        rows.append(np.arange(self._indexed, len(vectors)))
+        return np.sort(np.concatenate(rows))
+
+    def _filter_mask(
+        self,
+        start_time: str,
+        end_time: str,
+        min_total_amount: float,
+        max_total_amount: float,
+    ) -> Optional[np.ndarray]:
+        mask = None
+
+        def apply(condition: np.ndarray) -> None:
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        if start_time or end_time:
+            times = self._metadata_array("times")
+            if start_time:
+                apply(times >= parse_time(start_time))
+            if end_time:
+                apply(times <= parse_time(end_time))
+        if min_total_amount != -1 or max_total_amount != -1:
+            amounts = self._metadata_array("amounts")
+            if min_total_amount != -1:
+                apply(amounts >= min_total_amount)
+            if max_total_amount != -1:
+                apply(amounts <= max_total_amount)
+
+        return mask
+
+    def _nearest(
+        self, query: np.ndarray, vectors: np.ndarray, rows: np.ndarray, limit: int
+    ) -> np.ndarray:
+        if len(rows) == 0:
+            return rows
+
+        # |v - q|^2 = |v|^2 - 2 v.q + |q|^2, the last term doesn't change the order
+        norms = self._vector_norms(vectors)
+        if len(rows) == len(vectors):
+            distances = norms - 2 * (vectors @ query)
+        else:
+            distances = norms[rows] - 2 * (vectors[rows] @ query)
+        if len(rows) > limit:
+            top = np.argpartition(distances, limit)[:limit]
+        else:
+            top = np.arange(len(rows))
+        return rows[top[np.argsort(distances[top])]]
+
+    @staticmethod
+    def _assign(
+        vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192
+    ) -> np.ndarray:
+        """Return the nearest centroid of every vector, in chunks to bound memory."""
+        centroid_norms = (centroids**2).sum(axis=1)
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = np.asarray(vectors[start : start + chunk_size])
+            # |x - c|^2 without the |x|^2 term, which doesn't change the argmin
+            distances = centroid_norms - 2 * chunk @ centroids.T
+            assignments[start : start + chunk_size] = distances.argmin(axis=1)
+        return assignments
+
+    @classmethod
+    def _kmeans(
+        cls,
+        sample: np.ndarray,
+        n_clusters: int,
+        rng: np.random.Generator,
+        iterations: int = 10,
+    ) -> np.ndarray:
+        centroids = sample[rng.choice(len(sample), size=n_clusters, replace=False)]
+        for _ in range(iterations):
+            assignments = cls._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=n_clusters)[:, None]
+            # Keep the previous centroid for clusters that lost all their points
+            centroids = np.where(counts > 0, sums / np.maximum(counts, 1), centroids)
+        return centroids.astype(np.float32)
+
+
+def create_vector_store(
+    backend: str,
+    collection,
+    embedding_field: str,
+    limiter: asyncio.Semaphore,
+    dimension: int,
+    local_path: str,
+    ivf_threshold: int,
+    nprobe: int,
+) -> VectorStore:
+    """Create the configured vector store backend, "firestore" or "local"."""
+    if backend == "firestore":
+        return FirestoreVectorStore(collection, embedding_field, limiter)
+    if backend == "local":
+        return LocalVectorStore(
+            local_path, dimension, ivf_threshold=ivf_threshold, nprobe=nprobe
+        )
+    raise ValueError(f"Unknown vector store backend: {backend}")
@@ -4,8 +4,10 @@ This module defines a comprehensive code review assistant that analyzes
 Python code and provides detailed feedback through a multi-stage pipeline.
 """
 
-from google.adk.agents import Agent, SequentialAgent, LoopAgent
+from google.adk.agents import Agent, SequentialAgent, LoopAgent, ParallelAgent
+from .callbacks import prepare_review_state
 from .config import config
+from .metrics import instrument_agent_tree
 from .sub_agents import (
     code_analyzer_agent,
     style_checker_agent,
@@ -17,16 +19,28 @@ from .sub_agents import (
     fix_synthesizer_agent
 )
 
+# --- Independent Review Stages ---
+# Analysis, style checking and testing only read the submitted code,
+# so they run concurrently
+review_stages = ParallelAgent(
+    name="ReviewStages",
+    description="Runs structure analysis, style checking and testing concurrently",
+    sub_agents=[
+        code_analyzer_agent,
+        style_checker_agent,
+        test_runner_agent
+    ]
+)
+
 # --- Code Review Pipeline Sub-Agent ---
 code_review_pipeline = SequentialAgent(
     name="CodeReviewPipeline",
     description="Complete code review pipeline with analysis, testing, and feedback",
     sub_agents=[
-        code_analyzer_agent,
-        style_checker_agent,
-        test_runner_agent,
-        feedback_synthesizer_agent
-    ]
+        review_stages,              # Analyze, check style and test in parallel
+        feedback_synthesizer_agent  # Runs once all three stages finished
+    ],
+    before_agent_callback=prepare_review_state  # Code must be in state before the fan-out
 )
 
 # --- Fix Attempt Loop ---
@@ -78,3 +92,6 @@ The pipelines handle everything for code review and fixing - just pass through t
     sub_agents=[code_review_pipeline, code_fix_pipeline],
     output_key="assistant_response"
 )
+
+# Record per-stage latency, token and CPU metrics across the whole agent tree
+instrument_agent_tree(root_agent)
@@ -0,0 +1,148 @@
+"""
+Single-pass AST analysis for the Code Review Assistant.
+
+Parses the submitted code once and collects structure, naming-convention and
+function-length metrics in one traversal, instead of walking the tree
+separately for each metric. Sync and async functions are treated alike.
+"""
+import ast
+from typing import Any, Dict, List
+
+# Statement-list fields. Function and class definitions can only appear in
+# these, so expression subtrees never need to be visited.
+_STATEMENT_FIELDS = ('body', 'orelse', 'finalbody', 'handlers', 'cases')
+
+
+class CodeAnalysisVisitor(ast.NodeVisitor):
+    """Collects all review metrics in a single traversal of the AST."""
+
+    def __init__(self):
+        self.functions: List[Dict[str, Any]] = []
+        self.classes: List[Dict[str, Any]] = []
+        self.imports: List[Dict[str, Any]] = []
+        self.docstrings: List[str] = []
+        self.naming_issues: List[Dict[str, Any]] = []
+        self.function_lengths: List[int] = []
+
+    def generic_visit(self, node: ast.AST) -> None:
+        """Descend only into nested statement lists."""
+        for field in _STATEMENT_FIELDS:
+            children = getattr(node, field, None)
+            if isinstance(children, list):
+                for child in children:
+                    if isinstance(child, ast.AST):
+                        self.visit(child)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        docstring = ast.get_docstring(node)
+        self.functions.append({
+            'name': node.name,
+            'args': [arg.arg for arg in node.args.args],
+            'lineno': node.lineno,
+            'has_docstring': docstring is not None,
+            'is_async': isinstance(node, ast.AsyncFunctionDef),
+            'decorators': [d.id for d in node.decorator_list
+                           if isinstance(d, ast.Name)]
+        })
+
+        if docstring is not None:
+            self.docstrings.append(f"{node.name}: {docstring[:50]}...")
+
+        if getattr(node, 'end_lineno', None) is not None:
+            self.function_lengths.append(node.end_lineno - node.lineno + 1)
+
+        # Skip private/protected functions
+        if not node.name.startswith('_') and node.name != node.name.lower():
+            self.naming_issues.append({
+                'line': node.lineno,
+                'column': node.col_offset,
+                'code': 'N802',
+                'message': f"N802 function name '{node.name}' should be lowercase"
+            })
+
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.classes.append({
+            'name': node.name,
+            'lineno': node.lineno,
+            'methods': [item.name for item in node.body
+                        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))],
+            'has_docstring': ast.get_docstring(node) is not None,
+            'base_classes': [base.id for base in node.bases
+                             if isinstance(base, ast.Name)]
+        })
+
+        # Check if class name follows CapWords convention
+        if not node.name[0].isupper() or '_' in node.name:
+            self.naming_issues.append({
+                'line': node.lineno,
+                'column': node.col_offset,
+                'code': 'N801',
+                'message': f"N801 class name '{node.name}' should use CapWords convention"
+            })
+
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self.imports.append({
+                'module': alias.name,
+                'alias': alias.asname,
+                'type': 'import'
+            })
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        self.imports.append({
+            'module': node.module or '',
+            'names': [alias.name for alias in node.names],
+            'type': 'from_import',
+            'level': node.level
+        })
+
+    def structure(self, code: str) -> Dict[str, Any]:
+        """Build the structure report consumed by the review agents."""
+        avg_function_length = (
+            sum(self.function_lengths) / len(self.function_lengths)
+            if self.function_lengths else 0.0
+        )
+        return {
+            'functions': self.functions,
+            'classes': self.classes,
+            'imports': self.imports,
+            'docstrings': self.docstrings,
+            'metrics': {
+                'line_count': len(code.splitlines()),
+                'function_count': len(self.functions),
+                'class_count': len(self.classes),
+                'import_count': len(self.imports),
+                'has_main': any(f['name'] == 'main' for f in self.functions),
+                'has_if_main': '__main__' in code,
+                'avg_function_length': avg_function_length
+            }
+        }
+
+
+def analyze_source(code: str) -> Dict[str, Any]:
+    """
+    Parse code once and collect every AST-derived metric.
+
+    Args:
+        code: Python source code to analyze
+
+    Returns:
+        Dictionary with 'structure' (functions, classes, imports, docstrings,
+        metrics) and 'naming_issues' (PEP 8 naming violations)
+
+    Raises:
+        SyntaxError: If the code cannot be parsed
+    """
+    tree = ast.parse(code)
+    visitor = CodeAnalysisVisitor()
+    visitor.visit(tree)
+    return {
+        'structure': visitor.structure(code),
+        'naming_issues': visitor.naming_issues
+    }
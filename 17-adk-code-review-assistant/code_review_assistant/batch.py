@@ -0,0 +1,308 @@
+"""
+Batch (repository-mode) review for the Code Review Assistant.
+
+Runs the deterministic stages (structure analysis and style checking) over a
+directory or list of files on a process pool, then sends only the files that
+cross the configured thresholds to the LLM CodeReviewPipeline. Results are
+written to a single consolidated JSON report.
+
+Usage:
+    python -m code_review_assistant.batch path/to/repo --output review.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from .agent import code_review_pipeline
+from .analysis_engine import analyze_source
+from .cache import result_cache, SOURCE_ANALYSIS, STYLE_CHECK
+from .config import config
+from .constants import StateKeys
+from .executors import CpuExecutor
+from .services import get_artifact_service
+from .tools import _perform_style_check
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+APP_NAME = "code_review_assistant_batch"
+BATCH_USER_ID = "batch_reviewer"
+
+# Directories never worth reviewing
+SKIPPED_DIRS = {
+    '__pycache__', '.git', '.hg', '.tox', '.nox', '.venv', 'venv', 'env',
+    'node_modules', 'build', 'dist', '.mypy_cache', '.pytest_cache',
+}
+
+
+def collect_python_files(paths: Iterable[str]) -> List[str]:
+    """Expand files and directories into a sorted list of Python files."""
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs[:] = [d for d in dirs if d not in SKIPPED_DIRS and not d.startswith('.')]
+                for name in names:
+                    if name.endswith('.py'):
+                        files.add(os.path.join(root, name))
+        elif os.path.isfile(path):
+            files.add(path)
+        else:
+            logger.warning(f"Batch: Skipping missing path {path}")
+    return sorted(files)
+
+
+def _deterministic_review(code: str) -> Dict[str, Any]:
+    """
+    Structure analysis and style check for one file.
+    Runs in a worker process, so it must stay at module level.
+    """
+    try:
+        analysis = analyze_source(code)
+    except SyntaxError as e:
+        return {
+            'analysis': None,
+            'style': _perform_style_check(code, []),
+            'syntax_error': f"Syntax error at line {e.lineno}: {e.msg}"
+        }
+
+    return {
+        'analysis': analysis,
+        'style': _perform_style_check(code, analysis['naming_issues']),
+        'syntax_error': None
+    }
+
+
+def needs_llm_review(record: Dict[str, Any],
+                     min_lines: int,
+                     min_issue_count: int,
+                     max_style_score: int) -> bool:
+    """Decide whether a file is worth sending to the LLM pipeline."""
+    if record['status'] != 'success':
+        return False
+    if record['line_count'] < min_lines:
+        return False
+    return (record['issue_count'] >= min_issue_count
+            or record['style_score'] <= max_style_score)
+
+
+async def _review_file(path: str, executor: CpuExecutor) -> Dict[str, Any]:
+    """Run the deterministic stages for one file, using the result cache."""
+    record: Dict[str, Any] = {'path': path}
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            code = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        record.update({'status': 'error', 'message': f"Could not read file: {e}"})
+        return record
+
+    analysis = result_cache.get(SOURCE_ANALYSIS, code)
+    style = result_cache.get(STYLE_CHECK, code)
+    syntax_error = None
+
+    if analysis is None or style is None:
+        result = await executor.run(_deterministic_review, code)
+        analysis, style, syntax_error = result['analysis'], result['style'], result['syntax_error']
+        if analysis is not None:
+            result_cache.set(SOURCE_ANALYSIS, code, analysis)
+        result_cache.set(STYLE_CHECK, code, style)
+
+    record.update({
+        'code': code,
+        'line_count': len(code.splitlines()),
+        'style_score': style['score'],
+        'issue_count': style['issue_count'],
+        'issues': style['issues'],
+    })
+
+    if syntax_error:
+        record.update({'status': 'syntax_error', 'message': syntax_error})
+    else:
+        record.update({
+            'status': 'success',
+            'metrics': analysis['structure']['metrics'],
+        })
+    return record
+
+
+async def _llm_review(runner, session_service, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Send one file through the LLM CodeReviewPipeline and return its feedback."""
+    session = await session_service.create_session(
+        app_name=APP_NAME,
+        user_id=BATCH_USER_ID,
+        session_id=f"batch-{uuid.uuid4().hex}"
+    )
+    message = types.Content(
+        role="user",
+        parts=[types.Part.from_text(text=record['code'])]
+    )
+
+    started = time.monotonic()
+    try:
+        async for _ in runner.run_async(
+            user_id=BATCH_USER_ID, session_id=session.id, new_message=message
+        ):
+            pass
+    except Exception as e:
+        logger.error(f"Batch: LLM review failed for {record['path']}: {e}", exc_info=True)
+        return {'status': 'error', 'message': str(e)}
+
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=BATCH_USER_ID, session_id=session.id
+    )
+    return {
+        'status': 'success',
+        'elapsed_seconds': round(time.monotonic() - started, 2),
+        'feedback': session.state.get(StateKeys.FINAL_FEEDBACK, ''),
+        'test_execution_summary': session.state.get(StateKeys.TEST_EXECUTION_SUMMARY),
+    }
+
+
+async def run_batch_review(paths: Iterable[str],
+                           workers: Optional[int] = None,
+                           use_llm: bool = True,
+                           min_lines: Optional[int] = None,
+                           min_issue_count: Optional[int] = None,
+                           max_style_score: Optional[int] = None,
+                           max_llm_files: Optional[int] = None,
+                           llm_concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Review a set of files and directories.
+
+    Deterministic stages run for every file on a process pool; only files
+    that cross the thresholds are reviewed by the LLM pipeline.
+
+    Returns:
+        Consolidated report dictionary
+    """
+    min_lines = config.batch_llm_min_lines if min_lines is None else min_lines
+    min_issue_count = config.batch_llm_min_issue_count if min_issue_count is None else min_issue_count
+    max_style_score = config.batch_llm_max_style_score if max_style_score is None else max_style_score
+    max_llm_files = config.batch_llm_max_files if max_llm_files is None else max_llm_files
+    llm_concurrency = llm_concurrency or config.batch_llm_concurrency
+
+    paths = list(paths)
+    started = time.monotonic()
+    files = collect_python_files(paths)
+    logger.info(f"Batch: Reviewing {len(files)} files")
+
+    # --- Deterministic stages on a process pool ---
+    executor = CpuExecutor(backend="process", max_workers=workers or os.cpu_count())
+    try:
+        records = await asyncio.gather(*(_review_file(path, executor) for path in files))
+    finally:
+        executor.shutdown()
+    deterministic_seconds = time.monotonic() - started
+
+    # --- LLM stage for files above the thresholds ---
+    candidates = [r for r in records
+                  if needs_llm_review(r, min_lines, min_issue_count, max_style_score)]
+    # Worst files first, so a capped run spends its budget where it matters
+    candidates.sort(key=lambda r: (r['style_score'], -r['issue_count']))
+    selected = candidates[:max_llm_files] if use_llm else []
+
+    if selected:
+        session_service = InMemorySessionService()
+        runner = Runner(
+            app_name=APP_NAME,
+            agent=code_review_pipeline,
+            session_service=session_service,
+            artifact_service=get_artifact_service()
+        )
+        semaphore = asyncio.Semaphore(llm_concurrency)
+
+        async def review(record: Dict[str, Any]) -> None:
+            async with semaphore:
+                logger.info(f"Batch: LLM review of {record['path']}")
+                record['llm_review'] = await _llm_review(runner, session_service, record)
+
+        await asyncio.gather(*(review(r) for r in selected))
+
+    for record in records:
+        record.pop('code', None)
+        record.setdefault('llm_review', None)
+
+    scored = [r for r in records if 'style_score' in r]
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'paths': paths,
+        'thresholds': {
+            'min_lines': min_lines,
+            'min_issue_count': min_issue_count,
+            'max_style_score': max_style_score,
+            'max_llm_files': max_llm_files,
+        },
+        'summary': {
+            'files': len(records),
+            'reviewed': sum(1 for r in records if r['status'] == 'success'),
+            'syntax_errors': sum(1 for r in records if r['status'] == 'syntax_error'),
+            'read_errors': sum(1 for r in records if r['status'] == 'error'),
+            'avg_style_score': (sum(r['style_score'] for r in scored) / len(scored)) if scored else 0.0,
+            'total_style_issues': sum(r['issue_count'] for r in scored),
+            'llm_candidates': len(candidates),
+            'llm_reviewed': len(selected),
+            'deterministic_seconds': round(deterministic_seconds, 2),
+            'elapsed_seconds': round(time.monotonic() - started, 2),
+        },
+        'files': records,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for batch reviews."""
+    parser = argparse.ArgumentParser(
+        description="Review a directory or list of Python files and write a JSON report."
+    )
+    parser.add_argument("paths", nargs="+", help="Files or directories to review")
+    parser.add_argument("-o", "--output", default="batch_review_report.json",
+                        help="Path of the consolidated JSON report")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Process pool size for deterministic stages")
+    parser.add_argument("--no-llm", action="store_true",
+                        help="Only run the deterministic stages")
+    parser.add_argument("--min-lines", type=int, default=None,
+                        help="Minimum file length for LLM review")
+    parser.add_argument("--min-issues", type=int, default=None,
+                        help="Style issue count that triggers LLM review")
+    parser.add_argument("--max-style-score", type=int, default=None,
+                        help="Style score at or below which LLM review is triggered")
+    parser.add_argument("--max-llm-files", type=int, default=None,
+                        help="Maximum number of files sent to the LLM pipeline")
+    parser.add_argument("--llm-concurrency", type=int, default=None,
+                        help="Concurrent LLM pipeline runs")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_batch_review(
+        args.paths,
+        workers=args.workers,
+        use_llm=not args.no_llm,
+        min_lines=args.min_lines,
+        min_issue_count=args.min_issues,
+        max_style_score=args.max_style_score,
+        max_llm_files=args.max_llm_files,
+        llm_concurrency=args.llm_concurrency,
+    ))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    summary = report['summary']
+    print(f"Reviewed {summary['files']} files in {summary['elapsed_seconds']}s "
+          f"({summary['llm_reviewed']} sent to LLM). Report: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
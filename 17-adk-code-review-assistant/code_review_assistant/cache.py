@@ -0,0 +1,233 @@
+"""
+Content-addressed result cache for the Code Review Assistant.
+
+Structure analysis and style checks are pure functions of the submitted code,
+so their results are cached by a hash of the source. Entries live in an
+in-memory LRU tier and, optionally, an on-disk tier that survives restarts
+and is shared by every worker process pointing at the same directory.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .config import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bump when the shape or semantics of cached results change.
+CACHE_VERSION = "2"
+
+# Namespaces for the cached tool helpers
+SOURCE_ANALYSIS = "source_analysis"
+STYLE_CHECK = "style_check"
+UNIT_REVIEW = "unit_review"
+
+
+class ResultCache:
+    """Two-tier (memory LRU + optional disk) cache keyed by source hash."""
+
+    def __init__(self,
+                 max_entries: int = 512,
+                 disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+
+        # Counters
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._disk_evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._scan_disk())
+
+    @staticmethod
+    def make_key(namespace: str, code: str) -> str:
+        """Build the cache key for a namespace and source code."""
+        digest = hashlib.sha256(code.encode('utf-8')).hexdigest()
+        return f"{namespace}-v{CACHE_VERSION}-{digest}"
+
+    def get(self, namespace: str, code: str) -> Optional[Any]:
+        """Return a copy of the cached result, or None on a miss."""
+        key = self.make_key(namespace, code)
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return copy.deepcopy(self._memory[key])
+
+        value = self._read_disk(key)
+        if value is not None:
+            with self._lock:
+                self._hits += 1
+                self._disk_hits += 1
+            self._store_memory(key, value)
+            return copy.deepcopy(value)
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, namespace: str, code: str, value: Any) -> None:
+        """Store a result for the given namespace and source code."""
+        key = self.make_key(namespace, code)
+        value = copy.deepcopy(value)
+        self._store_memory(key, value)
+        self._write_disk(key, value)
+
+    def clear(self) -> None:
+        """Drop all entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        for path, _, _ in self._scan_disk():
+            self._remove_file(path)
+        with self._lock:
+            self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': (self._hits / lookups) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'max_entries': self.max_entries,
+                'evictions': self._evictions,
+                'disk_enabled': bool(self.disk_dir),
+                'disk_bytes': self._disk_bytes,
+                'max_disk_bytes': self.max_disk_bytes,
+                'disk_evictions': self._disk_evictions,
+            }
+
+    # --- Memory tier ---
+
+    def _store_memory(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._evictions += 1
+
+    # --- Disk tier ---
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Any]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)  # Refresh recency for eviction
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache: Dropping unreadable entry {path}: {e}")
+            self._remove_file(path)
+            return None
+
+    def _write_disk(self, key: str, value: Any) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = None
+        try:
+            data = json.dumps(value)
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Cache: Could not write entry {key}: {e}")
+            # Don't leave partial temp files behind, they are never read or evicted
+            if tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return
+
+        with self._lock:
+            self._disk_bytes += len(data.encode('utf-8')) - previous_size
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _scan_disk(self):
+        """Yield (path, mtime, size) for every cache file on disk."""
+        if not self.disk_dir:
+            return
+        try:
+            entries = list(os.scandir(self.disk_dir))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def _evict_disk(self) -> None:
+        """Remove least recently used files until the tier fits its budget."""
+        files = sorted(self._scan_disk(), key=lambda item: item[1])
+        total = sum(size for _, _, size in files)
+        # Evict down to 90% so the next few writes don't rescan immediately
+        target = int(self.max_disk_bytes * 0.9)
+        evicted = 0
+        for path, _, size in files:
+            if total <= target:
+                break
+            if self._remove_file(path):
+                total -= size
+                evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self._disk_evictions += evicted
+
+    @staticmethod
+    def _remove_file(path: str) -> bool:
+        try:
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+
+# --- Process-wide shared instance ---
+result_cache = ResultCache(
+    max_entries=config.analysis_cache_max_entries,
+    disk_dir=config.analysis_cache_dir,
+    max_disk_bytes=config.analysis_cache_max_disk_mb * 1024 * 1024
+)
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters for the shared result cache."""
+    return result_cache.stats()
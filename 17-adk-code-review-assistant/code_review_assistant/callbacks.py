@@ -0,0 +1,80 @@
+"""
+Agent callbacks for the Code Review Assistant.
+
+The review stages run concurrently, so the code under review has to be in
+state before any of them starts rather than being stored by the first stage.
+"""
+import ast
+import logging
+import re
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from .config import config
+from .constants import StateKeys
+from .tools import get_unit_review, record_changed_units
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_CODE_FENCE = re.compile(r"```(?:python|py)?[^\n]*\n(.*?)```", re.DOTALL)
+# Lines only code starts with, and a block opened by a colon and indented below it
+_CODE_LINE = re.compile(
+    r"^[ \t]*(?:(?:async[ \t]+)?def[ \t]+\w+[ \t]*\(|class[ \t]+\w+|import[ \t]+\w|from[ \t]+[\w.]+[ \t]+import[ \t])",
+    re.MULTILINE
+)
+_INDENTED_BLOCK = re.compile(r":[ \t]*\n[ \t]+\S")
+
+
+def extract_code(text: str) -> str:
+    """
+    Return the fenced code blocks of a message. Without code fences, return the
+    whole message if it parses as Python or contains code-like lines (code with a
+    syntax error, or code pasted after a sentence), and an empty string for prose
+    such as "review it again", so a follow-up question doesn't replace the code
+    under review.
+    """
+    blocks = _CODE_FENCE.findall(text)
+    if blocks:
+        return "\n\n".join(block.strip("\n") + "\n" for block in blocks)
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        if _CODE_LINE.search(text) or _INDENTED_BLOCK.search(text):
+            return text
+        return ""
+    # A single word like "thanks" parses too, as a bare name
+    if all(isinstance(node, ast.Expr) and isinstance(node.value, (ast.Name, ast.Constant))
+           for node in tree.body):
+        return ""
+    return text
+
+
+async def prepare_review_state(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    Store the submitted code (and, with incremental review, the units that
+    changed since the previous review) before the parallel review stages run.
+    """
+    user_content = callback_context.user_content
+    text = "".join(part.text for part in (user_content.parts if user_content else []) if part.text)
+    code = extract_code(text)
+    if not code.strip():
+        # Follow-up questions keep reviewing the previously submitted code
+        logger.info("Callback: No code found in the user message, keeping the previous code")
+        return None
+
+    callback_context.state[StateKeys.CODE_TO_REVIEW] = code
+    callback_context.state[StateKeys.CODE_LINE_COUNT] = len(code.splitlines())
+
+    if config.incremental_review_enabled:
+        try:
+            review = await get_unit_review(code, callback_context)
+            record_changed_units(review['units'], callback_context)
+        except SyntaxError:
+            # The analyzer reports syntax errors; test everything this time
+            callback_context.state[StateKeys.CHANGED_UNITS] = None
+
+    logger.info(f"Callback: Prepared {len(code.splitlines())} lines for review")
+    return None
@@ -88,6 +88,86 @@ class AgentConfig(BaseSettings):
     # --- Application Limits ---
     max_grading_attempts: int = Field(default=3, gt=0)
 
+    # --- Tool Execution ---
+    cpu_executor_backend: str = Field(
+        default="thread", description="Backend for CPU-bound tool work: 'thread' or 'process'."
+    )
+    cpu_executor_max_workers: Optional[int] = Field(
+        default=None, gt=0, description="Worker count for the shared CPU executor (auto if not set)."
+    )
+
+    # --- Test Execution ---
+    test_executor_backend: str = Field(
+        default="builtin", description="Executor for generated tests: 'builtin' (remote) or 'local' (sandboxed subprocesses)."
+    )
+    sandbox_pool_size: int = Field(
+        default=2, gt=0, description="Warm interpreters kept ready by the local sandbox."
+    )
+    sandbox_cpu_seconds: int = Field(
+        default=10, gt=0, description="CPU time limit per sandboxed test run."
+    )
+    sandbox_memory_mb: int = Field(
+        default=512, gt=0, description="Address space limit per sandboxed test run."
+    )
+    sandbox_file_mb: int = Field(
+        default=16, gt=0, description="Maximum size of files written by a sandboxed test run."
+    )
+    sandbox_timeout_seconds: float = Field(
+        default=30.0, gt=0, description="Wall-clock limit per sandboxed test run."
+    )
+    sandbox_max_output_kb: int = Field(
+        default=64, gt=0, description="Captured stdout/stderr per sandboxed test run."
+    )
+
+    # --- Analysis Result Cache ---
+    analysis_cache_max_entries: int = Field(
+        default=512, ge=0, description="In-memory LRU size for analysis/style results (0 disables)."
+    )
+    analysis_cache_dir: Optional[str] = Field(
+        default=None, description="Directory for the on-disk cache tier (disabled if not set)."
+    )
+    analysis_cache_max_disk_mb: int = Field(
+        default=256, gt=0, description="Size budget for the on-disk cache tier in megabytes."
+    )
+
+    # --- Past Feedback ---
+    past_feedback_cache_ttl_seconds: int = Field(
+        default=900, ge=0, description="How long memory search results are reused per developer (0 disables)."
+    )
+
+    # --- Incremental Review ---
+    incremental_review_enabled: bool = Field(
+        default=True, description="Re-analyze only functions/classes changed since the previous review."
+    )
+    incremental_unit_cache_max: int = Field(
+        default=500, ge=0, description="Maximum per-unit results kept in session state."
+    )
+
+    # --- Batch Review ---
+    batch_llm_min_lines: int = Field(
+        default=10, ge=0, description="Files shorter than this never go to the LLM pipeline."
+    )
+    batch_llm_min_issue_count: int = Field(
+        default=5, ge=0, description="Style issue count that sends a file to the LLM pipeline."
+    )
+    batch_llm_max_style_score: int = Field(
+        default=70, ge=0, le=100, description="Style score at or below which a file goes to the LLM pipeline."
+    )
+    batch_llm_max_files: int = Field(
+        default=50, ge=0, description="Maximum number of files per batch sent to the LLM pipeline."
+    )
+    batch_llm_concurrency: int = Field(
+        default=4, gt=0, description="Concurrent LLM pipeline runs during a batch review."
+    )
+
+    # --- Instrumentation ---
+    metrics_enabled: bool = Field(
+        default=True, description="Record per-stage latency, token and CPU metrics."
+    )
+    metrics_log_path: Optional[str] = Field(
+        default=None, description="JSONL file that per-invocation metrics are appended to."
+    )
+
     # --- Logging & Debugging ---
     log_level: str = Field(default="INFO")
     debug_mode: bool = Field(default=False)
@@ -109,6 +189,24 @@ class AgentConfig(BaseSettings):
             raise ValueError(f"Invalid log_level: {v}. Must be one of {valid_levels}")
         return v.upper()
 
+    @field_validator('cpu_executor_backend')
+    @classmethod
+    def validate_cpu_executor_backend(cls, v: str) -> str:
+        """Ensure the executor backend is a valid choice."""
+        valid_backends = ['thread', 'process']
+        if v.lower() not in valid_backends:
+            raise ValueError(f"Invalid cpu_executor_backend: {v}. Must be one of {valid_backends}")
+        return v.lower()
+
+    @field_validator('test_executor_backend')
+    @classmethod
+    def validate_test_executor_backend(cls, v: str) -> str:
+        """Ensure the test executor backend is a valid choice."""
+        valid_backends = ['builtin', 'local']
+        if v.lower() not in valid_backends:
+            raise ValueError(f"Invalid test_executor_backend: {v}. Must be one of {valid_backends}")
+        return v.lower()
+
     @field_validator('google_cloud_project', mode='before')
     @classmethod
     def set_google_cloud_project(cls, v: Optional[str]) -> Optional[str]:
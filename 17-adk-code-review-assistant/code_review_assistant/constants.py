@@ -26,6 +26,12 @@ class StateKeys:
     PAST_FEEDBACK = "past_feedback"
     FEEDBACK_PATTERNS = "feedback_patterns"
     SCORE_IMPROVEMENT = "score_improvement"
+    PIPELINE_METRICS = "pipeline_metrics"  # Per-stage latency/token metrics of the last invocation
+
+    # === Incremental review keys ===
+    REVIEW_UNIT_CACHE = "review_unit_cache"  # Per-unit structure/style results
+    REVIEW_UNIT_HASHES = "review_unit_hashes"  # Unit source hashes of the last review
+    CHANGED_UNITS = "changed_units"  # Units changed since the last review (None on first review)
 
     # === Fix pipeline keys ===
     CODE_FIXES = "code_fixes"  # From code_fixer_agent output_key
@@ -0,0 +1,178 @@
+"""
+Shared CPU executor for the Code Review Assistant tools.
+
+The deterministic tools (AST analysis, pycodestyle) are CPU-bound and must not
+run on the ADK event loop. Instead of creating a new ThreadPoolExecutor for
+every tool call, all tools share one long-lived pool per process. The pool is
+created lazily, can be backed by threads or processes, and records queue-depth
+and wait-time metrics.
+"""
+import asyncio
+import atexit
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .config import config
+from .metrics import record_tool_cpu
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+VALID_BACKENDS = ("thread", "process")
+
+
+def _timed_call(func: Callable[..., Any], *args: Any) -> tuple:
+    """
+    Run func inside the worker and report when it actually started and the
+    CPU time it used.
+
+    Module-level so it can be pickled for the process backend. Wall-clock time
+    is used because monotonic clocks are not comparable across processes.
+    """
+    started_at = time.time()
+    cpu_started = time.thread_time()
+    result = func(*args)
+    return started_at, time.thread_time() - cpu_started, result
+
+
+class CpuExecutor:
+    """Long-lived executor for CPU-bound tool work with basic metrics."""
+
+    def __init__(self, backend: str = "thread", max_workers: Optional[int] = None):
+        if backend not in VALID_BACKENDS:
+            raise ValueError(f"Invalid executor backend: {backend}. Must be one of {VALID_BACKENDS}")
+
+        self.backend = backend
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._in_flight = 0
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+
+    def _get_executor(self) -> Executor:
+        """Create the underlying pool on first use."""
+        with self._lock:
+            if self._executor is None:
+                if self.backend == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="code-review-cpu"
+                    )
+                logger.info(f"CPU executor started: backend={self.backend}, "
+                            f"max_workers={self.max_workers}")
+            return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run func(*args) on the shared pool and await the result.
+
+        For the process backend, func and args must be picklable.
+        """
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            self._submitted += 1
+            self._in_flight += 1
+            queue_depth = max(0, self._in_flight - self.max_workers)
+            self._max_queue_depth = max(self._max_queue_depth, queue_depth)
+
+        submitted_at = time.time()
+        try:
+            started_at, cpu_seconds, result = await loop.run_in_executor(
+                executor, functools.partial(_timed_call, func, *args)
+            )
+        except BaseException:
+            # Includes cancellation, so in-flight accounting never leaks
+            with self._lock:
+                self._in_flight -= 1
+                self._failed += 1
+            raise
+
+        finished_at = time.time()
+        wait = max(0.0, started_at - submitted_at)
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._total_run += max(0.0, finished_at - started_at)
+
+        record_tool_cpu(cpu_seconds)
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of executor metrics."""
+        with self._lock:
+            completed = self._completed
+            return {
+                'backend': self.backend,
+                'max_workers': self.max_workers,
+                'submitted': self._submitted,
+                'completed': completed,
+                'failed': self._failed,
+                'in_flight': self._in_flight,
+                'queue_depth': max(0, self._in_flight - self.max_workers),
+                'max_queue_depth': self._max_queue_depth,
+                'avg_wait_ms': (self._total_wait / completed * 1000) if completed else 0.0,
+                'max_wait_ms': self._max_wait * 1000,
+                'avg_run_ms': (self._total_run / completed * 1000) if completed else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the underlying pool; it is recreated on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+# --- Process-wide shared instance ---
+_cpu_executor: Optional[CpuExecutor] = None
+_cpu_executor_lock = threading.Lock()
+
+
+def get_cpu_executor() -> CpuExecutor:
+    """Return the shared CPU executor, creating it from config on first use."""
+    global _cpu_executor
+    if _cpu_executor is None:
+        with _cpu_executor_lock:
+            if _cpu_executor is None:
+                _cpu_executor = CpuExecutor(
+                    backend=config.cpu_executor_backend,
+                    max_workers=config.cpu_executor_max_workers
+                )
+    return _cpu_executor
+
+
+async def run_cpu_bound(func: Callable[..., Any], *args: Any) -> Any:
+    """Convenience wrapper to run CPU-bound work on the shared executor."""
+    return await get_cpu_executor().run(func, *args)
+
+
+def get_executor_metrics() -> Dict[str, Any]:
+    """Return metrics for the shared executor (empty if never used)."""
+    if _cpu_executor is None:
+        return {}
+    return _cpu_executor.metrics()
+
+
+@atexit.register
+def _shutdown_cpu_executor() -> None:
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=False)
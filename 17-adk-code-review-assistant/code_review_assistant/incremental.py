@@ -0,0 +1,308 @@
+"""
+Incremental, diff-aware review for the Code Review Assistant.
+
+Splits a module into top-level units (functions, classes and runs of other
+module-level statements) and re-runs structure metrics and pycodestyle only
+for units whose source changed since the previous review. Results for
+unchanged units come from a unit cache kept in session state.
+
+Per-unit style checks see a few synthetic context lines standing in for the
+preceding unit, so blank-line (E30x) and import-position (E402) checks
+across unit boundaries behave as they do for a full-file check.
+"""
+import ast
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .analysis_engine import CodeAnalysisVisitor
+from .style_engine import check_style
+
+# Names used in the synthetic context lines
+_CONTEXT_NAME = "_review_context"
+_CONTEXT_CLASS_NAME = "_ReviewContext"
+
+# Module-level statements pycodestyle allows before imports (E402)
+_IMPORT_SAFE_STATEMENTS = (ast.Import, ast.ImportFrom, ast.If, ast.Try, ast.With)
+_DUNDER_NAME = re.compile(r'^__\w+__$')
+
+_DEFINITION_KINDS = {
+    ast.FunctionDef: 'function',
+    ast.AsyncFunctionDef: 'function',
+    ast.ClassDef: 'class',
+}
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _is_import_safe(node: ast.stmt, is_first: bool) -> bool:
+    """Whether a statement leaves pycodestyle's 'seen_non_imports' unset."""
+    if isinstance(node, _IMPORT_SAFE_STATEMENTS):
+        return True
+    if (is_first and isinstance(node, ast.Expr)
+            and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)):
+        return True  # Module docstring
+    if isinstance(node, (ast.Assign, ast.AnnAssign)):
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        return all(isinstance(t, ast.Name) and _DUNDER_NAME.match(t.id) for t in targets)
+    return False
+
+
+def split_units(code: str, tree: ast.Module) -> List[Dict[str, Any]]:
+    """
+    Split a parsed module into top-level review units.
+
+    Every line of the module belongs to exactly one unit: blank lines and
+    comments before a unit are part of it, and trailing lines belong to the
+    last unit.
+    """
+    lines = code.splitlines(keepends=True)
+    units: List[Dict[str, Any]] = []
+
+    for index, node in enumerate(tree.body):
+        kind = _DEFINITION_KINDS.get(type(node), 'module')
+        decorators = getattr(node, 'decorator_list', [])
+        node_start = min([node.lineno] + [d.lineno for d in decorators])
+        previous = units[-1] if units else None
+
+        if previous and (node_start <= previous['node_end']
+                         or (kind == 'module' and previous['kind'] == 'module')):
+            # Consecutive module-level statements form a single unit
+            previous['node_end'] = max(previous['node_end'], node.end_lineno)
+            previous['nodes'].append(node)
+            previous['import_safe'] = previous['import_safe'] and _is_import_safe(node, index == 0)
+            continue
+
+        units.append({
+            'kind': kind,
+            'name': node.name if kind != 'module' else f"<module line {node_start}>",
+            'is_async': isinstance(node, ast.AsyncFunctionDef),
+            'node_start': node_start,
+            'node_end': node.end_lineno,
+            'nodes': [node],
+            'import_safe': kind == 'module' and _is_import_safe(node, index == 0),
+        })
+
+    if not units:
+        return [{
+            'kind': 'module', 'name': '<module line 1>', 'is_async': False,
+            'node_start': 1, 'node_end': len(lines), 'nodes': [],
+            'import_safe': True, 'tail_depth': 0, 'start': 1, 'end': len(lines),
+        }]
+
+    # Assign every line to a unit. Indented comments trailing a unit stay
+    # with it; blank lines and other comments belong to the next unit.
+    for i, unit in enumerate(units):
+        unit['start'] = 1 if i == 0 else units[i - 1]['end'] + 1
+        unit['tail_depth'] = _tail_depth(unit['nodes'][-1], lines)
+        if i == len(units) - 1:
+            unit['end'] = max(len(lines), unit['node_end'])
+            continue
+        unit['end'] = unit['node_end']
+        for lineno in range(unit['node_end'] + 1, units[i + 1]['node_start']):
+            line = lines[lineno - 1]
+            if not line.strip():
+                continue
+            if line[0] in ' \t' and line.lstrip().startswith('#'):
+                unit['end'] = lineno
+            else:
+                break
+
+    return units
+
+
+def _line_indent(lines: List[str], node: ast.AST) -> Optional[int]:
+    """Indent width of the line a node starts, or None if it doesn't start the line."""
+    line = lines[node.lineno - 1]
+    if line[:node.col_offset].strip():
+        return None
+    return node.col_offset
+
+
+def _last_child(node: ast.AST) -> Optional[ast.AST]:
+    """The child statement or clause that ends last in a compound statement."""
+    candidates = []
+    for field in ('body', 'orelse', 'finalbody', 'handlers', 'cases'):
+        children = getattr(node, field, None)
+        if isinstance(children, list) and children:
+            last = children[-1]
+            end_node = last.body[-1] if isinstance(last, ast.match_case) else last
+            candidates.append(((end_node.end_lineno, end_node.end_col_offset), last))
+    return max(candidates, key=lambda item: item[0])[1] if candidates else None
+
+
+def _tail_depth(node: ast.AST, lines: List[str]) -> int:
+    """
+    Indentation depth of the last line of a top-level statement, i.e. how
+    many DEDENT tokens precede the next top-level line.
+    """
+    widths = {0}
+    current = _last_child(node)
+    while current is not None:
+        if isinstance(current, ast.match_case):
+            width = _line_indent(lines, current.pattern)
+            current = current.body[-1]
+            if width is not None:
+                widths.add(width)
+        elif isinstance(current, ast.ExceptHandler):
+            current = current.body[-1]
+        width = _line_indent(lines, current)
+        if width is not None:
+            widths.add(width)
+        current = _last_child(current)
+    return len(widths) - 1
+
+
+def _context_lines(previous: Optional[Dict[str, Any]], seen_non_imports: bool) -> str:
+    """
+    Build synthetic lines that leave pycodestyle in the same state the
+    preceding unit would: the last top-level logical line, the indentation
+    depth of the final line, and whether non-imports were seen (E402).
+    """
+    if previous is None:
+        return ''
+
+    depth = previous['tail_depth']
+    if previous['kind'] == 'function':
+        prefix = 'async def' if previous['is_async'] else 'def'
+        header = f"{prefix} {_CONTEXT_NAME}():"
+        state = ''
+    elif previous['kind'] == 'class':
+        header = f"class {_CONTEXT_CLASS_NAME}:"
+        state = ''
+    else:
+        state = f"{_CONTEXT_NAME} = None\n" if seen_non_imports else f"import {_CONTEXT_NAME}\n"
+        if depth == 0:
+            return state
+        header = f"if {_CONTEXT_NAME}:"
+
+    if depth == 0:
+        return f"{state}{header} pass\n"
+
+    body = [f"{'    ' * level}if {_CONTEXT_NAME}:\n" for level in range(1, depth)]
+    return f"{state}{header}\n{''.join(body)}{'    ' * depth}pass\n"
+
+
+def _analyze_unit(unit: Dict[str, Any], segment: str, context: str) -> Dict[str, Any]:
+    """Structure, naming and style results for one unit, with unit-relative lines."""
+    offset = unit['start'] - 1
+    visitor = CodeAnalysisVisitor()
+    for node in unit['nodes']:
+        visitor.visit(node)
+
+    context_lines = context.count('\n')
+    style_issues = []
+    for issue in check_style(context + segment):
+        if issue['line'] > context_lines:
+            style_issues.append({**issue, 'line': issue['line'] - context_lines})
+
+    return {
+        'functions': [{**f, 'lineno': f['lineno'] - offset} for f in visitor.functions],
+        'classes': [{**c, 'lineno': c['lineno'] - offset} for c in visitor.classes],
+        'imports': visitor.imports,
+        'docstrings': visitor.docstrings,
+        'function_lengths': visitor.function_lengths,
+        'naming_issues': [{**n, 'line': n['line'] - offset} for n in visitor.naming_issues],
+        'style_issues': style_issues,
+    }
+
+
+def review_units(code: str, unit_cache: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Review code unit by unit, reusing cached results for unchanged units.
+
+    Args:
+        code: Python source code to review
+        unit_cache: Previously computed unit results keyed by unit key
+
+    Returns:
+        Dictionary with the merged 'structure', 'naming_issues' and
+        'style_issues', the 'units' found, and 'new_unit_results' to add
+        to the unit cache
+
+    Raises:
+        SyntaxError: If the code cannot be parsed
+    """
+    tree = ast.parse(code)
+    lines = code.splitlines(keepends=True)
+    units = split_units(code, tree)
+
+    merged = CodeAnalysisVisitor()
+    style_issues: List[Dict[str, Any]] = []
+    unit_summaries: List[Dict[str, Any]] = []
+    new_results: Dict[str, Any] = {}
+    seen_non_imports = False
+    previous = None
+
+    for unit in units:
+        segment = ''.join(lines[unit['start'] - 1:unit['end']])
+        context = _context_lines(previous, seen_non_imports)
+        key = _hash(context + segment)
+
+        result = unit_cache.get(key) or new_results.get(key)
+        reused = result is not None
+        if result is None:
+            result = _analyze_unit(unit, segment, context)
+            new_results[key] = result
+
+        # Shift unit-relative line numbers back to file positions
+        offset = unit['start'] - 1
+        merged.functions.extend({**f, 'lineno': f['lineno'] + offset} for f in result['functions'])
+        merged.classes.extend({**c, 'lineno': c['lineno'] + offset} for c in result['classes'])
+        merged.imports.extend(result['imports'])
+        merged.docstrings.extend(result['docstrings'])
+        merged.function_lengths.extend(result['function_lengths'])
+        merged.naming_issues.extend({**n, 'line': n['line'] + offset} for n in result['naming_issues'])
+        style_issues.extend({**s, 'line': s['line'] + offset} for s in result['style_issues'])
+
+        unit_summaries.append({
+            'name': unit['name'],
+            'kind': unit['kind'],
+            'start_line': unit['node_start'],
+            'end_line': unit['node_end'],
+            'key': key,
+            'source_hash': _hash(''.join(lines[unit['node_start'] - 1:unit['node_end']])),
+            'reused': reused,
+        })
+
+        seen_non_imports = seen_non_imports or not unit['import_safe']
+        previous = unit
+
+    return {
+        'structure': merged.structure(code),
+        'naming_issues': merged.naming_issues,
+        'style_issues': sorted(style_issues, key=lambda i: (i['line'], i['column'])),
+        'units': unit_summaries,
+        'new_unit_results': new_results,
+    }
+
+
+def find_changed_units(units: List[Dict[str, Any]],
+                       previous_hashes: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split units into changed and unchanged relative to the previous review.
+
+    Returns:
+        (changed, unchanged) lists of unit descriptions
+    """
+    previous = set(previous_hashes)
+    changed, unchanged = [], []
+    for unit in units:
+        summary = {
+            'name': unit['name'],
+            'kind': unit['kind'],
+            'start_line': unit['start_line'],
+            'end_line': unit['end_line'],
+        }
+        (unchanged if unit['source_hash'] in previous else changed).append(summary)
+    return changed, unchanged
+
+
+def prune_unit_cache(unit_cache: Dict[str, Any], max_entries: int) -> Dict[str, Any]:
+    """Keep only the most recently added entries of the unit cache."""
+    if len(unit_cache) <= max_entries:
+        return unit_cache
+    keys = list(unit_cache)[-max_entries:] if max_entries > 0 else []
+    return {key: unit_cache[key] for key in keys}
@@ -0,0 +1,339 @@
+"""
+Per-stage instrumentation for the Code Review Assistant.
+
+Agent, model and tool callbacks attached to every agent in the tree record,
+per stage (agent): wall time, LLM calls, latency and tokens, tool calls and
+the CPU time tools spend on the shared CPU executor, plus LoopAgent
+iteration counts. When the outermost agent of an invocation finishes, the
+record is written to session state, logged as a JSON line, attached to the
+current OpenTelemetry span and optionally appended to a JSONL file.
+
+Usage:
+    python -m code_review_assistant.metrics review_metrics.jsonl
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent, LoopAgent
+from opentelemetry import trace
+
+from .config import config
+from .constants import StateKeys
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Invocations kept in memory at once; older ones are dropped if they never finish
+MAX_OPEN_INVOCATIONS = 256
+
+# CPU seconds reported by the executor for the tool call in progress
+_tool_cpu_sink: ContextVar[Optional[List[float]]] = ContextVar("tool_cpu_sink", default=None)
+
+
+def record_tool_cpu(seconds: float) -> None:
+    """Attribute CPU time spent on the executor to the running tool call, if any."""
+    sink = _tool_cpu_sink.get()
+    if sink is not None:
+        sink.append(seconds)
+
+
+class InvocationMetrics:
+    """Metrics for one invocation, accumulated across all of its stages."""
+
+    def __init__(self, invocation_id: str, owner: str):
+        self.invocation_id = invocation_id
+        self.owner = owner  # Outermost agent; the record is final when it ends
+        self.started_at = datetime.now().isoformat()
+        self._started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.loops: Dict[str, int] = {}
+        self.open: Dict[Any, Any] = {}
+
+    def stage(self, name: str) -> Dict[str, float]:
+        return self.stages.setdefault(name, {
+            'runs': 0,
+            'wall_ms': 0.0,
+            'llm_calls': 0,
+            'llm_ms': 0.0,
+            'tokens_in': 0,
+            'tokens_out': 0,
+            'tool_calls': 0,
+            'tool_ms': 0.0,
+            'tool_cpu_ms': 0.0,
+        })
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable view of the metrics so far."""
+        return {
+            'invocation_id': self.invocation_id,
+            'started_at': self.started_at,
+            'total_ms': round((time.perf_counter() - self._started) * 1000, 1),
+            'stages': {
+                name: {key: round(value, 1) if isinstance(value, float) else value
+                       for key, value in stage.items()}
+                for name, stage in self.stages.items()
+            },
+            'loops': dict(self.loops),
+        }
+
+
+_invocations: Dict[str, InvocationMetrics] = {}
+_loop_first_agents: Dict[str, str] = {}  # First sub-agent name -> LoopAgent name
+
+
+def current_metrics(invocation_id: str) -> Optional[Dict[str, Any]]:
+    """Snapshot of the metrics recorded so far for an invocation, if any."""
+    metrics = _invocations.get(invocation_id)
+    return metrics.snapshot() if metrics else None
+
+
+# --- Callbacks ---
+
+def _before_agent(callback_context) -> None:
+    name = callback_context.agent_name
+    metrics = _invocations.get(callback_context.invocation_id)
+    if metrics is None:
+        if len(_invocations) >= MAX_OPEN_INVOCATIONS:
+            _invocations.pop(next(iter(_invocations)))
+        metrics = _invocations[callback_context.invocation_id] = InvocationMetrics(
+            callback_context.invocation_id, name
+        )
+
+    metrics.stage(name)['runs'] += 1
+    metrics.open[('agent', name)] = time.perf_counter()
+    if name in _loop_first_agents:
+        loop_name = _loop_first_agents[name]
+        metrics.loops[loop_name] = metrics.loops.get(loop_name, 0) + 1
+    return None
+
+
+def _after_agent(callback_context) -> None:
+    name = callback_context.agent_name
+    metrics = _invocations.get(callback_context.invocation_id)
+    if metrics is None:
+        return None
+
+    started = metrics.open.pop(('agent', name), None)
+    if started is not None:
+        metrics.stage(name)['wall_ms'] += (time.perf_counter() - started) * 1000
+
+    if name == metrics.owner:
+        _invocations.pop(callback_context.invocation_id, None)
+        record = metrics.snapshot()
+        callback_context.state[StateKeys.PIPELINE_METRICS] = record
+        _export(record)
+    return None
+
+
+def _before_model(callback_context, llm_request) -> None:
+    metrics = _invocations.get(callback_context.invocation_id)
+    if metrics is not None:
+        metrics.open[('model', callback_context.agent_name)] = time.perf_counter()
+    return None
+
+
+def _after_model(callback_context, llm_response) -> None:
+    metrics = _invocations.get(callback_context.invocation_id)
+    if metrics is None or llm_response.partial:
+        return None
+
+    stage = metrics.stage(callback_context.agent_name)
+    started = metrics.open.pop(('model', callback_context.agent_name), None)
+    if started is not None:
+        stage['llm_ms'] += (time.perf_counter() - started) * 1000
+    stage['llm_calls'] += 1
+
+    usage = llm_response.usage_metadata
+    if usage is not None:
+        stage['tokens_in'] += usage.prompt_token_count or 0
+        stage['tokens_out'] += (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+    return None
+
+
+def _before_tool(tool, args, tool_context) -> None:
+    metrics = _invocations.get(tool_context.invocation_id)
+    if metrics is not None:
+        sink: List[float] = []
+        _tool_cpu_sink.set(sink)
+        metrics.open[('tool', tool_context.function_call_id)] = (time.perf_counter(), sink)
+    return None
+
+
+def _after_tool(tool, args, tool_context, tool_response) -> None:
+    metrics = _invocations.get(tool_context.invocation_id)
+    if metrics is None:
+        return None
+
+    opened = metrics.open.pop(('tool', tool_context.function_call_id), None)
+    stage = metrics.stage(tool_context.agent_name)
+    stage['tool_calls'] += 1
+    if opened is not None:
+        started, sink = opened
+        stage['tool_ms'] += (time.perf_counter() - started) * 1000
+        stage['tool_cpu_ms'] += sum(sink) * 1000
+    _tool_cpu_sink.set(None)
+    return None
+
+
+def _as_list(callbacks) -> list:
+    if callbacks is None:
+        return []
+    return list(callbacks) if isinstance(callbacks, list) else [callbacks]
+
+
+def instrument_agent_tree(agent: BaseAgent) -> BaseAgent:
+    """
+    Attach the metrics callbacks to an agent and all of its sub-agents.
+
+    The metrics callbacks run first so they always run (a callback returning
+    a value stops the rest) and timings include the other callbacks.
+    """
+    if not config.metrics_enabled:
+        return agent
+
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+
+        if _before_agent in _as_list(current.before_agent_callback):
+            continue  # Already instrumented
+        current.before_agent_callback = [_before_agent] + _as_list(current.before_agent_callback)
+        current.after_agent_callback = [_after_agent] + _as_list(current.after_agent_callback)
+
+        if isinstance(current, LlmAgent):
+            current.before_model_callback = [_before_model] + _as_list(current.before_model_callback)
+            current.after_model_callback = [_after_model] + _as_list(current.after_model_callback)
+            current.before_tool_callback = [_before_tool] + _as_list(current.before_tool_callback)
+            current.after_tool_callback = [_after_tool] + _as_list(current.after_tool_callback)
+
+        if isinstance(current, LoopAgent) and current.sub_agents:
+            _loop_first_agents[current.sub_agents[0].name] = current.name
+
+    return agent
+
+
+# --- Export ---
+
+def _export(record: Dict[str, Any]) -> None:
+    """Log the record as JSON, attach it to the current span and append it to the JSONL file."""
+    logger.info(f"Metrics: {json.dumps(record)}")
+
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.set_attribute("code_review.total_ms", record['total_ms'])
+        for name, stage in record['stages'].items():
+            for key, value in stage.items():
+                span.set_attribute(f"code_review.stage.{name}.{key}", value)
+        for name, iterations in record['loops'].items():
+            span.set_attribute(f"code_review.loop.{name}.iterations", iterations)
+
+    if config.metrics_log_path:
+        try:
+            with open(config.metrics_log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.warning(f"Metrics: Could not append to {config.metrics_log_path}: {e}")
+
+
+# --- Report ---
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate invocation records into per-stage statistics."""
+    stages: Dict[str, Dict[str, List[float]]] = {}
+    loops: Dict[str, List[int]] = {}
+    for record in records:
+        for name, stage in record.get('stages', {}).items():
+            values = stages.setdefault(name, {})
+            for key, value in stage.items():
+                values.setdefault(key, []).append(value)
+        for name, iterations in record.get('loops', {}).items():
+            loops.setdefault(name, []).append(iterations)
+
+    totals = [record.get('total_ms', 0.0) for record in records]
+    return {
+        'invocations': len(records),
+        'total_ms': {
+            'mean': statistics.mean(totals) if totals else 0.0,
+            'p50': _percentile(totals, 50) if totals else 0.0,
+            'p95': _percentile(totals, 95) if totals else 0.0,
+        },
+        'stages': {
+            name: {
+                'invocations': len(values['wall_ms']),
+                'mean_wall_ms': statistics.mean(values['wall_ms']),
+                'p95_wall_ms': _percentile(values['wall_ms'], 95),
+                'mean_llm_calls': statistics.mean(values['llm_calls']),
+                'mean_tokens_in': statistics.mean(values['tokens_in']),
+                'mean_tokens_out': statistics.mean(values['tokens_out']),
+                'mean_tool_cpu_ms': statistics.mean(values['tool_cpu_ms']),
+            }
+            for name, values in stages.items()
+        },
+        'loops': {name: {'mean_iterations': statistics.mean(its), 'max_iterations': max(its)}
+                  for name, its in loops.items()},
+    }
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """Read invocation records from a JSONL file, skipping malformed lines."""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning("Metrics: Skipping malformed line")
+    return records
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Print a per-stage latency and token report from a metrics JSONL file."""
+    parser = argparse.ArgumentParser(description="Summarize per-stage review metrics.")
+    parser.add_argument("path", nargs="?", default=config.metrics_log_path,
+                        help="Metrics JSONL file (defaults to METRICS_LOG_PATH)")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    if not args.path:
+        parser.error("No metrics file given and METRICS_LOG_PATH is not set")
+
+    summary = summarize(load_records(args.path))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+
+    total = summary['total_ms']
+    print(f"{summary['invocations']} invocations - total mean {total['mean']:.0f}ms, "
+          f"p50 {total['p50']:.0f}ms, p95 {total['p95']:.0f}ms\n")
+    print(f"{'Stage':<24}{'Runs':>6}{'Mean ms':>10}{'p95 ms':>10}{'LLM calls':>11}"
+          f"{'Tok in':>9}{'Tok out':>9}{'Tool CPU ms':>13}")
+    ordered = sorted(summary['stages'].items(), key=lambda item: -item[1]['mean_wall_ms'])
+    for name, stage in ordered:
+        print(f"{name:<24}{stage['invocations']:>6}{stage['mean_wall_ms']:>10.0f}"
+              f"{stage['p95_wall_ms']:>10.0f}{stage['mean_llm_calls']:>11.1f}"
+              f"{stage['mean_tokens_in']:>9.0f}{stage['mean_tokens_out']:>9.0f}"
+              f"{stage['mean_tool_cpu_ms']:>13.1f}")
+    for name, loop in summary['loops'].items():
+        print(f"\n{name}: {loop['mean_iterations']:.1f} iterations on average (max {loop['max_iterations']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
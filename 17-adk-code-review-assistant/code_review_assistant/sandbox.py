@@ -0,0 +1,255 @@
+"""
+Local sandboxed code execution for the test runner agents.
+
+Generated tests run in short-lived subprocesses on the review host instead
+of the remote built-in executor. A pool keeps warm, pre-started
+interpreters waiting for work, so a test batch starts in milliseconds;
+each interpreter runs exactly one job under CPU time, memory, file size
+and wall-clock limits and is then replaced in the background.
+
+This bounds resource use and isolates jobs from each other and from the
+review process; it is not a security boundary against hostile code.
+"""
+import atexit
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.code_executors import BaseCodeExecutor, BuiltInCodeExecutor
+from google.adk.code_executors.code_execution_utils import CodeExecutionInput, CodeExecutionResult
+
+from .config import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+# Extra instruction for agents whose code runs through a local executor,
+# which only executes fenced code blocks from the model's response
+LOCAL_EXECUTION_HINT = """
+
+CODE EXECUTION:
+To execute code, write it in a single ```python code block. It will be run
+and its output returned to you before you continue."""
+
+
+class SandboxPool:
+    """Pool of warm, single-use interpreters that run code under resource limits."""
+
+    def __init__(self,
+                 size: int = 2,
+                 cpu_seconds: int = 10,
+                 memory_mb: int = 512,
+                 file_mb: int = 16,
+                 timeout_seconds: float = 30.0,
+                 max_output_chars: int = 64 * 1024):
+        self.size = size
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.file_mb = file_mb
+        self.timeout_seconds = timeout_seconds
+        self.max_output_chars = max_output_chars
+        self._idle: Deque[subprocess.Popen] = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Counters
+        self._runs = 0
+        self._cold_starts = 0
+        self._timeouts = 0
+        self._limit_kills = 0
+
+    def run(self, code: str) -> Dict[str, str]:
+        """
+        Run code in a fresh sandboxed interpreter.
+
+        Returns:
+            Dictionary with captured 'stdout' and 'stderr'; limit violations
+            and crashes are reported in 'stderr'
+        """
+        worker = self._acquire()
+        self._refill_async()
+
+        workdir = tempfile.mkdtemp(prefix="review-sandbox-")
+        job = json.dumps({
+            'code': code,
+            'workdir': workdir,
+            'cpu_seconds': self.cpu_seconds,
+            'memory_mb': self.memory_mb,
+            'file_mb': self.file_mb,
+            'max_output_chars': self.max_output_chars,
+        })
+
+        started = time.monotonic()
+        try:
+            out, err = worker.communicate(job, timeout=self.timeout_seconds)
+        except subprocess.TimeoutExpired:
+            self._kill(worker)
+            worker.communicate()
+            with self._lock:
+                self._timeouts += 1
+            return {'stdout': '', 'stderr': f"Execution exceeded the {self.timeout_seconds}s wall-clock limit"}
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+            with self._lock:
+                self._runs += 1
+
+        logger.info(f"Sandbox: Job finished in {(time.monotonic() - started) * 1000:.0f}ms "
+                    f"(exit code {worker.returncode})")
+
+        if worker.returncode == 0 and out:
+            try:
+                return json.loads(out)
+            except ValueError:
+                pass  # The job wrote to the raw stdout file descriptor
+        return {'stdout': out[:self.max_output_chars], 'stderr': self._describe_failure(worker.returncode, err)}
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return pool counters."""
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle_workers': len(self._idle),
+                'runs': self._runs,
+                'cold_starts': self._cold_starts,
+                'timeouts': self._timeouts,
+                'limit_kills': self._limit_kills,
+            }
+
+    def shutdown(self) -> None:
+        """Terminate idle workers and stop refilling the pool."""
+        with self._lock:
+            self._closed = True
+            workers, self._idle = list(self._idle), deque()
+        for worker in workers:
+            self._kill(worker)
+            worker.wait()
+
+    # --- Worker management ---
+
+    def _spawn(self) -> subprocess.Popen:
+        # -I keeps the review host's environment and working directory out of
+        # the job; a new session lets a timeout kill any processes it started
+        return subprocess.Popen(
+            [sys.executable, "-I", _WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            start_new_session=True,
+        )
+
+    def _acquire(self) -> subprocess.Popen:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.popleft()
+                if worker.poll() is None:
+                    return worker
+            self._cold_starts += 1
+        return self._spawn()
+
+    def _refill(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed or len(self._idle) >= self.size:
+                    return
+            worker = self._spawn()
+            with self._lock:
+                if self._closed:
+                    self._kill(worker)
+                    return
+                self._idle.append(worker)
+
+    def _refill_async(self) -> None:
+        threading.Thread(target=self._refill, name="sandbox-refill", daemon=True).start()
+
+    def _describe_failure(self, returncode: int, stderr: str) -> str:
+        limits = {
+            -getattr(signal, 'SIGXCPU', 24): f"Execution exceeded the {self.cpu_seconds}s CPU time limit",
+            -getattr(signal, 'SIGXFSZ', 25): f"Execution exceeded the {self.file_mb}MB file size limit",
+        }
+        if returncode in limits:
+            with self._lock:
+                self._limit_kills += 1
+            return limits[returncode]
+        if 'MemoryError' in stderr:
+            return f"Execution exceeded the {self.memory_mb}MB memory limit"
+        return f"Sandbox process exited with code {returncode}\n{stderr[-self.max_output_chars:]}".strip()
+
+    @staticmethod
+    def _kill(worker: subprocess.Popen) -> None:
+        try:
+            os.killpg(worker.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError, PermissionError):
+            worker.kill()  # No process groups on Windows
+
+
+class LocalSandboxCodeExecutor(BaseCodeExecutor):
+    """Code executor that runs model-generated code in the local sandbox pool."""
+
+    def execute_code(
+        self,
+        invocation_context: InvocationContext,
+        code_execution_input: CodeExecutionInput,
+    ) -> CodeExecutionResult:
+        result = get_sandbox_pool().run(code_execution_input.code)
+        return CodeExecutionResult(
+            stdout=result['stdout'],
+            stderr=result['stderr'],
+            output_files=[]
+        )
+
+
+# --- Process-wide shared pool, started on first use ---
+_pool: Optional[SandboxPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Return the shared sandbox pool, creating it from config on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool(
+                size=config.sandbox_pool_size,
+                cpu_seconds=config.sandbox_cpu_seconds,
+                memory_mb=config.sandbox_memory_mb,
+                file_mb=config.sandbox_file_mb,
+                timeout_seconds=config.sandbox_timeout_seconds,
+                max_output_chars=config.sandbox_max_output_kb * 1024
+            )
+            logger.info(f"Sandbox: Started pool of {_pool.size} warm interpreters")
+            _pool._refill_async()
+        return _pool
+
+
+def _shutdown_pool() -> None:
+    if _pool is not None:
+        _pool.shutdown()
+
+
+atexit.register(_shutdown_pool)
+
+
+def create_test_code_executor() -> BaseCodeExecutor:
+    """Build the code executor for the test runner agents from config."""
+    if config.test_executor_backend == "local":
+        get_sandbox_pool()  # Warm the interpreters before the first test batch
+        return LocalSandboxCodeExecutor()
+    return BuiltInCodeExecutor()
+
+
+def code_execution_hint() -> str:
+    """Instruction suffix for the configured executor ('' for the built-in one)."""
+    return LOCAL_EXECUTION_HINT if config.test_executor_backend == "local" else ""
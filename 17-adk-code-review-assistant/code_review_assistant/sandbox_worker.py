@@ -0,0 +1,80 @@
+"""
+Warm interpreter for the local sandbox executor.
+
+Started ahead of time by the sandbox pool, this process pre-imports the
+modules generated tests commonly use and then blocks reading one job from
+stdin. When a job arrives it applies resource limits, runs the code with
+stdout/stderr captured, writes a JSON result to stdout and exits, so every
+job gets a fresh interpreter.
+
+This file is executed as a script and must not import the package.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import traceback
+import types
+
+# Preloaded so generated tests don't pay for these imports
+import collections  # noqa: F401
+import dataclasses  # noqa: F401
+import datetime  # noqa: F401
+import decimal  # noqa: F401
+import functools  # noqa: F401
+import itertools  # noqa: F401
+import math  # noqa: F401
+import random  # noqa: F401
+import re  # noqa: F401
+import string  # noqa: F401
+import typing  # noqa: F401
+import unittest  # noqa: F401
+
+
+def _apply_limits(cpu_seconds: int, memory_mb: int, file_mb: int) -> None:
+    """Apply CPU time, address space and file size limits to this process."""
+    try:
+        import resource
+    except ImportError:
+        return  # Not available on Windows; the wall-clock limit still applies
+
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    memory = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    file_size = file_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_FSIZE, (file_size, file_size))
+
+
+def main() -> None:
+    job = json.loads(sys.stdin.read())  # Blocks until the pool hands us a job
+
+    os.chdir(job['workdir'])
+    _apply_limits(job['cpu_seconds'], job['memory_mb'], job['file_mb'])
+
+    # Run the job as __main__ so unittest.main() and doctest find its tests
+    module = types.ModuleType('__main__')
+    module.__file__ = '<generated_tests>'
+    sys.modules['__main__'] = module
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            exec(compile(job['code'], '<generated_tests>', 'exec'), module.__dict__)
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                print(f"SystemExit: {e.code}", file=sys.stderr)
+        except BaseException as e:
+            # Skip this worker's own frame
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+
+    limit = job['max_output_chars']
+    sys.__stdout__.write(json.dumps({
+        'stdout': stdout.getvalue()[:limit],
+        'stderr': stderr.getvalue()[:limit],
+    }))
+    sys.__stdout__.flush()
+
+
+if __name__ == "__main__":
+    main()
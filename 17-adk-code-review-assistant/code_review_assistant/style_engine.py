@@ -0,0 +1,70 @@
+"""
+In-memory PEP 8 checking for the Code Review Assistant.
+
+Feeds source lines straight to pycodestyle's Checker and collects violations
+through a structured report, so style checks touch neither the file system
+nor sys.stdout and can run concurrently from many threads.
+"""
+from typing import List, TypedDict
+
+import pycodestyle
+
+MAX_LINE_LENGTH = 100
+IGNORED_CODES = ['E501', 'W503']
+
+# Options are read-only once built, so one instance is shared by all checks.
+_STYLE_GUIDE = pycodestyle.StyleGuide(
+    quiet=True,
+    max_line_length=MAX_LINE_LENGTH,
+    ignore=IGNORED_CODES
+)
+
+
+class StyleIssue(TypedDict):
+    """A single style violation."""
+    line: int
+    column: int
+    code: str
+    message: str
+
+
+class StructuredReport(pycodestyle.BaseReport):
+    """pycodestyle report that records violations instead of printing them."""
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.issues: List[StyleIssue] = []
+
+    def error(self, line_number, offset, text, check):
+        """Record an error unless pycodestyle's options filter it out."""
+        code = super().error(line_number, offset, text, check)
+        if code:
+            self.issues.append({
+                'line': line_number,
+                'column': offset + 1,
+                'code': code,
+                'message': text
+            })
+        return code
+
+
+def check_style(code: str, filename: str = '<review>') -> List[StyleIssue]:
+    """
+    Run pycodestyle over source code held in memory.
+
+    Args:
+        code: Python source code to check
+        filename: Name reported for the source (no file is read)
+
+    Returns:
+        List of style issues sorted by line and column
+    """
+    report = StructuredReport(_STYLE_GUIDE.options)
+    checker = pycodestyle.Checker(
+        filename=filename,
+        lines=code.splitlines(keepends=True),
+        options=_STYLE_GUIDE.options,
+        report=report
+    )
+    checker.check_all()
+    return sorted(report.issues, key=lambda issue: (issue['line'], issue['column']))
@@ -7,9 +7,9 @@ that all issues have been resolved.
 
 from google.adk.agents import Agent
 from google.adk.agents.readonly_context import ReadonlyContext
-from google.adk.code_executors import BuiltInCodeExecutor
 from google.adk.utils import instructions_utils
 from code_review_assistant.config import config
+from code_review_assistant.sandbox import create_test_code_executor, code_execution_hint
 
 
 async def fix_test_runner_instruction_provider(context: ReadonlyContext) -> str:
@@ -60,7 +60,8 @@ Execute your tests and output ONLY this JSON structure:
 
 Do NOT output the test code itself, only the JSON analysis."""
     
-    return await instructions_utils.inject_session_state(template, context)
+    instruction = await instructions_utils.inject_session_state(template, context)
+    return instruction + code_execution_hint()
 
 
 fix_test_runner_agent = Agent(
@@ -68,6 +69,6 @@ fix_test_runner_agent = Agent(
     model=config.worker_model,
     description="Runs comprehensive tests on fixed code to verify all issues are resolved",
     instruction=fix_test_runner_instruction_provider,
-    code_executor=BuiltInCodeExecutor(),
+    code_executor=create_test_code_executor(),
     output_key="fix_test_execution_summary"
 )
@@ -43,8 +43,6 @@ List the specific violations found (the tool will provide these):
 - Show line numbers, error codes, and messages
 - Focus on the top 10 most important issues
 
-Previous analysis: {structure_analysis_summary}
-
 Format your response as:
 ## Style Analysis Results
 - Style Score: [exact score]/100
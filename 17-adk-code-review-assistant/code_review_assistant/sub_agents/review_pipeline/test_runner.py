@@ -7,18 +7,19 @@ and runs them using ADK's built-in code executor.
 
 from google.adk.agents import Agent
 from google.adk.agents.readonly_context import ReadonlyContext
-from google.adk.code_executors import BuiltInCodeExecutor
 from google.adk.utils import instructions_utils
 from code_review_assistant.config import config
+from code_review_assistant.sandbox import create_test_code_executor, code_execution_hint
+from code_review_assistant.constants import StateKeys
 
 
 async def test_runner_instruction_provider(context: ReadonlyContext) -> str:
-    """Dynamic instruction provider that injects the code_to_review directly."""
+    """Dynamic instruction provider that injects the code_to_review directly, empty if none was submitted."""
     template = """You are a testing specialist who creates and runs tests for Python code.
 
 THE CODE TO TEST IS:
 ```python
-{code_to_review}
+{code_to_review?}
 ```
 
 YOUR TASK:
@@ -72,7 +73,45 @@ Execute your tests and output ONLY this JSON structure:
 
 Do NOT output the test code itself, only the JSON analysis."""
 
-    return await instructions_utils.inject_session_state(template, context)
+    instruction = await instructions_utils.inject_session_state(template, context)
+    return instruction + code_execution_hint() + _incremental_testing_section(context)
+
+
+def _incremental_testing_section(context: ReadonlyContext) -> str:
+    """
+    When only part of the code changed since the previous review, ask for
+    tests of the changed units only and carry forward earlier results.
+    Appended after state injection because previous results contain braces.
+    """
+    changed_units = context.state.get(StateKeys.CHANGED_UNITS)
+    previous_summary = context.state.get(StateKeys.TEST_EXECUTION_SUMMARY)
+    if changed_units is None or not previous_summary:
+        return ""
+
+    if not changed_units:
+        return f"""
+
+INCREMENTAL REVIEW:
+The code is unchanged since the previous review. Do not generate or run new tests.
+Output the previous JSON analysis unchanged:
+{previous_summary}"""
+
+    changed = "\n".join(
+        f"- {unit['kind']} {unit['name']} (lines {unit['start_line']}-{unit['end_line']})"
+        for unit in changed_units
+    )
+    return f"""
+
+INCREMENTAL REVIEW:
+Only these units changed since the previous review:
+{changed}
+
+Generate and execute tests ONLY for the changed units (fewer test cases are fine).
+For everything else, carry forward the previous results below, dropping any
+issues that belong to the changed units, and merge the counts into one JSON analysis.
+
+PREVIOUS TEST RESULTS:
+{previous_summary}"""
 
 
 test_runner_agent = Agent(
@@ -80,6 +119,6 @@ test_runner_agent = Agent(
     model=config.worker_model,
     description="Generates and runs tests for Python code using safe code execution",
     instruction=test_runner_instruction_provider,
-    code_executor=BuiltInCodeExecutor(),
+    code_executor=create_test_code_executor(),
     output_key="test_execution_summary"
 )
@@ -4,21 +4,23 @@ Tools for the Code Review Assistant.
 These tools provide safe code analysis, style checking, test generation,
 and feedback management capabilities using ADK's built-in code executor.
 """
-import ast
 import asyncio
 import hashlib
 import json
-import os
-import pycodestyle
-import tempfile
 import logging
 from datetime import datetime
-from typing import Dict, Any, List
-from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 
 from google.genai import types
 from google.adk.tools import ToolContext
+from .analysis_engine import analyze_source
+from .cache import result_cache, SOURCE_ANALYSIS, STYLE_CHECK, UNIT_REVIEW
+from .config import config
 from .constants import StateKeys
+from .executors import run_cpu_bound
+from .incremental import review_units, find_changed_units, prune_unit_cache
+from .metrics import current_metrics
+from .style_engine import check_style
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -50,19 +52,16 @@ async def analyze_code_structure(code: str, tool_context: ToolContext) -> Dict[s
 
         # Store the original code in state for other agents
         tool_context.state[StateKeys.CODE_TO_REVIEW] = code
-        tool_context.state[StateKeys.CODE_ANALYSIS] = analysis
         tool_context.state[StateKeys.CODE_LINE_COUNT] = len(code.splitlines())
 
-        # Use thread pool for CPU-bound AST parsing
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            # Parse the code into an AST
-            tree = await loop.run_in_executor(executor, ast.parse, code)
-
-            # Extract structural information in thread pool
-            analysis = await loop.run_in_executor(
-                executor, _extract_code_structure, tree, code
-            )
+        if config.incremental_review_enabled:
+            # Re-analyze only the functions/classes that changed since the
+            # previous review in this session
+            analysis = (await get_unit_review(code, tool_context))['structure']
+        else:
+            # Parse and analyze in a single pass on the shared CPU executor,
+            # unless this exact code has been analyzed before
+            analysis = (await _get_source_analysis(code))['structure']
 
         # Store analysis in state
         tool_context.state[StateKeys.CODE_ANALYSIS] = analysis
@@ -71,12 +70,17 @@ async def analyze_code_structure(code: str, tool_context: ToolContext) -> Dict[s
         logger.info(f"Tool: Analysis complete - {analysis['metrics']['function_count']} functions, "
                     f"{analysis['metrics']['class_count']} classes")
 
-        return {
+        result = {
             "status": "success",
             "analysis": analysis,
             "summary": f"Found {analysis['metrics']['function_count']} functions and "
                        f"{analysis['metrics']['class_count']} classes"
         }
+        # Changed units are recorded before the review stages start
+        changed_units = tool_context.state.get(StateKeys.CHANGED_UNITS)
+        if changed_units is not None:
+            result["changed_since_last_review"] = [unit['name'] for unit in changed_units]
+        return result
 
     except SyntaxError as e:
         error_msg = f"Syntax error at line {e.lineno}: {e.msg}"
@@ -101,78 +105,100 @@ async def analyze_code_structure(code: str, tool_context: ToolContext) -> Dict[s
         }
 
 
-def _extract_code_structure(tree: ast.AST, code: str) -> Dict[str, Any]:
+async def _cached_cpu_call(namespace: str, func, code: str, *args) -> Dict[str, Any]:
     """
-    Helper function to extract structural information from AST.
-    Runs in thread pool for CPU-bound work.
+    Return func(code, *args) from the result cache, computing it on the shared
+    CPU executor on a miss. Exceptions (e.g. SyntaxError) are not cached.
     """
-    functions = []
-    classes = []
-    imports = []
-    docstrings = []
-
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
-            func_info = {
-                'name': node.name,
-                'args': [arg.arg for arg in node.args.args],
-                'lineno': node.lineno,
-                'has_docstring': ast.get_docstring(node) is not None,
-                'is_async': isinstance(node, ast.AsyncFunctionDef),
-                'decorators': [d.id for d in node.decorator_list
-                               if isinstance(d, ast.Name)]
-            }
-            functions.append(func_info)
-
-            if func_info['has_docstring']:
-                docstrings.append(f"{node.name}: {ast.get_docstring(node)[:50]}...")
-
-        elif isinstance(node, ast.ClassDef):
-            methods = []
-            for item in node.body:
-                if isinstance(item, ast.FunctionDef):
-                    methods.append(item.name)
-
-            class_info = {
-                'name': node.name,
-                'lineno': node.lineno,
-                'methods': methods,
-                'has_docstring': ast.get_docstring(node) is not None,
-                'base_classes': [base.id for base in node.bases
-                                 if isinstance(base, ast.Name)]
-            }
-            classes.append(class_info)
-
-        elif isinstance(node, ast.Import):
-            for alias in node.names:
-                imports.append({
-                    'module': alias.name,
-                    'alias': alias.asname,
-                    'type': 'import'
-                })
-        elif isinstance(node, ast.ImportFrom):
-            imports.append({
-                'module': node.module or '',
-                'names': [alias.name for alias in node.names],
-                'type': 'from_import',
-                'level': node.level
-            })
+    cached = result_cache.get(namespace, code)
+    if cached is not None:
+        logger.info(f"Tool: Cache hit for {namespace}")
+        return cached
 
-    return {
-        'functions': functions,
-        'classes': classes,
-        'imports': imports,
-        'docstrings': docstrings,
-        'metrics': {
-            'line_count': len(code.splitlines()),
-            'function_count': len(functions),
-            'class_count': len(classes),
-            'import_count': len(imports),
-            'has_main': any(f['name'] == 'main' for f in functions),
-            'has_if_main': '__main__' in code,
-            'avg_function_length': _calculate_avg_function_length(tree)
-        }
-    }
+    result = await run_cpu_bound(func, code, *args)
+    result_cache.set(namespace, code, result)
+    return result
+
+
+async def _get_source_analysis(code: str) -> Dict[str, Any]:
+    """
+    Single-pass AST analysis shared by the structure and style tools.
+    Raises SyntaxError if the code cannot be parsed.
+    """
+    return await _cached_cpu_call(SOURCE_ANALYSIS, analyze_source, code)
+
+
+async def get_unit_review(code: str, tool_context: ToolContext) -> Dict[str, Any]:
+    """
+    Unit-by-unit review that only re-analyzes functions/classes whose source
+    changed, using the per-unit results kept in session state.
+    Raises SyntaxError if the code cannot be parsed.
+    """
+    cached = result_cache.get(UNIT_REVIEW, code)
+    if cached is not None:
+        logger.info(f"Tool: Cache hit for {UNIT_REVIEW}")
+        return cached
+
+    unit_cache = tool_context.state.get(StateKeys.REVIEW_UNIT_CACHE) or {}
+    review = await run_cpu_bound(review_units, code, unit_cache)
+
+    new_results = review.pop('new_unit_results')
+    if new_results:
+        tool_context.state[StateKeys.REVIEW_UNIT_CACHE] = prune_unit_cache(
+            {**unit_cache, **new_results}, config.incremental_unit_cache_max
+        )
+    reused = sum(1 for unit in review['units'] if unit['reused'])
+    logger.info(f"Tool: Unit review - {len(review['units']) - reused} analyzed, {reused} reused")
+
+    result_cache.set(UNIT_REVIEW, code, review)
+    return review
+
+
+def record_changed_units(units: List[Dict[str, Any]], tool_context: ToolContext) -> None:
+    """Compare units with the previous review and store the changed ones in state."""
+    previous_hashes = tool_context.state.get(StateKeys.REVIEW_UNIT_HASHES)
+    tool_context.state[StateKeys.REVIEW_UNIT_HASHES] = [unit['source_hash'] for unit in units]
+
+    if not previous_hashes:
+        # First review in this session: everything is new
+        tool_context.state[StateKeys.CHANGED_UNITS] = None
+        return
+
+    changed, unchanged = find_changed_units(units, previous_hashes)
+    tool_context.state[StateKeys.CHANGED_UNITS] = changed
+    logger.info(f"Tool: {len(changed)} units changed since the previous review, "
+                f"{len(unchanged)} unchanged")
+
+
+async def _run_style_check(code: str, tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
+    """
+    Style check that reuses naming issues from the cached AST analysis,
+    so the code is not parsed a second time. With a tool context and
+    incremental review enabled, only changed units are re-checked.
+    """
+    cached = result_cache.get(STYLE_CHECK, code)
+    if cached is not None:
+        logger.info(f"Tool: Cache hit for {STYLE_CHECK}")
+        return cached
+
+    if tool_context is not None and config.incremental_review_enabled:
+        try:
+            review = await get_unit_review(code, tool_context)
+        except SyntaxError:
+            review = None  # Fall back to a whole-file check
+        if review is not None:
+            result = _build_style_result(review['style_issues'] + review['naming_issues'])
+            result_cache.set(STYLE_CHECK, code, result)
+            return result
+
+    try:
+        naming_issues = (await _get_source_analysis(code))['naming_issues']
+    except SyntaxError:
+        naming_issues = []  # Syntax errors will be caught elsewhere
+
+    result = await run_cpu_bound(_perform_style_check, code, naming_issues)
+    result_cache.set(STYLE_CHECK, code, result)
+    return result
 
 
 async def check_code_style(code: str, tool_context: ToolContext) -> Dict[str, Any]:
@@ -198,12 +224,8 @@ async def check_code_style(code: str, tool_context: ToolContext) -> Dict[str, An
                     "message": "No code provided or found in state"
                 }
 
-        # Run style check in thread pool
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            result = await loop.run_in_executor(
-                executor, _perform_style_check, code
-            )
+        # Run style check on the shared CPU executor (cached by code hash)
+        result = await _run_style_check(code, tool_context)
 
         # Store results in state
         tool_context.state[StateKeys.STYLE_SCORE] = result['score']
@@ -230,98 +252,28 @@ async def check_code_style(code: str, tool_context: ToolContext) -> Dict[str, An
         }
 
 
-def _perform_style_check(code: str) -> Dict[str, Any]:
-    """Helper to perform style check in thread pool."""
-    import io
-    import sys
+def _perform_style_check(code: str, naming_issues: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Helper to perform style check on the shared CPU executor."""
+    issues: List[Dict[str, Any]] = list(check_style(code))
 
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as tmp:
-        tmp.write(code)
-        tmp_path = tmp.name
+    # Add naming convention checks from the AST analysis
+    issues.extend(naming_issues)
 
-    try:
-        # Capture stdout to get pycodestyle output
-        old_stdout = sys.stdout
-        sys.stdout = captured_output = io.StringIO()
-
-        style_guide = pycodestyle.StyleGuide(
-            quiet=False,  # We want output
-            max_line_length=100,
-            ignore=['E501', 'W503']
-        )
-
-        result = style_guide.check_files([tmp_path])
-
-        # Restore stdout
-        sys.stdout = old_stdout
-
-        # Parse captured output
-        output = captured_output.getvalue()
-        issues = []
-
-        for line in output.strip().split('\n'):
-            if line and ':' in line:
-                parts = line.split(':', 4)
-                if len(parts) >= 4:
-                    try:
-                        issues.append({
-                            'line': int(parts[1]),
-                            'column': int(parts[2]),
-                            'code': parts[3].split()[0] if len(parts) > 3 else 'E000',
-                            'message': parts[3].strip() if len(parts) > 3 else 'Unknown error'
-                        })
-                    except (ValueError, IndexError):
-                        pass
-
-        # Add naming convention checks
-        try:
-            tree = ast.parse(code)
-            naming_issues = _check_naming_conventions(tree)
-            issues.extend(naming_issues)
-        except SyntaxError:
-            pass  # Syntax errors will be caught elsewhere
+    return _build_style_result(issues)
 
-        # Calculate weighted score
-        score = _calculate_style_score(issues)
 
-        return {
-            "status": "success",
-            "score": score,
-            "issue_count": len(issues),
-            "issues": issues[:10],  # First 10 issues
-            "summary": f"Style score: {score}/100 with {len(issues)} violations"
-        }
+def _build_style_result(issues: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Score a list of style and naming issues into the tool result."""
+    # Calculate weighted score
+    score = _calculate_style_score(issues)
 
-    finally:
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
-
-
-def _check_naming_conventions(tree: ast.AST) -> List[Dict[str, Any]]:
-    """Check PEP 8 naming conventions."""
-    naming_issues = []
-
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
-            # Skip private/protected methods and __main__
-            if not node.name.startswith('_') and node.name != node.name.lower():
-                naming_issues.append({
-                    'line': node.lineno,
-                    'column': node.col_offset,
-                    'code': 'N802',
-                    'message': f"N802 function name '{node.name}' should be lowercase"
-                })
-        elif isinstance(node, ast.ClassDef):
-            # Check if class name follows CapWords convention
-            if not node.name[0].isupper() or '_' in node.name:
-                naming_issues.append({
-                    'line': node.lineno,
-                    'column': node.col_offset,
-                    'code': 'N801',
-                    'message': f"N801 class name '{node.name}' should use CapWords convention"
-                })
-
-    return naming_issues
+    return {
+        "status": "success",
+        "score": score,
+        "issue_count": len(issues),
+        "issues": issues[:10],  # First 10 issues
+        "summary": f"Style score: {score}/100 with {len(issues)} violations"
+    }
 
 
 def _calculate_style_score(issues: List[Dict[str, Any]]) -> int:
@@ -354,6 +306,21 @@ def _calculate_style_score(issues: List[Dict[str, Any]]) -> int:
     return max(0, 100 - min(total_deduction, 100))
 
 
+# Memory queries issued for each developer
+_FEEDBACK_QUERIES = (
+    "developer:{developer_id} code review feedback",
+    "developer:{developer_id} common issues",
+    "developer:{developer_id} improvements",
+)
+
+# (keyword, pattern category, pattern tag) extracted from past feedback
+_FEEDBACK_PATTERN_RULES = (
+    ('style', 'common_issues', 'style compliance'),
+    ('improved', 'improvements', 'showing improvement'),
+    ('excellent', 'strengths', 'consistent quality'),
+)
+
+
 async def search_past_feedback(developer_id: str, tool_context: ToolContext) -> Dict[str, Any]:
     """
     Search for past feedback in memory service.
@@ -372,67 +339,57 @@ async def search_past_feedback(developer_id: str, tool_context: ToolContext) ->
         if not developer_id:
             developer_id = tool_context.state.get(StateKeys.USER_ID, 'default_user')
 
+        feedback_cache = tool_context.state.get(StateKeys.USER_PAST_FEEDBACK_CACHE)
+        if not isinstance(feedback_cache, dict):
+            feedback_cache = {}
+        cached = feedback_cache.get(developer_id)
+
+        # Serve recent results without querying the memory service
+        if cached and _is_feedback_fresh(cached):
+            logger.info(f"Tool: Using cached past feedback for developer {developer_id}")
+            return _past_feedback_result(cached['feedback'], cached['patterns'], tool_context, cached=True)
+
         # Check if memory service is available
         if hasattr(tool_context, 'search_memory'):
             try:
-                # Perform structured searches
-                queries = [
-                    f"developer:{developer_id} code review feedback",
-                    f"developer:{developer_id} common issues",
-                    f"developer:{developer_id} improvements"
-                ]
+                # Issue all queries concurrently
+                search_results = await asyncio.gather(*(
+                    tool_context.search_memory(query.format(developer_id=developer_id))
+                    for query in _FEEDBACK_QUERIES
+                ))
 
+                # The same memory can match several queries; keep it once
                 all_feedback = []
-                patterns = {
-                    'common_issues': [],
-                    'improvements': [],
-                    'strengths': []
-                }
-
-                for query in queries:
-                    search_result = await tool_context.search_memory(query)
-
+                seen = set()
+                for search_result in search_results:
                     if search_result and hasattr(search_result, 'memories'):
                         for memory in search_result.memories[:5]:
                             memory_text = memory.text if hasattr(memory, 'text') else str(memory)
-                            all_feedback.append(memory_text)
-
-                            # Extract patterns
-                            if 'style' in memory_text.lower():
-                                patterns['common_issues'].append('style compliance')
-                            if 'improved' in memory_text.lower():
-                                patterns['improvements'].append('showing improvement')
-                            if 'excellent' in memory_text.lower():
-                                patterns['strengths'].append('consistent quality')
-
-                # Store in state
-                tool_context.state[StateKeys.PAST_FEEDBACK] = all_feedback
-                tool_context.state[StateKeys.FEEDBACK_PATTERNS] = patterns
+                            if memory_text not in seen:
+                                seen.add(memory_text)
+                                all_feedback.append(memory_text)
+
+                patterns = _extract_feedback_patterns(all_feedback)
+
+                # Cache per developer so later reviews skip the round trips
+                tool_context.state[StateKeys.USER_PAST_FEEDBACK_CACHE] = {
+                    **feedback_cache,
+                    developer_id: {
+                        'feedback': all_feedback,
+                        'patterns': patterns,
+                        'fetched_at': datetime.now().isoformat()
+                    }
+                }
 
                 logger.info(f"Tool: Found {len(all_feedback)} past feedback items")
-
-                return {
-                    "status": "success",
-                    "feedback_found": True,
-                    "count": len(all_feedback),
-                    "summary": " | ".join(all_feedback[:3]) if all_feedback else "No feedback",
-                    "patterns": patterns
-                }
+                return _past_feedback_result(all_feedback, patterns, tool_context, cached=False)
 
             except Exception as e:
                 logger.warning(f"Tool: Memory search error: {e}")
 
-        # Fallback: Check state for cached feedback
-        cached_feedback = tool_context.state.get(StateKeys.USER_PAST_FEEDBACK_CACHE, [])
-        if cached_feedback:
-            tool_context.state[StateKeys.PAST_FEEDBACK] = cached_feedback
-            return {
-                "status": "success",
-                "feedback_found": True,
-                "count": len(cached_feedback),
-                "summary": "Using cached feedback",
-                "patterns": {}
-            }
+        # Fallback: stale cached feedback is better than none
+        if cached and cached.get('feedback'):
+            return _past_feedback_result(cached['feedback'], cached['patterns'], tool_context, cached=True)
 
         # No feedback found
         tool_context.state[StateKeys.PAST_FEEDBACK] = []
@@ -458,6 +415,44 @@ async def search_past_feedback(developer_id: str, tool_context: ToolContext) ->
         }
 
 
+def _extract_feedback_patterns(feedback: List[str]) -> Dict[str, List[str]]:
+    """Tag feedback patterns in one pass over the memories, without duplicates."""
+    patterns: Dict[str, List[str]] = {category: [] for _, category, _ in _FEEDBACK_PATTERN_RULES}
+    for memory_text in feedback:
+        text = memory_text.lower()
+        for keyword, category, tag in _FEEDBACK_PATTERN_RULES:
+            if keyword in text and tag not in patterns[category]:
+                patterns[category].append(tag)
+    return patterns
+
+
+def _is_feedback_fresh(entry: Dict[str, Any]) -> bool:
+    """Whether a cached feedback entry is within the configured TTL."""
+    try:
+        age = (datetime.now() - datetime.fromisoformat(entry['fetched_at'])).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return False
+    return age < config.past_feedback_cache_ttl_seconds
+
+
+def _past_feedback_result(feedback: List[str],
+                          patterns: Dict[str, List[str]],
+                          tool_context: ToolContext,
+                          cached: bool) -> Dict[str, Any]:
+    """Store past feedback in state and build the tool result."""
+    tool_context.state[StateKeys.PAST_FEEDBACK] = feedback
+    tool_context.state[StateKeys.FEEDBACK_PATTERNS] = patterns
+
+    return {
+        "status": "success",
+        "feedback_found": bool(feedback),
+        "count": len(feedback),
+        "summary": " | ".join(feedback[:3]) if feedback else "No feedback",
+        "patterns": patterns,
+        "cached": cached
+    }
+
+
 async def update_grading_progress(tool_context: ToolContext) -> Dict[str, Any]:
     """
     Updates grading progress counters and metrics in state.
@@ -505,6 +500,13 @@ async def update_grading_progress(tool_context: ToolContext) -> Dict[str, Any]:
             pass_rate = (test_results.get('passed', 0) / test_results['total']) * 100
             state_updates[StateKeys.USER_LAST_TEST_PASS_RATE] = pass_rate
 
+        # Per-stage timings recorded so far in this invocation
+        stage_metrics = current_metrics(tool_context.invocation_id)
+        stage_wall_ms = {}
+        if stage_metrics:
+            state_updates[StateKeys.PIPELINE_METRICS] = stage_metrics
+            stage_wall_ms = {name: stage['wall_ms'] for name, stage in stage_metrics['stages'].items()}
+
         # Apply all updates atomically
         for key, value in state_updates.items():
             tool_context.state[key] = value
@@ -521,7 +523,8 @@ async def update_grading_progress(tool_context: ToolContext) -> Dict[str, Any]:
                 "style_score_change": score_improvement,
                 "direction": "improved" if score_improvement > 0 else "declined"
             },
-            "summary": f"Attempt #{attempts} recorded, {lifetime_submissions} total submissions"
+            "summary": f"Attempt #{attempts} recorded, {lifetime_submissions} total submissions",
+            "stage_wall_ms": stage_wall_ms
         }
 
     except Exception as e:
@@ -690,12 +693,8 @@ async def validate_fixed_style(tool_context: ToolContext) -> Dict[str, Any]:
         # Store the extracted fixed code
         tool_context.state[StateKeys.CODE_FIXES] = code_fixes
 
-        # Run style check on fixed code
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            style_result = await loop.run_in_executor(
-                executor, _perform_style_check, code_fixes
-            )
+        # Run style check on fixed code (cached by code hash)
+        style_result = await _run_style_check(code_fixes, tool_context)
 
         # Compare with original
         original_score = tool_context.state.get(StateKeys.STYLE_SCORE, 0)
@@ -952,21 +951,6 @@ async def save_fix_report(tool_context: ToolContext) -> Dict[str, Any]:
         }
 
 
-def _calculate_avg_function_length(tree: ast.AST) -> float:
-    """Calculate average function length in lines."""
-    function_lengths = []
-
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
-            if hasattr(node, 'end_lineno') and hasattr(node, 'lineno'):
-                length = node.end_lineno - node.lineno + 1
-                function_lengths.append(length)
-
-    if function_lengths:
-        return sum(function_lengths) / len(function_lengths)
-    return 0.0
-
-
 # Module exports
 __all__ = [
     'analyze_code_structure',
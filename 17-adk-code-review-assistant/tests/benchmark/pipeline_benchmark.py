@@ -0,0 +1,183 @@
+"""
+Wall-clock benchmark for the CodeReviewPipeline: sequential vs parallel stages.
+
+Every agent is cloned with a scripted fake model that sleeps for a fixed
+latency per call, so the benchmark runs offline and the numbers reflect the
+pipeline's orchestration rather than model variance. Tools run for real.
+
+Usage:
+    python tests/benchmark/pipeline_benchmark.py --runs 5 --llm-latency 1.0 --test-latency 4.0
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, AsyncGenerator, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from google.adk.agents import SequentialAgent
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from code_review_assistant.agent import review_stages, code_review_pipeline
+from code_review_assistant.sub_agents import (
+    code_analyzer_agent,
+    style_checker_agent,
+    test_runner_agent,
+    feedback_synthesizer_agent
+)
+
+APP_NAME = "pipeline_benchmark"
+USER_ID = "benchmark_user"
+
+SAMPLE_CODE = '''def calculate_average(numbers):
+    if not numbers:
+        return 0
+    return sum(numbers)/len(numbers)
+
+
+class Inventory:
+    def __init__(self):
+        self.items = {}
+
+    def add(self, name, count=1):
+        self.items[name] = self.items.get(name, 0) + count
+'''
+
+TEST_SUMMARY = json.dumps({
+    "test_summary": {"total_tests_run": 15, "tests_passed": 15, "tests_failed": 0,
+                     "tests_with_errors": 0, "critical_issues_found": 0},
+    "critical_issues": [],
+    "verdict": {"status": "WORKING", "confidence": "high", "recommendation": "Ready to use"}
+})
+
+
+class ScriptedLlm(BaseLlm):
+    """Fake model that replays a fixed script of tool calls and text after a delay."""
+
+    latency: float = 1.0
+    script: List[Any] = []
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.latency)
+
+        # One step per tool response already received from this agent's tools
+        tool_names = {step[0] for step in self.script if isinstance(step, tuple)}
+        step = sum(
+            1 for content in llm_request.contents for part in (content.parts or [])
+            if part.function_response and part.function_response.name in tool_names
+        )
+        action = self.script[min(step, len(self.script) - 1)]
+
+        if isinstance(action, tuple):
+            name, args = action
+            part = types.Part(function_call=types.FunctionCall(name=name, args=args))
+        else:
+            part = types.Part.from_text(text=action)
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+def _fake(latency: float, script: List[Any]) -> ScriptedLlm:
+    # A gemini-2 name keeps BuiltInCodeExecutor's model check happy
+    return ScriptedLlm(model="gemini-2.5-flash", latency=latency, script=script)
+
+
+def build_pipelines(llm_latency: float, test_latency: float) -> Dict[str, SequentialAgent]:
+    """Build sequential and parallel pipelines from fake-model clones of the real agents."""
+
+    def agents():
+        return [
+            code_analyzer_agent.clone(update={'model': _fake(llm_latency, [
+                ("analyze_code_structure", {"code": SAMPLE_CODE}),
+                "Found 3 functions and 1 class.",
+            ])}),
+            style_checker_agent.clone(update={'model': _fake(llm_latency, [
+                ("check_code_style", {"code": ""}),
+                "## Style Analysis Results",
+            ])}),
+            test_runner_agent.clone(update={'model': _fake(test_latency, [TEST_SUMMARY])}),
+            feedback_synthesizer_agent.clone(update={'model': _fake(llm_latency, [
+                ("search_past_feedback", {"developer_id": "default_user"}),
+                ("update_grading_progress", {}),
+                ("save_grading_report", {"feedback_text": "## 📊 Summary\nLooks good."}),
+                "## 📊 Summary\nLooks good.",
+            ])}),
+        ]
+
+    analyzer, style, tests, synthesizer = agents()
+    sequential = code_review_pipeline.clone(update={
+        'name': "SequentialReviewPipeline",
+        'sub_agents': [analyzer, style, tests, synthesizer],
+    })
+
+    analyzer, style, tests, synthesizer = agents()
+    parallel = code_review_pipeline.clone(update={
+        'name': "ParallelReviewPipeline",
+        'sub_agents': [review_stages.clone(update={'sub_agents': [analyzer, style, tests]}), synthesizer],
+    })
+
+    return {"sequential": sequential, "parallel": parallel}
+
+
+async def time_review(agent: SequentialAgent) -> float:
+    """Run one review in a fresh session and return its wall-clock seconds."""
+    session_service = InMemorySessionService()
+    runner = Runner(
+        app_name=APP_NAME,
+        agent=agent,
+        session_service=session_service,
+        artifact_service=InMemoryArtifactService()
+    )
+    session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID)
+    message = types.Content(role="user", parts=[types.Part.from_text(text=SAMPLE_CODE)])
+
+    started = time.perf_counter()
+    async for _ in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=message):
+        pass
+    elapsed = time.perf_counter() - started
+
+    session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+    if not session.state.get("final_feedback"):
+        raise RuntimeError(f"{agent.name} finished without final feedback")
+    return elapsed
+
+
+async def main(runs: int, llm_latency: float, test_latency: float) -> None:
+    pipelines = build_pipelines(llm_latency, test_latency)
+    results = {}
+    for mode, agent in pipelines.items():
+        results[mode] = [await time_review(agent) for _ in range(runs)]
+
+    print(f"\nReview latency over {runs} runs "
+          f"(model call: {llm_latency:.1f}s, test runner call: {test_latency:.1f}s)")
+    print(f"{'Mode':<12}{'Mean (s)':>10}{'Median (s)':>12}{'Min (s)':>10}")
+    for mode, timings in results.items():
+        print(f"{mode:<12}{statistics.mean(timings):>10.2f}"
+              f"{statistics.median(timings):>12.2f}{min(timings):>10.2f}")
+
+    sequential = statistics.median(results["sequential"])
+    parallel = statistics.median(results["parallel"])
+    print(f"\nSpeedup: {sequential / parallel:.2f}x "
+          f"({sequential - parallel:.2f}s saved per review)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs parallel review stages.")
+    parser.add_argument("--runs", type=int, default=3, help="Reviews per mode")
+    parser.add_argument("--llm-latency", type=float, default=1.0,
+                        help="Simulated seconds per model call")
+    parser.add_argument("--test-latency", type=float, default=4.0,
+                        help="Simulated seconds for the test runner's call (generation + execution)")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.llm_latency, args.test_latency))
@@ -0,0 +1,66 @@
+"""
+Unit tests for the single-pass AST analysis engine.
+"""
+
+import pytest
+
+from code_review_assistant.analysis_engine import analyze_source
+
+SAMPLE_CODE = '''import os
+from typing import List
+
+
+class bad_name:
+    """A class."""
+
+    def Method(self):
+        return 1
+
+    async def fetch(self):
+        return 2
+
+
+async def gather_items(items: List[int]):
+    """Gather items."""
+    def helper(x):
+        return x
+    return [helper(i) for i in items]
+
+
+if __name__ == "__main__":
+    pass
+'''
+
+
+def test_structure_includes_async_functions():
+    """Async functions and methods are counted alongside sync ones."""
+    structure = analyze_source(SAMPLE_CODE)['structure']
+
+    names = {f['name']: f for f in structure['functions']}
+    assert set(names) == {'Method', 'fetch', 'gather_items', 'helper'}
+    assert names['gather_items']['is_async'] is True
+    assert names['helper']['is_async'] is False
+    assert structure['classes'][0]['methods'] == ['Method', 'fetch']
+    assert structure['metrics']['function_count'] == 4
+    assert structure['metrics']['import_count'] == 2
+    assert structure['metrics']['has_if_main'] is True
+
+
+def test_naming_issues_from_same_pass():
+    """Naming violations are collected in the same traversal."""
+    codes = sorted(issue['code'] for issue in analyze_source(SAMPLE_CODE)['naming_issues'])
+
+    assert codes == ['N801', 'N802']
+
+
+def test_average_function_length():
+    """Function lengths cover every function, including nested ones."""
+    code = "def a():\n    return 1\n\n\ndef b():\n    x = 1\n    y = 2\n    return x + y\n"
+
+    assert analyze_source(code)['structure']['metrics']['avg_function_length'] == 3.0
+
+
+def test_syntax_error_is_raised():
+    """Unparseable code raises SyntaxError for the caller to report."""
+    with pytest.raises(SyntaxError):
+        analyze_source("def broken(:\n")
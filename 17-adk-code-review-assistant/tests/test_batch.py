@@ -0,0 +1,141 @@
+"""
+Unit tests for the batch (repository-mode) review.
+"""
+
+import json
+
+import pytest
+
+from code_review_assistant import batch
+from code_review_assistant.cache import ResultCache
+
+CLEAN_CODE = '''"""Clean module."""
+
+
+def add(first, second):
+    """Add two numbers."""
+    return first + second
+'''
+
+MESSY_CODE = '''import os,sys
+def BadName(x,y):
+    l=[x,y]
+    if x: return os.getcwd()
+    return sys.argv
+class lower_class:
+  def Method(self): pass
+'''
+
+BROKEN_CODE = '''def broken(:
+    return 1
+'''
+
+
+def _record(**overrides):
+    record = {'status': 'success', 'line_count': 50, 'issue_count': 0, 'style_score': 100}
+    record.update(overrides)
+    return record
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A small repository with clean, messy and broken files and skipped directories."""
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "clean.py").write_text(CLEAN_CODE)
+    (tmp_path / "pkg" / "messy.py").write_text(MESSY_CODE)
+    (tmp_path / "broken.py").write_text(BROKEN_CODE)
+    (tmp_path / "notes.txt").write_text("not python")
+    for skipped in ("__pycache__", ".venv", "node_modules", ".hidden"):
+        (tmp_path / skipped).mkdir()
+        (tmp_path / skipped / "skipped.py").write_text(CLEAN_CODE)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch):
+    """Keep batch runs out of the shared on-disk result cache."""
+    monkeypatch.setattr(batch, "result_cache", ResultCache(max_entries=64))
+
+
+def test_collect_python_files_skips_excluded_directories(repo):
+    """Directories are walked for .py files, skipping tool, build and hidden directories."""
+    files = batch.collect_python_files([str(repo)])
+
+    assert files == sorted([
+        str(repo / "broken.py"),
+        str(repo / "pkg" / "clean.py"),
+        str(repo / "pkg" / "messy.py"),
+    ])
+
+
+def test_collect_python_files_includes_explicit_files(repo):
+    """Listed files are included as given, missing paths are skipped and duplicates merged."""
+    skipped_file = str(repo / ".venv" / "skipped.py")
+    clean_file = str(repo / "pkg" / "clean.py")
+
+    files = batch.collect_python_files(
+        [skipped_file, clean_file, str(repo / "pkg"), str(repo / "missing.py")]
+    )
+
+    assert files == sorted([skipped_file, clean_file, str(repo / "pkg" / "messy.py")])
+
+
+def test_needs_llm_review_thresholds():
+    """Only readable, parseable files long and bad enough are sent to the LLM."""
+    thresholds = dict(min_lines=20, min_issue_count=5, max_style_score=70)
+
+    assert not batch.needs_llm_review(_record(), **thresholds)
+    assert batch.needs_llm_review(_record(issue_count=5), **thresholds)
+    assert batch.needs_llm_review(_record(style_score=70), **thresholds)
+    assert not batch.needs_llm_review(_record(issue_count=9, line_count=19), **thresholds)
+    assert not batch.needs_llm_review(_record(status='syntax_error', issue_count=9), **thresholds)
+    assert not batch.needs_llm_review({'status': 'error', 'path': 'unreadable.py'}, **thresholds)
+
+
+async def test_syntax_errors_are_kept_out_of_the_llm_stage(repo, monkeypatch):
+    """Files that don't parse are reported, but never reviewed by the LLM pipeline."""
+    reviewed = []
+
+    async def fake_llm_review(runner, session_service, record):
+        reviewed.append(record['path'])
+        return {'status': 'success', 'feedback': 'Looks good.'}
+
+    monkeypatch.setattr(batch, "Runner", lambda **kwargs: None)
+    monkeypatch.setattr(batch, "_llm_review", fake_llm_review)
+
+    report = await batch.run_batch_review(
+        [str(repo)], workers=1, min_lines=0, min_issue_count=0, max_style_score=100
+    )
+
+    files = {r['path']: r for r in report['files']}
+    broken = files[str(repo / "broken.py")]
+    assert broken['status'] == 'syntax_error'
+    assert broken['llm_review'] is None
+    assert sorted(reviewed) == sorted([str(repo / "pkg" / "clean.py"), str(repo / "pkg" / "messy.py")])
+    assert report['summary']['syntax_errors'] == 1
+    assert report['summary']['llm_reviewed'] == 2
+
+
+def test_no_llm_run_writes_json_report(repo, tmp_path_factory, capsys):
+    """A deterministic-only run writes the consolidated report, without any LLM review."""
+    output = tmp_path_factory.mktemp("report") / "review.json"
+
+    assert batch.main([str(repo), "--no-llm", "--workers", "1", "-o", str(output),
+                       "--min-lines", "0", "--min-issues", "1"]) == 0
+
+    report = json.loads(output.read_text())
+    summary = report['summary']
+    assert summary['files'] == 3
+    assert summary['reviewed'] == 2
+    assert summary['syntax_errors'] == 1
+    assert summary['llm_candidates'] >= 1
+    assert summary['llm_reviewed'] == 0
+    assert report['thresholds']['min_lines'] == 0
+    for record in report['files']:
+        assert 'code' not in record
+        assert record['llm_review'] is None
+
+    files = {r['path']: r for r in report['files']}
+    assert files[str(repo / "pkg" / "messy.py")]['issue_count'] > 0
+    assert 'metrics' in files[str(repo / "pkg" / "clean.py")]
+    assert str(output) in capsys.readouterr().out
@@ -0,0 +1,128 @@
+"""
+Unit tests for the incremental, diff-aware review engine.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from google.genai import types
+
+from code_review_assistant.analysis_engine import analyze_source
+from code_review_assistant.callbacks import extract_code, prepare_review_state
+from code_review_assistant.constants import StateKeys
+from code_review_assistant.incremental import review_units, find_changed_units
+from code_review_assistant.style_engine import check_style
+
+SAMPLE_CODE = '''"""Module docstring."""
+import os
+x = 1
+import sys
+def first():
+    return os.getcwd()
+
+class second_class:
+    def method(self):
+        if sys.argv:
+            return 1
+        # trailing comment
+
+def third(l):
+    l = [1,2]
+    return l
+async def fourth(): pass
+if __name__ == "__main__":
+    first()
+'''
+
+
+def _full_review(code):
+    analysis = analyze_source(code)
+    return check_style(code), analysis
+
+
+def test_matches_full_file_review():
+    """Merged unit results equal a whole-file style check and analysis."""
+    style_issues, analysis = _full_review(SAMPLE_CODE)
+    review = review_units(SAMPLE_CODE, {})
+
+    assert review['style_issues'] == style_issues
+    assert review['naming_issues'] == analysis['naming_issues']
+    assert review['structure'] == analysis['structure']
+
+
+def test_only_changed_units_are_reanalyzed():
+    """Editing one function reuses cached results for every other unit."""
+    first = review_units(SAMPLE_CODE, {})
+    edited = SAMPLE_CODE.replace("l = [1,2]", "l = [1, 2, 3]")
+    second = review_units(edited, first['new_unit_results'])
+
+    reanalyzed = [u['name'] for u in second['units'] if not u['reused']]
+    assert reanalyzed == ['third']
+    assert second['style_issues'] == check_style(edited)
+
+
+def test_find_changed_units():
+    """Units are compared by source hash, independent of their position."""
+    previous = review_units(SAMPLE_CODE, {})['units']
+    edited = "import os\n\n\ndef added():\n    pass\n" + SAMPLE_CODE
+    units = review_units(edited, {})['units']
+
+    changed, unchanged = find_changed_units(units, [u['source_hash'] for u in previous])
+    assert 'added' in [u['name'] for u in changed]
+    assert {'first', 'second_class', 'third', 'fourth'} <= {u['name'] for u in unchanged}
+
+
+def test_syntax_error_is_raised():
+    """Unparseable code raises SyntaxError for the caller to report."""
+    with pytest.raises(SyntaxError):
+        review_units("def broken(:\n", {})
+
+
+def test_extract_code_ignores_prose():
+    """Unfenced messages are only taken as code when they parse as Python."""
+    assert extract_code("review it again") == ""
+    assert extract_code("thanks") == ""
+    assert extract_code("def f():\n    return 1\n") == "def f():\n    return 1\n"
+    assert extract_code("Please check:\n```python\nx = 1\n```") == "x = 1\n"
+    assert extract_code("Can you explain the second issue again?") == ""
+
+
+def test_extract_code_keeps_unparseable_code():
+    """Code after a sentence, or with a syntax error, is still taken as code."""
+    with_prose = "Please review this code:\ndef add(a,b):\n    return a+b\n"
+    broken = "def broken(:\n    return 1\n"
+
+    assert extract_code(with_prose) == with_prose
+    assert extract_code(broken) == broken
+
+
+@pytest.mark.asyncio
+async def test_follow_up_keeps_code_under_review():
+    """A follow-up question doesn't overwrite the code stored by the previous turn."""
+    state = {}
+
+    def context(text):
+        return SimpleNamespace(
+            user_content=types.Content(role="user", parts=[types.Part(text=text)]), state=state
+        )
+
+    await prepare_review_state(context(f"```python\n{SAMPLE_CODE}```"))
+    assert state[StateKeys.CODE_TO_REVIEW] == SAMPLE_CODE
+
+    await prepare_review_state(context("explain the second issue"))
+    assert state[StateKeys.CODE_TO_REVIEW] == SAMPLE_CODE
+
+
+@pytest.mark.asyncio
+async def test_syntax_error_replaces_code_under_review():
+    """Code that doesn't parse is stored for every stage, and tested as a whole."""
+    state = {}
+    broken = "def broken(:\n    return 1\n"
+
+    await prepare_review_state(SimpleNamespace(
+        user_content=types.Content(role="user", parts=[types.Part(text=broken)]), state=state
+    ))
+
+    assert state[StateKeys.CODE_TO_REVIEW] == broken
+    assert state[StateKeys.CODE_LINE_COUNT] == 2
+    assert state[StateKeys.CHANGED_UNITS] is None
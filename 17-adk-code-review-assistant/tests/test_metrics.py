@@ -0,0 +1,59 @@
+"""
+Unit tests for per-stage instrumentation.
+"""
+
+import json
+
+import pytest
+
+from code_review_assistant import metrics
+from code_review_assistant.executors import CpuExecutor
+
+
+def _busy(n):
+    return sum(i * i for i in range(n))
+
+
+@pytest.mark.asyncio
+async def test_executor_cpu_time_is_attributed_to_running_tool():
+    """CPU time spent on the executor lands in the active tool's sink."""
+    executor = CpuExecutor(backend="thread", max_workers=1)
+    sink = []
+    token = metrics._tool_cpu_sink.set(sink)
+    try:
+        await executor.run(_busy, 200_000)
+    finally:
+        metrics._tool_cpu_sink.reset(token)
+        executor.shutdown()
+
+    assert len(sink) == 1
+    assert sink[0] > 0
+
+
+def test_summarize_and_report(tmp_path, capsys):
+    """The CLI report aggregates JSONL records per stage and loop."""
+    records = [
+        {
+            'total_ms': total,
+            'stages': {
+                'TestRunner': {'runs': 1, 'wall_ms': total * 0.6, 'llm_calls': 2, 'llm_ms': 0.0,
+                               'tokens_in': 1000, 'tokens_out': 400, 'tool_calls': 0,
+                               'tool_ms': 0.0, 'tool_cpu_ms': 0.0},
+                'CodeFixer': {'runs': loops, 'wall_ms': 100.0, 'llm_calls': loops, 'llm_ms': 0.0,
+                              'tokens_in': 500, 'tokens_out': 200, 'tool_calls': 0,
+                              'tool_ms': 0.0, 'tool_cpu_ms': 0.0},
+            },
+            'loops': {'FixAttemptLoop': loops},
+        }
+        for total, loops in ((1000.0, 1), (3000.0, 3))
+    ]
+    path = tmp_path / "metrics.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+
+    summary = metrics.summarize(metrics.load_records(str(path)))
+    assert summary['invocations'] == 2
+    assert summary['stages']['TestRunner']['mean_wall_ms'] == 1200.0
+    assert summary['loops']['FixAttemptLoop'] == {'mean_iterations': 2, 'max_iterations': 3}
+
+    assert metrics.main([str(path)]) == 0
+    assert "TestRunner" in capsys.readouterr().out
@@ -0,0 +1,68 @@
+"""
+Unit tests for the past feedback search tool.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from code_review_assistant.constants import StateKeys
+from code_review_assistant.tools import search_past_feedback, _extract_feedback_patterns
+
+
+class FakeToolContext:
+    """Tool context with a slow in-memory search_memory."""
+
+    def __init__(self, memories, delay=0.05):
+        self.state = {}
+        self.queries = []
+        self._memories = memories
+        self._delay = delay
+
+    async def search_memory(self, query):
+        self.queries.append(query)
+        await asyncio.sleep(self._delay)
+        return SimpleNamespace(memories=[SimpleNamespace(text=t) for t in self._memories])
+
+
+def test_patterns_are_deduplicated():
+    """Each pattern tag appears once, however many memories mention it."""
+    patterns = _extract_feedback_patterns([
+        "Style issues again", "STYLE is better", "Improved tests", "Excellent style",
+    ])
+
+    assert patterns == {
+        'common_issues': ['style compliance'],
+        'improvements': ['showing improvement'],
+        'strengths': ['consistent quality'],
+    }
+
+
+@pytest.mark.asyncio
+async def test_queries_run_concurrently_and_dedupe_memories():
+    """All queries are in flight together; repeated memories are kept once."""
+    context = FakeToolContext(["Style improved", "Excellent naming"], delay=0.2)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    result = await search_past_feedback("dev-1", context)
+
+    assert loop.time() - started < 0.4
+    assert len(context.queries) == 3
+    assert result['count'] == 2
+    assert context.state[StateKeys.PAST_FEEDBACK] == ["Style improved", "Excellent naming"]
+
+
+@pytest.mark.asyncio
+async def test_results_are_cached_per_developer():
+    """A second search for the same developer is served from the cache."""
+    context = FakeToolContext(["Style improved"])
+
+    await search_past_feedback("dev-1", context)
+    second = await search_past_feedback("dev-1", context)
+    await search_past_feedback("dev-2", context)
+
+    assert second['cached'] is True
+    assert len(context.queries) == 6
+    assert set(context.state[StateKeys.USER_PAST_FEEDBACK_CACHE]) == {"dev-1", "dev-2"}
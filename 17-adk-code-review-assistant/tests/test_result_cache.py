@@ -0,0 +1,78 @@
+"""
+Unit tests for the content-addressed result cache.
+"""
+
+from code_review_assistant.cache import ResultCache
+
+
+def test_memory_hit_and_miss_counters():
+    """Repeated lookups of the same code are served from memory."""
+    cache = ResultCache(max_entries=8)
+
+    assert cache.get("style_check", "x = 1\n") is None
+    cache.set("style_check", "x = 1\n", {"score": 100})
+
+    assert cache.get("style_check", "x = 1\n") == {"score": 100}
+    assert cache.get("code_structure", "x = 1\n") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_lru_eviction():
+    """The least recently used entry is evicted first."""
+    cache = ResultCache(max_entries=2)
+    cache.set("ns", "a", 1)
+    cache.set("ns", "b", 2)
+    cache.get("ns", "a")
+    cache.set("ns", "c", 3)
+
+    assert cache.get("ns", "b") is None
+    assert cache.get("ns", "a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_returned_values_are_copies():
+    """Callers mutating a result cannot corrupt the cache."""
+    cache = ResultCache(max_entries=2)
+    cache.set("ns", "code", {"issues": []})
+
+    cache.get("ns", "code")["issues"].append("mutated")
+
+    assert cache.get("ns", "code") == {"issues": []}
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    """Entries written to disk are visible to a fresh cache instance."""
+    ResultCache(max_entries=2, disk_dir=str(tmp_path)).set("ns", "code", {"score": 90})
+
+    cache = ResultCache(max_entries=2, disk_dir=str(tmp_path))
+
+    assert cache.get("ns", "code") == {"score": 90}
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_respects_size_budget(tmp_path):
+    """The disk tier evicts old entries once it exceeds its budget."""
+    cache = ResultCache(max_entries=1, disk_dir=str(tmp_path), max_disk_bytes=2000)
+    for i in range(10):
+        cache.set("ns", str(i), "x" * 500)
+
+    assert cache.stats()["disk_bytes"] <= 2000
+    assert cache.stats()["disk_evictions"] > 0
+    assert cache.get("ns", "9") == "x" * 500
+
+
+def test_failed_disk_write_removes_temp_file(tmp_path, monkeypatch):
+    """A write failing after the temp file is created leaves no file behind."""
+    cache = ResultCache(max_entries=1, disk_dir=str(tmp_path))
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("code_review_assistant.cache.os.replace", failing_replace)
+    cache.set("ns", "code", {"score": 90})
+
+    assert list(tmp_path.iterdir()) == []
+    assert cache.stats()["disk_bytes"] == 0
@@ -0,0 +1,65 @@
+"""
+Unit tests for the local sandboxed test executor.
+"""
+
+import sys
+
+import pytest
+
+from code_review_assistant.sandbox import SandboxPool
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Resource limits need POSIX")
+
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool(size=1, cpu_seconds=1, memory_mb=256, timeout_seconds=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_unittest_suite(pool):
+    """Generated unittest suites run as __main__ and report results."""
+    code = (
+        "import unittest\n"
+        "class TestAdd(unittest.TestCase):\n"
+        "    def test_add(self):\n"
+        "        self.assertEqual(1 + 1, 2)\n"
+        "print('running')\n"
+        "unittest.main()\n"
+    )
+    result = pool.run(code)
+
+    assert result['stdout'] == "running\n"
+    assert "Ran 1 test" in result['stderr']
+
+
+def test_exceptions_are_reported(pool):
+    """Uncaught exceptions come back as a traceback of the job only."""
+    result = pool.run("raise ValueError('boom')")
+
+    assert "ValueError: boom" in result['stderr']
+    assert "sandbox_worker" not in result['stderr']
+
+
+def test_cpu_limit(pool):
+    """Busy loops are killed at the CPU time limit."""
+    result = pool.run("while True:\n    pass\n")
+
+    assert "CPU time limit" in result['stderr']
+
+
+def test_wall_clock_limit(pool):
+    """Jobs that sleep past the wall-clock limit are killed."""
+    result = pool.run("import time\ntime.sleep(10)\n")
+
+    assert "wall-clock limit" in result['stderr']
+    assert pool.metrics()['timeouts'] == 1
+
+
+def test_jobs_are_isolated(pool):
+    """Each job gets a fresh interpreter."""
+    pool.run("import builtins\nbuiltins.leaked = True\n")
+    result = pool.run("import builtins\nprint(hasattr(builtins, 'leaked'))\n")
+
+    assert result['stdout'] == "False\n"
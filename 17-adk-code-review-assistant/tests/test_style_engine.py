@@ -0,0 +1,49 @@
+"""
+Unit tests for the in-memory pycodestyle engine.
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from code_review_assistant.style_engine import check_style
+
+
+def test_reports_structured_issues():
+    """Violations come back as typed records with 1-based columns."""
+    issues = check_style("x=1\n")
+
+    assert issues == [{
+        'line': 1,
+        'column': 2,
+        'code': 'E225',
+        'message': 'E225 missing whitespace around operator'
+    }]
+
+
+def test_clean_code_has_no_issues():
+    """PEP 8 compliant code produces no issues."""
+    assert check_style("def add(a, b):\n    return a + b\n") == []
+
+
+def test_ignored_codes_are_filtered():
+    """E501 is ignored in favour of the 100-character limit."""
+    long_line = "value = '" + "x" * 85 + "'\n"
+    assert check_style(long_line) == []
+
+
+def test_does_not_touch_stdout():
+    """Checks must not swap sys.stdout."""
+    original_stdout = sys.stdout
+    check_style("def f( a ):\n  return a\n")
+    assert sys.stdout is original_stdout
+
+
+def test_concurrent_checks_are_isolated():
+    """Concurrent checks return the same result as a single check."""
+    code = "import os,sys\ndef f( a ):\n  return a\n"
+    expected = check_style(code)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(check_style, [code] * 32))
+
+    assert all(result == expected for result in results)